@@ -0,0 +1,34 @@
+"""Add per-user unique constraints for idempotent upserts
+
+Revision ID: 004_add_upsert_constraints
+Revises: 003_add_api_contract_fields
+Create Date: 2025-10-01 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_add_upsert_constraints'
+down_revision = '003_add_api_contract_fields'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ON CONFLICT upserts need a unique constraint on the conflict target
+    op.create_unique_constraint('uq_saved_patents_user_patent', 'saved_patents', ['user_id', 'patent_number'])
+    op.create_unique_constraint('uq_saved_queries_user_hash', 'saved_queries', ['user_id', 'hash'])
+    
+    # Keyset indexes for user-scoped listing in (created_at, id) order
+    op.create_index('ix_saved_patents_user_created', 'saved_patents', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_saved_queries_user_created', 'saved_queries', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_saved_alerts_user_created', 'saved_alerts', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_saved_alerts_user_created', table_name='saved_alerts')
+    op.drop_index('ix_saved_queries_user_created', table_name='saved_queries')
+    op.drop_index('ix_saved_patents_user_created', table_name='saved_patents')
+    op.drop_constraint('uq_saved_queries_user_hash', 'saved_queries', type_='unique')
+    op.drop_constraint('uq_saved_patents_user_patent', 'saved_patents', type_='unique')
@@ -0,0 +1,58 @@
+"""Re-key saved queries on their canonical fingerprint
+
+Revision ID: 005_rehash_saved_queries
+Revises: 004_add_upsert_constraints
+Create Date: 2025-10-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.services.canonical_query import canonical_query
+
+# revision identifiers, used by Alembic.
+revision = '005_rehash_saved_queries'
+down_revision = '004_add_upsert_constraints'
+branch_labels = None
+depends_on = None
+
+saved_queries = sa.table(
+    'saved_queries',
+    sa.column('id', sa.Integer()),
+    sa.column('query', sa.Text()),
+    sa.column('filters', sa.JSON()),
+    sa.column('hash', sa.String()),
+    sa.column('user_id', sa.String()),
+    sa.column('created_at', sa.DateTime(timezone=True)),
+    sa.column('updated_at', sa.DateTime(timezone=True)),
+)
+
+
+def upgrade() -> None:
+    # Saves upsert on the canonical fingerprint; rows hashed under older schemes would never match.
+    # Rows that turn out to be the same query collapse into the earliest, with the latest text and filters.
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(saved_queries).order_by(saved_queries.c.created_at, saved_queries.c.id)
+    ).mappings().all()
+    groups = {}
+    for row in rows:
+        fingerprint = canonical_query(row['query'], filters=row['filters']).fingerprint
+        groups.setdefault((row['user_id'], fingerprint), []).append(row)
+
+    for (_, fingerprint), group in groups.items():
+        first, latest = group[0], group[-1]
+        duplicate_ids = [row['id'] for row in group[1:]]
+        if duplicate_ids:
+            # Deleted first so the survivor's new hash cannot hit the unique constraint
+            connection.execute(saved_queries.delete().where(saved_queries.c.id.in_(duplicate_ids)))
+        if duplicate_ids or first['hash'] != fingerprint:
+            connection.execute(
+                saved_queries.update()
+                .where(saved_queries.c.id == first['id'])
+                .values(query=latest['query'], filters=latest['filters'], hash=fingerprint, updated_at=latest['updated_at'])
+            )
+
+
+def downgrade() -> None:
+    # The previous hashes are not recoverable; the fingerprints keep working as opaque hashes
+    pass
@@ -1,6 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from app.core.config import settings
 import logging
 import os
@@ -33,12 +33,41 @@ def get_database_url():
     logger.info(f"Final DATABASE_URL: {database_url}")
     return database_url
 
+def get_pool_options() -> dict:
+    """Engine pool arguments for the configured DB_POOL_MODE"""
+    if settings.DB_POOL_MODE == "null":
+        # No pooling: every session opens its own connection (needed behind Render's/pgbouncer's pooler)
+        return {"poolclass": NullPool}
+    if settings.DB_POOL_MODE == "queue":
+        return {
+            "poolclass": AsyncAdaptedQueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING
+        }
+    raise ValueError(f"Unknown DB_POOL_MODE: {settings.DB_POOL_MODE}")
+
+def get_pool_stats(pool=None) -> dict:
+    """Describe the engine's connection pool for health checks"""
+    pool = pool or engine.pool
+    stats = {"mode": settings.DB_POOL_MODE, "pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow()
+        })
+    return stats
+
 # Create async engine with proper connection settings
 engine = create_async_engine(
     get_database_url(),
     echo=settings.DEBUG,
     future=True,
-    poolclass=NullPool,  # Disable connection pooling for Render
+    **get_pool_options(),
     connect_args={
         "server_settings": {
             "application_name": "patent_forge_app"
@@ -61,15 +90,11 @@ from app.models.saved_items import SavedPatent, SavedInventor, SavedQuery, Saved
 
 # Dependency to get database session
 async def get_db() -> AsyncSession:
+    # The session connects lazily on first use; pre-ping (when pooling) covers stale connections
     async with AsyncSessionLocal() as session:
         try:
-            # Test the connection
-            await session.execute("SELECT 1")
-            logger.debug("Database connection successful")
             yield session
         except Exception as e:
-            logger.error(f"Database connection failed: {str(e)}")
+            logger.error(f"Database session failed: {str(e)}")
             await session.rollback()
             raise
-        finally:
-            await session.close()
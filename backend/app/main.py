@@ -6,11 +6,16 @@ import os
 from pathlib import Path
 from app.core.config import settings
 from app.routers import patents, watchlist, alerts, saved_items
+from app.services.http_client import http_clients
+from app.services.json_codec import BACKEND as JSON_BACKEND, FastJSONResponse
+from app.services.local_search import local_index
+from app.services.storage import async_storage_service, storage_service
 
 app = FastAPI(
     title="Patent Forge API",
     description="Backend API for Patent Forge application",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware
@@ -22,11 +27,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount API routes
+# Mount API routes (saved_items first so its /watchlist is not shadowed by the placeholder router)
+app.include_router(saved_items.router, prefix="/api", tags=["saved_items"])
 app.include_router(patents.router, prefix="/api", tags=["patents"])
 app.include_router(watchlist.router, prefix="/api", tags=["watchlist"])
 app.include_router(alerts.router, prefix="/api", tags=["alerts"])
-app.include_router(saved_items.router, prefix="/api", tags=["saved_items"])
+
+@app.on_event("startup")
+async def startup_http_clients():
+    """Open the shared upstream HTTP clients"""
+    http_clients.start()
+
+@app.on_event("startup")
+async def startup_local_search():
+    """Index saved patents and keep the index in step with storage writes"""
+    local_index.attach(storage_service)
+
+@app.on_event("shutdown")
+async def shutdown_http_clients():
+    """Stop detail prefetches and late federated searches, then close upstream HTTP clients and the patent details cache"""
+    patents.serpapi_service.prefetcher.close()
+    patents.federated_search.close()
+    await http_clients.close()
+    if patents.serpapi_service.details_cache:
+        patents.serpapi_service.details_cache.close()
+
+@app.on_event("shutdown")
+async def shutdown_storage():
+    """Flush append-only storage logs into snapshots"""
+    async_storage_service.close()
 
 # Mount static files from app/static (copied from frontend/dist in Docker)
 static_path = Path(__file__).parent / "static"
@@ -49,10 +78,24 @@ async def api_health_check():
         }
     }
 
+@app.get("/api/metrics")
+async def metrics():
+    """Cache and request coalescing counters"""
+    return {
+        "search_cache": patents.serpapi_service.search_cache.stats(),
+        "singleflight": patents.serpapi_service.inflight.stats(),
+        "serpapi": patents.serpapi_service.guard.stats(),
+        "details_cache": await patents.serpapi_service.details_cache.astats() if patents.serpapi_service.details_cache else None,
+        "details_prefetch": patents.serpapi_service.prefetcher.stats(),
+        "federated_search": patents.federated_search.stats(),
+        "local_search": local_index.stats(),
+        "json_backend": JSON_BACKEND
+    }
+
 @app.get("/api/health/db")
 async def database_health_check():
     """Health check for database connection"""
-    from app.core.database import AsyncSessionLocal
+    from app.core.database import AsyncSessionLocal, get_pool_stats
     from sqlalchemy import text
     
     try:
@@ -65,7 +108,8 @@ async def database_health_check():
                 return {
                     "status": "healthy",
                     "database": "connected",
-                    "message": "Database connection successful"
+                    "message": "Database connection successful",
+                    "pool": get_pool_stats()
                 }
             else:
                 return {
@@ -78,7 +122,8 @@ async def database_health_check():
             "status": "unhealthy",
             "database": "error",
             "message": f"Database connection failed: {str(e)}",
-            "error_type": type(e).__name__
+            "error_type": type(e).__name__,
+            "pool": get_pool_stats()
         }
 
 # Fallback route for React client-side routing
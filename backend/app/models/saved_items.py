@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Boolean, Date, ARRAY
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Boolean, Date, ARRAY, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -7,9 +7,13 @@ Base = declarative_base()
 
 class SavedPatent(Base):
     __tablename__ = "saved_patents"
+    __table_args__ = (
+        UniqueConstraint("user_id", "patent_number", name="uq_saved_patents_user_patent"),  # For idempotent upserts
+        Index("ix_saved_patents_user_created", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    patent_number = Column(String, unique=True, nullable=False, index=True)  # For idempotent upserts
+    patent_number = Column(String, nullable=True, index=True)
     title = Column(String, nullable=False)
     abstract = Column(Text, nullable=False)
     assignee = Column(String, nullable=False)
@@ -40,17 +44,24 @@ class SavedInventor(Base):
 
 class SavedQuery(Base):
     __tablename__ = "saved_queries"
+    __table_args__ = (
+        UniqueConstraint("user_id", "hash", name="uq_saved_queries_user_hash"),  # For idempotent upserts
+        Index("ix_saved_queries_user_created", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     query = Column(Text, nullable=False)
     filters = Column(JSON, nullable=True)  # Store filters as JSON
-    hash = Column(String, unique=True, nullable=False, index=True)  # For idempotent upserts
+    hash = Column(String, nullable=True, index=True)
     user_id = Column(String, nullable=False, index=True)  # For user scoping
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 class SavedAlert(Base):
     __tablename__ = "saved_alerts"
+    __table_args__ = (
+        Index("ix_saved_alerts_user_created", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     query = Column(Text, nullable=False)
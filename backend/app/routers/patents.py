@@ -1,33 +1,114 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Optional
-from app.services.serpapi import SerpAPIService
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.schemas.patent import PatentDetailsBatchRequest
+from app.services.json_codec import FastJSONResponse, dumps
+from app.services.local_search import local_index
+from app.routers.saved_items import get_current_user_id
+from app.services.federated import FederatedSearch
+from app.services.patentsview import PatentsViewService, map_patentsview_result
+from app.services.serpapi import SerpAPIService, result_key
 
 router = APIRouter()
 serpapi_service = SerpAPIService()
+patentsview_service = PatentsViewService()
+
+async def search_serpapi_source(query: str, limit: int) -> List[Dict]:
+    if limit > settings.SERPAPI_PAGE_SIZE:
+        patents, _ = await serpapi_service.search_patents_paged(query, limit)
+    else:
+        patents, _ = await serpapi_service.cached_search_patents(query, limit)
+    return patents
+
+async def search_patentsview_source(query: str, limit: int) -> List[Dict]:
+    return [map_patentsview_result(patent) for patent in await patentsview_service.search_patents(query, limit)]
+
+federated_search = FederatedSearch(
+    {"serpapi": search_serpapi_source, "patentsview": search_patentsview_source},
+    deadline=settings.FEDERATED_SEARCH_DEADLINE
+)
 
 @router.get("/patents/search/serpapi")
 async def search_patents_serpapi(
+    background_tasks: BackgroundTasks,
     query: str = Query(..., description="Search query"),
-    limit: int = Query(10, ge=1, le=50, description="Number of results"),
+    limit: int = Query(10, ge=1, le=500, description="Number of results"),
     start_year: Optional[int] = Query(None, ge=1900, le=2030, description="Start year for filtering"),
-    end_year: Optional[int] = Query(None, ge=1900, le=2030, description="End year for filtering")
+    end_year: Optional[int] = Query(None, ge=1900, le=2030, description="End year for filtering"),
+    stream: bool = Query(False, description="Stream result pages as NDJSON as they arrive")
 ):
-    """Search patents using SerpAPI with optional year filtering"""
+    """Search patents using SerpAPI with optional year filtering
+    
+    Limits above one upstream page are fetched as concurrent pages and merged in rank order.
+    """
+    if stream:
+        return StreamingResponse(
+            stream_search_pages(query, limit, start_year, end_year),
+            media_type="application/x-ndjson"
+        )
+    
     try:
-        patents = await serpapi_service.search_patents(query, limit, start_year, end_year)
-        return {
+        if limit > settings.SERPAPI_PAGE_SIZE:
+            patents, cached = await serpapi_service.search_patents_paged(query, limit, start_year, end_year)
+        else:
+            patents, cached = await serpapi_service.cached_search_patents(query, limit, start_year, end_year)
+        # Warm the details cache for the results users usually open, once the response is sent
+        background_tasks.add_task(serpapi_service.prefetch_details, patents)
+        # Results are plain dicts built by map_organic_results, so skip jsonable_encoder
+        return FastJSONResponse({
             "results": patents,
             "query": query,
             "count": len(patents),
             "source": "serpapi",
+            "cached": cached,
             "filters": {
                 "start_year": start_year,
                 "end_year": end_year
             }
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+async def stream_search_pages(query: str, limit: int, start_year: Optional[int], end_year: Optional[int]):
+    """NDJSON lines: one {"page", "cached", "results"} per upstream page in arrival order, then a summary line
+    
+    Results already sent on an earlier line are dropped, so pages can be concatenated client-side
+    (ordered by "page" for rank order).
+    """
+    seen = set()
+    try:
+        async for page, patents, cached in serpapi_service.iter_result_pages(query, limit, start_year, end_year):
+            results = []
+            for patent in patents:
+                key = result_key(patent)
+                if key not in seen:
+                    seen.add(key)
+                    results.append(patent)
+            yield dumps({"page": page, "cached": cached, "results": results}) + "\n"
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        yield dumps({"error": f"Search failed: {str(e)}"}) + "\n"
+        return
+    yield dumps({"done": True, "query": query, "count": len(seen), "source": "serpapi"}) + "\n"
+
+@router.get("/patents/search/local")
+async def search_patents_local(
+    query: str = Query(..., description="Search query"),
+    limit: int = Query(10, ge=1, le=100, description="Number of results"),
+    source: str = Query("all", pattern="^(all|saved|cached)$", description="Saved patents, results of earlier searches, or both"),
+    current_user_id: str = Depends(get_current_user_id)
+):
+    """Search saved patents and earlier search results in-process with BM25, without calling SerpAPI"""
+    sources = ("saved", "cached") if source == "all" else (source,)
+    patents = local_index.search(query, current_user_id, limit, sources)
+    return FastJSONResponse({
+        "results": patents,
+        "query": query,
+        "count": len(patents),
+        "source": "local"
+    })
+
 @router.get("/patents/search/patentsview")
 async def search_patents_patentsview(
     query: str = Query(..., description="Search query"),
@@ -35,16 +116,51 @@ async def search_patents_patentsview(
 ):
     """Search patents using PatentsView API"""
     try:
-        # This would be implemented when we have the PatentsView service
+        patents = await search_patentsview_source(query, limit)
         return {
-            "results": [],
+            "results": patents,
             "query": query,
-            "count": 0,
+            "count": len(patents),
             "source": "patentsview"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+@router.get("/patents/search/federated")
+async def search_patents_federated(
+    query: str = Query(..., description="Search query"),
+    limit: int = Query(10, ge=1, le=100, description="Number of results"),
+    deadline: Optional[float] = Query(None, gt=0, le=30, description="Seconds to wait for sources; defaults to FEDERATED_SEARCH_DEADLINE")
+):
+    """Search SerpAPI and PatentsView concurrently, merging results by patent number
+    
+    Returns what has arrived by the deadline; `partial` is true when a source timed out or failed.
+    """
+    federated = await federated_search.search(query, limit, deadline)
+    return {
+        "results": federated["results"],
+        "query": query,
+        "count": len(federated["results"]),
+        "source": "federated",
+        "partial": federated["partial"],
+        "sources": federated["sources"]
+    }
+
+@router.post("/patents/details:batch")
+async def get_patent_details_batch(request: PatentDetailsBatchRequest):
+    """Get details for many patents in one round trip
+    
+    Cached patents are served straight away and the rest fetched concurrently; each
+    item carries its own status, so one failing patent does not fail the batch.
+    """
+    items = await serpapi_service.get_patent_details_batch(request.patent_numbers)
+    return {
+        "results": items,
+        "count": len(items),
+        "cached": sum(item["cached"] for item in items),
+        "errors": sum(item["status"] == "error" for item in items)
+    }
+
 @router.get("/patents/{patent_number}/details")
 async def get_patent_details(patent_number: str):
     """Get detailed patent information"""
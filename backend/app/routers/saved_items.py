@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, FrozenSet, List, Dict, Any, Optional, Type, get_args
+import base64
+import binascii
 import logging
 import json
-import hashlib
-from datetime import datetime
+import re
+from datetime import date, datetime, time
+from functools import lru_cache
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from app.schemas.saved_items import (
     SavedPatentCreate, SavedPatentResponse, 
     SavedInventorCreate, SavedInventorResponse,
@@ -13,7 +18,9 @@ from app.schemas.saved_items import (
     SaveQueryRequest, SaveQueryResponse,
     WatchlistResponse
 )
-from app.services.storage import storage_service
+from app.services.canonical_query import canonical_query
+from app.services.json_codec import FastJSONResponse, dumps
+from app.services.storage import AsyncStorageService, get_storage, record_sort_key
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -26,15 +33,136 @@ def get_current_user_id() -> str:
     return "dev"  # Use "dev" for development namespace
 
 def hash_query(query: str, filters: Optional[Dict[str, Any]] = None) -> str:
-    """Create a hash for query + filters for idempotency"""
-    content = json.dumps({"query": query, "filters": filters}, sort_keys=True)
-    return hashlib.sha256(content.encode()).hexdigest()
+    """Canonical fingerprint of query + filters for idempotency; matches the search cache's key"""
+    return canonical_query(query, filters=filters).fingerprint
+
+# Keyset pagination: the cursor encodes the (created_at, id) of the last item returned per collection
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(positions: Dict[str, list]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(positions, separators=(",", ":")).encode()).decode()
+
+def is_sort_position(position: Any) -> bool:
+    """A [created_at, id] pair as produced by record_sort_key"""
+    return (
+        isinstance(position, list) and len(position) == 2 and isinstance(position[0], str)
+        and isinstance(position[1], int) and not isinstance(position[1], bool)
+    )
+
+def decode_cursor(cursor: Optional[str], collections: List[str]) -> Dict[str, Optional[list]]:
+    """Positions to resume from; a collection missing from the cursor is exhausted"""
+    if cursor is None:
+        return {name: None for name in collections}
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(positions, dict) or not set(positions) <= set(collections):
+            raise ValueError("unexpected collections")
+        for position in positions.values():
+            if position is not None and not is_sort_position(position):
+                raise ValueError("malformed position")
+        return positions
+    except (ValueError, binascii.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+async def fetch_pages(
+    storage: AsyncStorageService,
+    user_id: str,
+    collections: Dict[str, str],
+    positions: Dict[str, Optional[list]],
+    limit: int,
+    response: Response
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Fetch the next page of each collection and set the next cursor header"""
+    pages = {}
+    next_positions = {}
+    for name, filename in collections.items():
+        if name not in positions:
+            pages[name] = []
+            continue
+        after = tuple(positions[name]) if positions[name] else None
+        # One extra record tells us whether another page follows
+        records = await storage.get_user_records(filename, user_id, limit + 1, after)
+        if len(records) > limit:
+            records = records[:limit]
+            next_positions[name] = list(record_sort_key(records[-1]))
+        pages[name] = records
+    if next_positions:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(next_positions)
+    return pages
+
+DATETIME_ADAPTER = TypeAdapter(datetime)
+
+# Naive datetime.isoformat() output, which storage writes and pydantic serializes unchanged
+ISO_DATETIME_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.(?!000000)\d{6})?")
+
+def json_datetime(value: Any) -> Any:
+    """Render a stored timestamp exactly as a datetime response field serializes it
+    
+    Date-only values become midnight; anything unparseable is passed through as stored.
+    """
+    if value is None or isinstance(value, str) and ISO_DATETIME_PATTERN.fullmatch(value):
+        return value
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, time())
+    elif isinstance(value, str):
+        try:
+            value = DATETIME_ADAPTER.validate_python(value)
+        except ValidationError:
+            try:
+                value = datetime.combine(date.fromisoformat(value), time())
+            except ValueError:
+                return value
+    return DATETIME_ADAPTER.dump_python(value, mode="json")
+
+@lru_cache(maxsize=None)
+def datetime_fields(model: Type[BaseModel]) -> FrozenSet[str]:
+    """Fields of `model` typed datetime or Optional[datetime]"""
+    return frozenset(
+        name for name, field in model.model_fields.items()
+        if field.annotation is datetime or datetime in get_args(field.annotation)
+    )
+
+def project_records(records: List[Dict[str, Any]], model: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """Shape stored records like `model` without validating them again
+    
+    Records in storage were written by these routes, so picking the model's fields
+    replaces building (and re-serializing) a pydantic model per record. Only
+    datetime fields are normalized, to keep the model's output format.
+    """
+    fields = list(model.model_fields)
+    timestamps = datetime_fields(model)
+    return [
+        {field: json_datetime(record.get(field)) if field in timestamps else record.get(field) for field in fields}
+        for record in records
+    ]
+
+def trusted_response(content: Any, response: Response) -> FastJSONResponse:
+    """Render trusted content as-is, bypassing response_model; carries over the next cursor header"""
+    headers = {NEXT_CURSOR_HEADER: response.headers[NEXT_CURSOR_HEADER]} if NEXT_CURSOR_HEADER in response.headers else None
+    return FastJSONResponse(content, headers=headers)
+
+# Records fetched from storage per round trip while streaming an export
+EXPORT_PAGE_SIZE = 500
+
+async def iter_user_records(storage: AsyncStorageService, filename: str, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+    """Walk all of a user's records one keyset page at a time"""
+    after = None
+    while True:
+        page = await storage.get_user_records(filename, user_id, EXPORT_PAGE_SIZE, after)
+        for record in page:
+            yield record
+        if len(page) < EXPORT_PAGE_SIZE:
+            return
+        after = record_sort_key(page[-1])
 
 # New API contract endpoints
 @router.post("/watchlist/patents", response_model=SavePatentResponse)
 async def save_patent_new(
     patent_data: SavePatentRequest,
-    current_user_id: str = Depends(get_current_user_id)
+    current_user_id: str = Depends(get_current_user_id),
+    storage: AsyncStorageService = Depends(get_storage)
 ):
     """Save a patent with idempotent upsert on patentNumber"""
     try:
@@ -58,7 +186,7 @@ async def save_patent_new(
         }
         
         # Use file storage
-        patent_record = storage_service.save_patent_file(upsert_data, current_user_id)
+        patent_record = await storage.save_patent(upsert_data, current_user_id)
         logger.info(f"Saved patent to file: {patent_record['id']}")
         return SavePatentResponse(ok=True, patent=patent_record)
             
@@ -69,7 +197,8 @@ async def save_patent_new(
 @router.post("/watchlist/queries", response_model=SaveQueryResponse)
 async def save_query_new(
     query_data: SaveQueryRequest,
-    current_user_id: str = Depends(get_current_user_id)
+    current_user_id: str = Depends(get_current_user_id),
+    storage: AsyncStorageService = Depends(get_storage)
 ):
     """Save a query with idempotent upsert on hash"""
     try:
@@ -79,7 +208,7 @@ async def save_query_new(
         query_hash = hash_query(query_data.query, query_data.filters)
         
         # Use file storage
-        query_record = storage_service.save_query_file(query_data.query, current_user_id, query_data.filters, query_hash)
+        query_record = await storage.save_query(query_data.query, current_user_id, query_data.filters, query_hash)
         logger.info(f"Saved query to file: {query_record['id']}")
         return SaveQueryResponse(ok=True, query=query_record)
             
@@ -89,34 +218,66 @@ async def save_query_new(
 
 @router.get("/watchlist", response_model=WatchlistResponse)
 async def get_watchlist_new(
-    current_user_id: str = Depends(get_current_user_id)
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for the full watchlist"),
+    cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+    current_user_id: str = Depends(get_current_user_id),
+    storage: AsyncStorageService = Depends(get_storage)
 ):
-    """Get all saved patents and queries"""
+    """Get all saved patents and queries, or one page of each when `limit` or `cursor` is given"""
+    collections = {"patents": "patents.json", "queries": "queries.json"}
+    paginated = limit is not None or cursor is not None
+    positions = decode_cursor(cursor, list(collections)) if paginated else None
     try:
-        # Use file storage
-        watchlist_data = storage_service.get_watchlist_file(current_user_id)
-        return WatchlistResponse(
-            ok=True,
-            patents=watchlist_data.get("patents", []),
-            queries=watchlist_data.get("queries", [])
-        )
+        if paginated:
+            watchlist_data = await fetch_pages(storage, current_user_id, collections, positions, limit or DEFAULT_PAGE_SIZE, response)
+        else:
+            watchlist_data = await storage.get_watchlist(current_user_id)
+        return trusted_response({
+            "ok": True,
+            "patents": watchlist_data.get("patents", []),
+            "queries": watchlist_data.get("queries", []),
+            "error": None
+        }, response)
             
     except Exception as e:
         logger.error(f"fetch watchlist error: {e}", exc_info=True)
         return WatchlistResponse(ok=False, error="Server error")
 
+@router.get("/watchlist/export")
+async def export_watchlist(
+    current_user_id: str = Depends(get_current_user_id),
+    storage: AsyncStorageService = Depends(get_storage)
+):
+    """Stream saved patents, queries and alerts as NDJSON, one {"type", "item"} object per line"""
+    logger.info(f"Exporting watchlist for user: {current_user_id}")
+    
+    async def generate() -> AsyncIterator[str]:
+        # Header line first so the client gets its first byte before any storage read
+        yield dumps({"type": "export", "user_id": current_user_id, "exported_at": datetime.now().isoformat()}) + "\n"
+        for item_type, filename in (("patent", "patents.json"), ("query", "queries.json"), ("alert", "alerts.json")):
+            async for record in iter_user_records(storage, filename, current_user_id):
+                yield dumps({"type": item_type, "item": record}) + "\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="watchlist.ndjson"'}
+    )
+
 # Legacy endpoints for backward compatibility
 @router.post("/savePatent", response_model=Dict[str, Any])
 async def save_patent(
     patent_data: SavedPatentCreate,
-    current_user_id: str = Depends(get_current_user_id)
+    current_user_id: str = Depends(get_current_user_id),
+    storage: AsyncStorageService = Depends(get_storage)
 ):
     """Save a patent to file storage"""
     logger.info(f"Saving patent: {patent_data.title}")
     
     try:
         # Use file storage
-        patent_record = storage_service.save_patent_file(patent_data.model_dump(), current_user_id)
+        patent_record = await storage.save_patent(patent_data.model_dump(), current_user_id)
         logger.info(f"Successfully saved patent with ID: {patent_record['id']}")
         return {"success": True, "data": patent_record}
             
@@ -127,27 +288,37 @@ async def save_patent(
 @router.post("/patents/save", response_model=SavedPatentResponse)
 async def save_patent_legacy(
     patent_data: SavedPatentCreate,
-    current_user_id: str = Depends(get_current_user_id)
+    current_user_id: str = Depends(get_current_user_id),
+    storage: AsyncStorageService = Depends(get_storage)
 ):
     """Legacy endpoint for saving a patent"""
-    result = await save_patent(patent_data, current_user_id)
+    result = await save_patent(patent_data, current_user_id, storage)
     if not result["success"]:
         raise HTTPException(status_code=500, detail=result["error"])
     return result["data"]
 
 @router.get("/patents/saved", response_model=List[SavedPatentResponse])
 async def get_saved_patents(
-    current_user_id: str = Depends(get_current_user_id)
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for all patents"),
+    cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+    current_user_id: str = Depends(get_current_user_id),
+    storage: AsyncStorageService = Depends(get_storage)
 ):
-    """Get all patents saved by the current user"""
+    """Get all patents saved by the current user, or one page when `limit` or `cursor` is given"""
     logger.info(f"Fetching saved patents for user: {current_user_id}")
+    paginated = limit is not None or cursor is not None
+    positions = decode_cursor(cursor, ["patents"]) if paginated else None
     
     try:
         # Use file storage
-        patents = storage_service._load_json_file("patents.json")
-        user_patents = [p for p in patents if p.get("user_id") == current_user_id]
+        if paginated:
+            pages = await fetch_pages(storage, current_user_id, {"patents": "patents.json"}, positions, limit or DEFAULT_PAGE_SIZE, response)
+            user_patents = pages["patents"]
+        else:
+            user_patents = await storage.get_user_records("patents.json", current_user_id)
         logger.info(f"Found {len(user_patents)} saved patents for user {current_user_id}")
-        return [SavedPatentResponse(**p) for p in user_patents]
+        return trusted_response(project_records(user_patents, SavedPatentResponse), response)
             
     except Exception as e:
         logger.error(f"Failed to fetch saved patents: {str(e)}", exc_info=True)
@@ -157,14 +328,15 @@ async def get_saved_patents(
 @router.post("/saveQuery", response_model=Dict[str, Any])
 async def save_query(
     query_data: SavedQueryCreate,
-    current_user_id: str = Depends(get_current_user_id)
+    current_user_id: str = Depends(get_current_user_id),
+    storage: AsyncStorageService = Depends(get_storage)
 ):
     """Save a search query"""
     logger.info(f"Saving query: {query_data.query}")
     
     try:
         # Use file storage
-        query_record = storage_service.save_query_file(query_data.query, current_user_id)
+        query_record = await storage.save_query(query_data.query, current_user_id)
         logger.info(f"Successfully saved query with ID: {query_record['id']}")
         return {"success": True, "data": query_record}
             
@@ -174,17 +346,26 @@ async def save_query(
 
 @router.get("/queries/saved", response_model=List[SavedQueryResponse])
 async def get_saved_queries(
-    current_user_id: str = Depends(get_current_user_id)
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for all queries"),
+    cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+    current_user_id: str = Depends(get_current_user_id),
+    storage: AsyncStorageService = Depends(get_storage)
 ):
-    """Get all queries saved by the current user"""
+    """Get all queries saved by the current user, or one page when `limit` or `cursor` is given"""
     logger.info(f"Fetching saved queries for user: {current_user_id}")
+    paginated = limit is not None or cursor is not None
+    positions = decode_cursor(cursor, ["queries"]) if paginated else None
     
     try:
         # Use file storage
-        queries = storage_service._load_json_file("queries.json")
-        user_queries = [q for q in queries if q.get("user_id") == current_user_id]
+        if paginated:
+            pages = await fetch_pages(storage, current_user_id, {"queries": "queries.json"}, positions, limit or DEFAULT_PAGE_SIZE, response)
+            user_queries = pages["queries"]
+        else:
+            user_queries = await storage.get_user_records("queries.json", current_user_id)
         logger.info(f"Found {len(user_queries)} saved queries for user {current_user_id}")
-        return [SavedQueryResponse(**q) for q in user_queries]
+        return trusted_response(project_records(user_queries, SavedQueryResponse), response)
             
     except Exception as e:
         logger.error(f"Failed to fetch saved queries: {str(e)}", exc_info=True)
@@ -193,14 +374,15 @@ async def get_saved_queries(
 # Watchlist endpoint
 @router.get("/watchlist", response_model=Dict[str, Any])
 async def get_watchlist(
-    current_user_id: str = Depends(get_current_user_id)
+    current_user_id: str = Depends(get_current_user_id),
+    storage: AsyncStorageService = Depends(get_storage)
 ):
     """Get all saved patents and queries for the current user"""
     logger.info(f"Fetching watchlist for user: {current_user_id}")
     
     try:
         # Use file storage
-        watchlist_data = storage_service.get_watchlist_file(current_user_id)
+        watchlist_data = await storage.get_watchlist(current_user_id)
         
         logger.info(f"Found {len(watchlist_data['patents'])} patents and {len(watchlist_data['queries'])} queries for user {current_user_id}")
         return watchlist_data
@@ -213,7 +395,8 @@ async def get_watchlist(
 @router.post("/createAlert", response_model=SavedAlertResponse)
 async def create_alert(
     alert_data: SavedAlertCreate,
-    current_user_id: str = Depends(get_current_user_id)
+    current_user_id: str = Depends(get_current_user_id),
+    storage: AsyncStorageService = Depends(get_storage)
 ):
     
     logger.info(f"Creating alert for query: {alert_data.query} with frequency: {alert_data.frequency}")
@@ -228,7 +411,7 @@ async def create_alert(
     
     try:
         # Use file storage
-        alert_record = storage_service.save_alert_file(alert_data.query, alert_data.frequency, current_user_id)
+        alert_record = await storage.save_alert(alert_data.query, alert_data.frequency, current_user_id)
         logger.info(f"Successfully created alert with ID: {alert_record['id']}")
         return SavedAlertResponse(**alert_record)
             
@@ -238,17 +421,26 @@ async def create_alert(
 
 @router.get("/alerts/saved", response_model=List[SavedAlertResponse])
 async def get_saved_alerts(
-    current_user_id: str = Depends(get_current_user_id)
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for all alerts"),
+    cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+    current_user_id: str = Depends(get_current_user_id),
+    storage: AsyncStorageService = Depends(get_storage)
 ):
-    """Get all alerts saved by the current user"""
+    """Get all alerts saved by the current user, or one page when `limit` or `cursor` is given"""
     logger.info(f"Fetching saved alerts for user: {current_user_id}")
+    paginated = limit is not None or cursor is not None
+    positions = decode_cursor(cursor, ["alerts"]) if paginated else None
     
     try:
         # Use file storage
-        alerts = storage_service._load_json_file("alerts.json")
-        user_alerts = [a for a in alerts if a.get("user_id") == current_user_id]
+        if paginated:
+            pages = await fetch_pages(storage, current_user_id, {"alerts": "alerts.json"}, positions, limit or DEFAULT_PAGE_SIZE, response)
+            user_alerts = pages["alerts"]
+        else:
+            user_alerts = await storage.get_user_records("alerts.json", current_user_id)
         logger.info(f"Found {len(user_alerts)} saved alerts for user {current_user_id}")
-        return [SavedAlertResponse(**a) for a in user_alerts]
+        return trusted_response(project_records(user_alerts, SavedAlertResponse), response)
             
     except Exception as e:
         logger.error(f"Failed to fetch saved alerts: {str(e)}", exc_info=True)
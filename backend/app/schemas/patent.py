@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, validator
+from typing import List, Optional
 from datetime import datetime
+from app.core.config import settings
 
 class PatentBase(BaseModel):
     patent_number: str
@@ -35,3 +36,17 @@ class PatentResponse(PatentBase):
     
     class Config:
         from_attributes = True
+
+class PatentDetailsBatchRequest(BaseModel):
+    patent_numbers: List[str]
+
+    @validator('patent_numbers')
+    def validate_patent_numbers(cls, v):
+        if not v:
+            raise ValueError('At least one patent number is required')
+        if len(v) > settings.DETAILS_BATCH_MAX_ITEMS:
+            raise ValueError(f'At most {settings.DETAILS_BATCH_MAX_ITEMS} patent numbers per batch')
+        numbers = [number.strip() for number in v]
+        if not all(numbers):
+            raise ValueError('Patent numbers cannot be empty')
+        return numbers
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class _Entry:
+    __slots__ = ("value", "size", "stored_at")
+
+    def __init__(self, value: Any, size: int, stored_at: float):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+
+class TTLCache:
+    """Bounded in-process cache with TTL expiry, LRU eviction and stale-while-revalidate
+
+    Entries are fresh for `ttl` seconds. For a further `stale_ttl` seconds they
+    are still served, while one background task reloads them. The cache holds
+    at most `max_entries` entries and, when `max_bytes` is set, at most that
+    many bytes of JSON-encoded values; the least recently used entries go first.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int = 0, stale_ttl: float = 0.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refresh_errors = 0
+
+    def _size(self, value: Any) -> int:
+        if not self.max_bytes:
+            return 0
+        return len(json.dumps(value, default=str))
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def get(self, key: Hashable) -> Tuple[Optional[Any], Optional[str]]:
+        """Look up a key; the state is "fresh", "stale" or None for a miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        age = self._clock() - entry.stored_at
+        if age > self.ttl + self.stale_ttl:
+            self._remove(key)
+            return None, None
+        self._entries.move_to_end(key)
+        return entry.value, "fresh" if age <= self.ttl else "stale"
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting least recently used entries past the limits"""
+        if key in self._entries:
+            self._remove(key)
+        entry = _Entry(value, self._size(value), self._clock())
+        if self.max_bytes and entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters"""
+        self._entries.clear()
+        self._bytes = 0
+        self.hits = self.stale_hits = self.misses = self.evictions = self.refresh_errors = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          should_cache: Callable[[Any], bool] = lambda value: True) -> Tuple[Any, bool]:
+        """Return (value, cached), calling `loader` on a miss and refreshing stale entries in the background"""
+        value, state = self.get(key)
+        if state == "fresh":
+            self.hits += 1
+            return value, True
+        if state == "stale":
+            self.stale_hits += 1
+            self._refresh(key, loader, should_cache)
+            return value, True
+
+        self.misses += 1
+        value = await loader()
+        if should_cache(value):
+            self.set(key, value)
+        return value, False
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]], should_cache: Callable[[Any], bool]) -> None:
+        """Reload a stale entry once, however many requests see it stale"""
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                value = await loader()
+                if should_cache(value):
+                    self.set(key, value)
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.warning(f"Background cache refresh failed: {str(e)}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        task = asyncio.create_task(refresh())
+        self._refreshing[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the metrics endpoint"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refreshing": len(self._refreshing),
+            "refresh_errors": self.refresh_errors,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0
+        }
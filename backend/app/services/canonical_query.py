@@ -0,0 +1,90 @@
+import hashlib
+import json
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+# Boolean operators Google Patents only understands in upper case
+OPERATORS = frozenset({"AND", "OR", "NOT"})
+
+# A year range typed into the query itself, e.g. "hydroponics year:2020-2023"
+YEAR_RANGE_PATTERN = re.compile(r'(?<!\S)year:(\d{4})?-(\d{4})?(?!\S)', re.IGNORECASE)
+
+# Filter keys are compared lowercased without separators, so yearFrom, year_from and YEAR-FROM match
+START_YEAR_KEYS = frozenset({"startyear", "yearfrom", "fromyear", "yearstart"})
+END_YEAR_KEYS = frozenset({"endyear", "yearto", "toyear", "yearend"})
+
+def _filter_key(key: str) -> str:
+    return re.sub(r'[\s_\-]', '', str(key)).lower()
+
+def _text(value: str) -> str:
+    """NFKC, collapsed whitespace and lower case, keeping boolean operators as typed"""
+    words = unicodedata.normalize("NFKC", value).split()
+    return " ".join(word if word in OPERATORS else word.casefold() for word in words)
+
+def _year(value: Any) -> Optional[int]:
+    try:
+        return int(str(value).strip()) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+def _filter_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return _text(value)
+    if isinstance(value, (list, tuple)):
+        return sorted((_filter_value(item) for item in value), key=repr)
+    if isinstance(value, dict):
+        return {_filter_key(k): _filter_value(v) for k, v in value.items()}
+    return value
+
+class CanonicalQuery(NamedTuple):
+    """A search in canonical form; equivalent searches have equal values and fingerprints"""
+    text: str
+    start_year: Optional[int] = None
+    end_year: Optional[int] = None
+    filters: Tuple[Tuple[str, str], ...] = ()  # Other filters as sorted (key, JSON value) pairs
+
+    @property
+    def fingerprint(self) -> str:
+        """Stable hash of the canonical form, used for saved-query dedupe and cache keys"""
+        return hashlib.sha256(json.dumps(list(self), separators=(",", ":")).encode()).hexdigest()
+
+    def search_text(self) -> str:
+        """Query string sent upstream, with the year range as a year: term"""
+        if self.start_year is None and self.end_year is None:
+            return self.text
+        years = f"year:{self.start_year or ''}-{self.end_year or ''}"
+        return f"{self.text} {years}" if self.text else years
+
+def canonical_query(query: str, start_year: Optional[int] = None, end_year: Optional[int] = None,
+                    filters: Optional[Dict[str, Any]] = None) -> CanonicalQuery:
+    """Normalize a search from the search bar (query and year parameters) or a saved query (query and filters)
+
+    Year ranges given as parameters, as yearFrom/yearTo style filters or typed as
+    "year:2020-2023" all end up in start_year/end_year. Empty filters are dropped.
+    """
+    others = []
+    for key, value in (filters or {}).items():
+        name = _filter_key(key)
+        if name in START_YEAR_KEYS:
+            start_year = start_year if start_year is not None else _year(value)
+        elif name in END_YEAR_KEYS:
+            end_year = end_year if end_year is not None else _year(value)
+        elif value not in (None, "", [], {}):
+            others.append((name, json.dumps(_filter_value(value), sort_keys=True, default=str)))
+    return _canonical(query, start_year, end_year, tuple(sorted(others)))
+
+@lru_cache(maxsize=4096)
+def _canonical(query: str, start_year: Optional[int], end_year: Optional[int], filters: Tuple[Tuple[str, str], ...]) -> CanonicalQuery:
+    typed = YEAR_RANGE_PATTERN.search(query)
+    if typed:
+        query = YEAR_RANGE_PATTERN.sub(" ", query)
+        start_year = start_year if start_year is not None else _year(typed.group(1))
+        end_year = end_year if end_year is not None else _year(typed.group(2))
+    # 0 meant "no bound" to the old year: suffix builder, keep it that way
+    start_year = start_year or None
+    end_year = end_year or None
+    if start_year is not None and end_year is not None and start_year > end_year:
+        start_year, end_year = end_year, start_year
+    return CanonicalQuery(_text(query), start_year, end_year, filters)
@@ -0,0 +1,215 @@
+import asyncio
+import functools
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Keys per SELECT in get_many, below SQLite's bound parameter limit
+MAX_KEYS_PER_QUERY = 500
+
+# Reads refresh an entry's accessed_at at most this often, so hits rarely need the write lock
+ACCESS_RESOLUTION = 60.0
+
+# Once over max_bytes, evict down to this fraction of it so the next few writes don't evict again
+EVICT_TO_FRACTION = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cache_expires_at ON cache (expires_at);
+CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at);
+-- Running totals kept by triggers in the writing transaction, so nothing sums the whole table
+CREATE TABLE IF NOT EXISTS cache_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_totals (id, entries, bytes)
+    SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM cache WHERE NOT EXISTS (SELECT 1 FROM cache_totals);
+CREATE TRIGGER IF NOT EXISTS cache_totals_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_totals SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_totals_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_totals SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_totals_resize AFTER UPDATE OF size ON cache BEGIN
+    UPDATE cache_totals SET bytes = bytes - OLD.size + NEW.size WHERE id = 1;
+END;
+"""
+
+class DiskCache:
+    """Key-value cache in a SQLite file, shared by every worker process and kept across restarts
+
+    WAL mode lets several processes read while one writes, and a busy timeout
+    makes concurrent writers queue instead of failing. Entries expire after
+    their TTL; once the stored values exceed `max_bytes` the expired and then
+    the least recently read entries are evicted. Read recency is only tracked
+    to within ACCESS_RESOLUTION. The database is opened on first use.
+    """
+
+    def __init__(self, path: Path, ttl: float, max_bytes: int, clock: Callable[[], float] = time.time):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="disk-cache")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit mode; writes open their own IMMEDIATE transactions
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            # One transaction, so the totals are seeded before any other process's triggers could miss them
+            connection.executescript(f"BEGIN IMMEDIATE; {SCHEMA} COMMIT;")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None when missing or expired"""
+        now = self._clock()
+        connection = self._connection()
+        row = connection.execute("SELECT value, expires_at, accessed_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= now:
+            self.misses += 1
+            return None
+        if row[2] <= now - ACCESS_RESOLUTION:
+            connection.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return json.loads(row[0])
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Return the cached values of several keys in a few queries; missing or expired keys are left out"""
+        now = self._clock()
+        connection = self._connection()
+        found = {}
+        stale = []
+        for start in range(0, len(keys), MAX_KEYS_PER_QUERY):
+            chunk = keys[start:start + MAX_KEYS_PER_QUERY]
+            rows = connection.execute(
+                f"SELECT key, value, accessed_at FROM cache WHERE key IN ({','.join('?' * len(chunk))}) AND expires_at > ?",
+                (*chunk, now)
+            )
+            for key, value, accessed_at in rows:
+                found[key] = json.loads(value)
+                if accessed_at <= now - ACCESS_RESOLUTION:
+                    stale.append((now, key))
+        if stale:
+            connection.executemany("UPDATE cache SET accessed_at = ? WHERE key = ?", stale)
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def contains_many(self, keys: List[str]) -> Set[str]:
+        """Keys holding a live entry; unlike get_many this neither reads values nor counts as a hit"""
+        now = self._clock()
+        connection = self._connection()
+        present = set()
+        for start in range(0, len(keys), MAX_KEYS_PER_QUERY):
+            chunk = keys[start:start + MAX_KEYS_PER_QUERY]
+            rows = connection.execute(
+                f"SELECT key FROM cache WHERE key IN ({','.join('?' * len(chunk))}) AND expires_at > ?",
+                (*chunk, now)
+            )
+            present.update(key for key, in rows)
+        return present
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting once the stored values exceed the size limit"""
+        now = self._clock()
+        payload = json.dumps(value, default=str)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete would skip the totals trigger
+            connection.execute(
+                "INSERT INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                (key, payload, len(payload), now + (self.ttl if ttl is None else ttl), now)
+            )
+            if self._total_bytes(connection) > self.max_bytes:
+                self._evict(connection, now)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _total_bytes(self, connection: sqlite3.Connection) -> int:
+        return connection.execute("SELECT bytes FROM cache_totals WHERE id = 1").fetchone()[0]
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then the least recently read ones down to the low-water mark"""
+        connection.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        excess = self._total_bytes(connection) - int(self.max_bytes * EVICT_TO_FRACTION)
+        if excess <= 0:
+            return
+        victims = []
+        for key, size in connection.execute("SELECT key, size FROM cache ORDER BY accessed_at"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        connection.executemany("DELETE FROM cache WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await self._run(self.get, key)
+
+    async def aget_many(self, keys: List[str]) -> Dict[str, Any]:
+        return await self._run(self.get_many, keys)
+
+    async def acontains_many(self, keys: List[str]) -> Set[str]:
+        return await self._run(self.contains_many, keys)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self._run(self.set, key, value, ttl)
+
+    async def astats(self) -> Dict[str, Any]:
+        return await self._run(self.stats)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the metrics endpoint; hits and misses are for this process only"""
+        stats = {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+        if self.path.exists():
+            entries, size = self._connection().execute("SELECT entries, bytes FROM cache_totals WHERE id = 1").fetchone()
+            stats.update(entries=entries, bytes=size)
+        return stats
+
+    def close(self) -> None:
+        """Close every connection; the next call reopens the database"""
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import logging
+from app.services.patent_numbers import patent_match_key
+
+logger = logging.getLogger(__name__)
+
+SearchSource = Callable[[str, int], Awaitable[List[Dict]]]
+
+def merge_sources(pages: List[Tuple[str, List[Dict]]], limit: int) -> List[Dict]:
+    """Interleave results from several sources by rank, merging duplicates by patent number
+
+    Each result lists the sources that returned it; fields a source left empty are
+    filled from later sources.
+    """
+    merged: Dict[str, Dict] = {}
+    for rank in range(max((len(results) for _, results in pages), default=0)):
+        for name, results in pages:
+            if rank >= len(results):
+                continue
+            result = results[rank]
+            key = patent_match_key(result.get("patent_number") or "") or result.get("patent_link") or ""
+            existing = merged.get(key) if key else None
+            if existing is None:
+                if len(merged) < limit:
+                    merged[key or f"{name}:{rank}"] = dict(result, sources=[name])
+                continue
+            existing["sources"].append(name)
+            for field, value in result.items():
+                if value and not existing.get(field):
+                    existing[field] = value
+    return list(merged.values())
+
+class FederatedSearch:
+    """Query several search sources at once and merge whatever arrives before a deadline
+
+    Sources still running at the deadline are reported as "timeout", failed ones as
+    "error"; either makes the response partial. Late sources are left to finish in the
+    background rather than cancelled, so an upstream call already paid for still fills
+    its cache and counts towards its circuit breaker. The search returns as soon as
+    every source is done, so a fast pair of sources never waits out the deadline.
+    """
+
+    def __init__(self, sources: Dict[str, SearchSource], deadline: float):
+        self.sources = sources
+        self.deadline = deadline
+        self._tasks: Set[asyncio.Task] = set()
+        self.late = 0
+        self.late_failed = 0
+
+    async def search(self, query: str, limit: int, deadline: Optional[float] = None) -> Dict[str, Any]:
+        started = time.perf_counter()
+        finished: Dict[str, float] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        for name, source in self.sources.items():
+            task = asyncio.create_task(source(query, limit))
+            task.add_done_callback(lambda _, name=name: finished.setdefault(name, time.perf_counter() - started))
+            # Referenced until done, even once the search that started it has returned
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            tasks[name] = task
+
+        await asyncio.wait(tasks.values(), timeout=deadline if deadline is not None else self.deadline)
+
+        pages = []
+        statuses = {}
+        for name, task in tasks.items():
+            if not task.done() or task.cancelled():
+                statuses[name] = {"status": "timeout"}
+                logger.info(f"Federated search source {name} missed the deadline, finishing in the background")
+                self.late += 1
+                task.add_done_callback(lambda task, name=name: self._late_done(name, task))
+                continue
+            elapsed_ms = round(finished[name] * 1000)
+            error = task.exception()
+            if error is not None:
+                statuses[name] = {"status": "error", "error": str(getattr(error, "detail", error)), "elapsed_ms": elapsed_ms}
+                logger.warning(f"Federated search source {name} failed: {error}")
+                continue
+            results = task.result()
+            pages.append((name, results))
+            statuses[name] = {"status": "ok", "count": len(results), "elapsed_ms": elapsed_ms}
+
+        return {
+            "results": merge_sources(pages, limit),
+            "sources": statuses,
+            "partial": any(status["status"] != "ok" for status in statuses.values())
+        }
+
+    def _late_done(self, name: str, task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            # Retrieved here so a failure nobody waits for is logged rather than warned about
+            self.late_failed += 1
+            logger.warning(f"Federated search source {name} failed after the deadline: {error}")
+
+    def close(self) -> None:
+        """Cancel sources still finishing in the background"""
+        for task in list(self._tasks):
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the metrics endpoint"""
+        return {
+            "running": len(self._tasks),
+            "late": self.late,
+            "late_failed": self.late_failed
+        }
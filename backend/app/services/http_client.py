@@ -0,0 +1,68 @@
+import httpx
+from typing import Dict, Optional, Tuple
+import logging
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# PatentsViewService and TrendsService both call PATENTSVIEW_BASE, so they share a client
+UPSTREAMS = ("serpapi", "patentsview")
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class HTTPClientRegistry:
+    """Long-lived httpx clients, one per upstream service
+
+    Reusing a client keeps connections alive between requests, so repeated
+    searches skip the DNS lookup and TCP/TLS handshake. Clients are opened on
+    app startup and closed on shutdown; `get` also opens one on first use so
+    services keep working outside the app (scripts, tests).
+    """
+
+    def __init__(self, upstreams: Optional[Tuple[str, ...]] = None):
+        self.upstreams = upstreams or UPSTREAMS
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _create(self, name: str) -> httpx.AsyncClient:
+        http2 = settings.HTTP2
+        if http2 and not http2_available():
+            logger.warning("HTTP2 is enabled but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+        return httpx.AsyncClient(
+            timeout=settings.HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+            ),
+            http2=http2
+        )
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """Return the shared client for an upstream, opening it if needed"""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._create(name)
+            self._clients[name] = client
+        return client
+
+    def start(self) -> None:
+        """Open a client for every known upstream"""
+        for name in self.upstreams:
+            self.get(name)
+        logger.info(f"Opened HTTP clients for: {', '.join(self.upstreams)}")
+
+    async def close(self) -> None:
+        """Close every client and its pooled connections"""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+# Global registry instance
+http_clients = HTTPClientRegistry()
@@ -0,0 +1,35 @@
+import json
+from typing import Any, Union
+from fastapi.responses import JSONResponse
+
+# orjson ships in requirements.txt; the standard library is the fallback for installs without it
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def encode(value: Any) -> bytes:
+    """Encode JSON to UTF-8 bytes compactly with orjson when it is installed; unknown types become strings"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str)
+    return json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":")).encode()
+
+def dumps(value: Any) -> str:
+    """Like encode, returning text"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str).decode()
+    return json.dumps(value, default=str, separators=(",", ":"))
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with encode (orjson when installed), used as the app's default response class"""
+
+    def render(self, content: Any) -> bytes:
+        return encode(content)
@@ -0,0 +1,204 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+import logging
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it",
+    "of", "on", "or", "that", "the", "to", "with",
+})
+
+# Matches in a title count more than matches in the abstract or names
+FIELD_WEIGHTS = {"title": 2.0, "abstract": 1.0, "assignee": 1.0, "inventors": 1.0}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric terms without stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def _inventor_names(inventors: Any) -> str:
+    """Saved patents hold [{"name": ...}], search results a plain string"""
+    if isinstance(inventors, list):
+        return ", ".join(inventor.get("name", "") if isinstance(inventor, dict) else str(inventor) for inventor in inventors)
+    return inventors or ""
+
+def saved_patent_document(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Search result shape for a saved patent record"""
+    return {
+        "title": record.get("title") or "",
+        "snippet": record.get("abstract") or "",
+        "publication_date": "",
+        "inventor": _inventor_names(record.get("inventors")),
+        "assignee": record.get("assignee") or "",
+        "patent_link": record.get("google_patents_link") or record.get("link") or "",
+        "patent_number": record.get("patent_number") or "",
+        "pdf": "",
+        "source": "saved",
+    }
+
+def search_result_document(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Search result shape for a result seen in a SerpAPI search"""
+    return {
+        "title": result.get("title") or "",
+        "snippet": result.get("snippet") or "",
+        "publication_date": result.get("publication_date") or "",
+        "inventor": _inventor_names(result.get("inventor")),
+        "assignee": result.get("assignee") or "",
+        "patent_link": result.get("patent_link") or "",
+        "patent_number": result.get("patent_number") or "",
+        "pdf": result.get("pdf") or "",
+        "source": "cached",
+    }
+
+class _Document:
+    __slots__ = ("key", "user_id", "fields", "terms", "length")
+
+    def __init__(self, key: Hashable, user_id: Optional[str], fields: Dict[str, Any], terms: Counter):
+        self.key = key
+        self.user_id = user_id
+        self.fields = fields
+        self.terms = terms
+        self.length = sum(terms.values())
+
+class LocalSearchIndex:
+    """In-process inverted index ranking saved patents and seen search results with BM25
+
+    Saved patents are visible only to the user who saved them and stay indexed
+    for as long as they are stored. Search results are shared by everyone and
+    the oldest are dropped beyond `max_results`. Writes come from the storage
+    writer thread and the event loop, so every access takes the lock.
+    """
+
+    def __init__(self, max_results: int, k1: float = 1.2, b: float = 0.75):
+        self.max_results = max_results
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[Hashable, _Document] = {}
+        self._lengths: Dict[Hashable, float] = {}
+        self._postings: Dict[str, Dict[Hashable, float]] = {}
+        self._results: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._total_length = 0.0
+        self._lock = threading.Lock()
+        self.queries = 0
+
+    def _terms(self, title: str, abstract: str, assignee: str, inventors: str) -> Counter:
+        terms: Counter = Counter()
+        for field, text in (("title", title), ("abstract", abstract), ("assignee", assignee), ("inventors", inventors)):
+            for token in tokenize(text):
+                terms[token] += FIELD_WEIGHTS[field]
+        return terms
+
+    def _add(self, key: Hashable, user_id: Optional[str], fields: Dict[str, Any]) -> None:
+        self._remove(key)
+        terms = self._terms(fields["title"], fields["snippet"], fields["assignee"], fields["inventor"])
+        document = _Document(key, user_id, fields, terms)
+        self._docs[key] = document
+        self._lengths[key] = document.length
+        self._total_length += document.length
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[key] = frequency
+
+    def _remove(self, key: Hashable) -> None:
+        document = self._docs.pop(key, None)
+        if document is None:
+            return
+        del self._lengths[key]
+        self._total_length -= document.length
+        for term in document.terms:
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+
+    def add_saved_patent(self, record: Dict[str, Any]) -> None:
+        """Index (or re-index) a saved patent record"""
+        user_id = record.get("user_id")
+        key = ("saved", user_id, record.get("patent_number") or record.get("id"))
+        with self._lock:
+            self._add(key, user_id, saved_patent_document(record))
+
+    def add_search_results(self, results: Iterable[Dict[str, Any]]) -> None:
+        """Index results returned by an upstream search, evicting the oldest beyond max_results"""
+        with self._lock:
+            for result in results:
+                key = ("result", result.get("patent_number") or result.get("patent_link"))
+                if not key[1]:
+                    continue
+                self._add(key, None, search_result_document(result))
+                self._results[key] = None
+                self._results.move_to_end(key)
+            while len(self._results) > self.max_results:
+                oldest, _ = self._results.popitem(last=False)
+                self._remove(oldest)
+
+    def on_storage_write(self, filename: str, record: Dict[str, Any]) -> None:
+        """Storage write listener keeping saved patents indexed"""
+        if filename == "patents.json":
+            self.add_saved_patent(record)
+
+    def attach(self, storage) -> None:
+        """Index a store's saved patents and follow its writes from now on"""
+        storage.add_write_listener(self.on_storage_write)
+        records = storage.load_records("patents.json")
+        for record in records:
+            self.add_saved_patent(record)
+        logger.info(f"Local search index loaded {len(records)} saved patents")
+
+    def search(self, query: str, user_id: str, limit: int = 10, sources: Tuple[str, ...] = ("saved", "cached")) -> List[Dict[str, Any]]:
+        """Top `limit` documents for the query, best first, with their BM25 score
+
+        A patent both saved and seen in a search is returned once, as saved.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            self.queries += 1
+            if not terms or not self._docs:
+                return []
+            total = len(self._docs)
+            average_length = self._total_length / total
+            scores: Dict[Hashable, float] = {}
+            lengths = self._lengths
+            kinds = {"result"} if "saved" not in sources else {"saved", "result"} if "cached" in sources else {"saved"}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, frequency in postings.items():
+                    # Keys are ("saved", user_id, number) or ("result", number)
+                    if key[0] not in kinds or (key[0] == "saved" and key[1] != user_id):
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * lengths[key] / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+            # A patent is at most twice among the matches (saved and seen), so 2 * limit covers the dedupe
+            saved_numbers = {self._docs[key].fields["patent_number"] for key in scores if key[0] == "saved"} - {""}
+            ranked = heapq.nlargest(2 * limit, scores.items(), key=lambda item: (item[1], item[0][0] == "saved"))
+            results = []
+            for key, score in ranked:
+                fields = self._docs[key].fields
+                if key[0] == "result" and fields["patent_number"] in saved_numbers:
+                    continue
+                results.append(dict(fields, score=round(score, 4)))
+                if len(results) == limit:
+                    break
+            return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the metrics endpoint"""
+        with self._lock:
+            return {
+                "documents": len(self._docs),
+                "search_results": len(self._results),
+                "terms": len(self._postings),
+                "queries": self.queries
+            }
+
+# Global index instance
+local_index = LocalSearchIndex(max_results=settings.LOCAL_SEARCH_MAX_RESULTS)
@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Dict, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AppendOnlyLog:
+    """Append-only JSON-lines log for one collection, compacted into a JSON snapshot.
+
+    The snapshot is a plain JSON array in the same format as the "json" storage
+    backend, so switching backends never loses data. Every save appends one
+    line holding the full record; replay is keyed on the record id, which makes
+    recovery idempotent when a crash happens halfway through a compaction.
+    """
+
+    def __init__(self, data_dir: Path, filename: str, fsync: bool = True):
+        self.snapshot_path = data_dir / filename
+        self.log_path = self.snapshot_path.with_suffix(".log")
+        self.rotated_path = self.snapshot_path.with_suffix(".log.1")
+        self.fsync = fsync
+
+        self._lock = threading.RLock()
+        self._records: List[Dict[str, Any]] = []
+        self._positions: Dict[Any, int] = {}  # record id -> index in _records
+        self._next_id = 1
+        self._entries_since_snapshot = 0
+
+        self._recover()
+        self._log = open(self.log_path, "a", encoding="utf-8")
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        """Insert a record, or replace the existing record with the same id"""
+        record_id = record.get("id")
+        position = self._positions.get(record_id)
+        if position is None:
+            self._positions[record_id] = len(self._records)
+            self._records.append(record)
+        else:
+            self._records[position] = record
+        if isinstance(record_id, int) and record_id >= self._next_id:
+            self._next_id = record_id + 1
+
+    def _replay(self, path: Path) -> int:
+        """Replay a log file into memory, truncating a torn trailing line"""
+        if not path.exists():
+            return 0
+
+        replayed = 0
+        good_offset = 0
+        with open(path, "rb") as f:
+            for raw_line in f:
+                if not raw_line.endswith(b"\n"):
+                    # A crash mid-append leaves a partial last line behind
+                    logger.warning(f"Discarding torn entry at end of {path.name}")
+                    break
+                good_offset += len(raw_line)
+                if not raw_line.strip():
+                    continue
+                try:
+                    self._apply(json.loads(raw_line))
+                    replayed += 1
+                except json.JSONDecodeError as e:
+                    logger.error(f"Skipping corrupt entry in {path.name}: {e}")
+
+        if good_offset < path.stat().st_size:
+            with open(path, "r+b") as f:
+                f.truncate(good_offset)
+        return replayed
+
+    def _recover(self) -> None:
+        """Rebuild in-memory state from the snapshot plus any outstanding logs"""
+        tmp_path = self.snapshot_path.with_suffix(".json.tmp")
+        if tmp_path.exists():
+            # Leftover from a compaction that died before its rename
+            tmp_path.unlink()
+
+        if self.snapshot_path.exists():
+            try:
+                with open(self.snapshot_path, "r") as f:
+                    for record in json.load(f):
+                        self._apply(record)
+            except (json.JSONDecodeError, IOError) as e:
+                logger.error(f"Error loading snapshot {self.snapshot_path.name}: {e}")
+
+        replayed = self._replay(self.rotated_path) + self._replay(self.log_path)
+        self._entries_since_snapshot = replayed
+        logger.info(f"Recovered {len(self._records)} records for {self.snapshot_path.name} ({replayed} log entries replayed)")
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Return a copy of the current records in insertion order"""
+        with self._lock:
+            return list(self._records)
+
+    @property
+    def pending_entries(self) -> int:
+        """Number of log entries written since the last snapshot"""
+        return self._entries_since_snapshot
+
+    def append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Append a record to the log, assigning an id when it has none"""
+        return self.append_many([record])[0]
+
+    def append_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Append a batch of records with a single flush and fsync"""
+        with self._lock:
+            lines = []
+            for record in records:
+                if record.get("id") is None:
+                    record["id"] = self._next_id
+                    self._next_id += 1
+                lines.append(json.dumps(record, default=str) + "\n")
+            self._log.write("".join(lines))
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+            for record in records:
+                self._apply(record)
+            self._entries_since_snapshot += len(records)
+            return records
+
+    def compact(self) -> bool:
+        """Fold the log into a fresh snapshot and drop the replayed entries"""
+        with self._lock:
+            if self._entries_since_snapshot == 0:
+                return False
+            records = list(self._records)
+            # Rotate the live log so saves keep appending while the snapshot is written.
+            # If a previous compaction failed, its rotated log is still covered by `records`.
+            if not self.rotated_path.exists():
+                self._log.close()
+                os.replace(self.log_path, self.rotated_path)
+                self._log = open(self.log_path, "a", encoding="utf-8")
+                self._entries_since_snapshot = 0
+
+        try:
+            self._write_snapshot(records)
+            self.rotated_path.unlink()
+        except OSError as e:
+            logger.error(f"Error compacting {self.snapshot_path.name}: {e}")
+            return False
+
+        logger.info(f"Compacted {self.snapshot_path.name} into a snapshot of {len(records)} records")
+        return True
+
+    def _write_snapshot(self, records: List[Dict[str, Any]]) -> None:
+        tmp_path = self.snapshot_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(records, f, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def rewrite(self, records: List[Dict[str, Any]]) -> None:
+        """Replace every record with `records` in a fresh snapshot and empty the logs
+
+        Used to drop records that replay must never bring back. A crash before the
+        logs are emptied replays them over the new snapshot, which ends in the same
+        state the caller derived `records` from.
+        """
+        with self._lock:
+            self._records = []
+            self._positions = {}
+            for record in records:
+                self._apply(record)
+            self._write_snapshot(self._records)
+            self._log.close()
+            self.rotated_path.unlink(missing_ok=True)
+            self._log = open(self.log_path, "w", encoding="utf-8")
+            self._entries_since_snapshot = 0
+
+    def close(self) -> None:
+        """Close the log file handle"""
+        with self._lock:
+            self._log.close()
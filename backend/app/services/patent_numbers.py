@@ -0,0 +1,80 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+# Patterns tried in order by extract_patent_number; the order decides which match wins
+GOOGLE_PATENTS_PATTERN = re.compile(r'patents\.google\.com/patent/([A-Z0-9]+)')
+PATENT_PATTERNS = (
+    re.compile(r'patent/([A-Z0-9]+)'),  # Generic patent pattern
+    re.compile(r'([A-Z]{2,3}\d{1,3}[A-Z0-9]*)'),  # US patent format like US1234567
+    re.compile(r'([A-Z]{2}\d{6,7})'),  # EP patent format like EP1234567
+)
+
+# Country code, number (with an optional reissue/design/plant prefix) and kind code, e.g. US 7654321 B2
+PATENT_NUMBER_PATTERN = re.compile(r'^([A-Z]{2})((?:RE|PP|D|H|T)?\d+)([A-Z]\d?)?$')
+SEPARATORS = re.compile(r'[\s,./-]')
+
+# A number without a country code, as PatentsView returns US patents
+BARE_NUMBER_PATTERN = re.compile(r'^(?:RE|PP|D|H|T)?\d+$')
+
+class PatentNumber(NamedTuple):
+    country: str
+    number: str
+    kind: str
+
+    def __str__(self) -> str:
+        return f"{self.country}{self.number}{self.kind}"
+
+@lru_cache(maxsize=4096)
+def extract_patent_number(link: str, title: str) -> str:
+    """Extract patent number from a search result's link or title"""
+    # Try to extract from Google Patents URL
+    if "patents.google.com/patent/" in link:
+        match = GOOGLE_PATENTS_PATTERN.search(link)
+        if match:
+            return match.group(1)
+
+    # Try the link, then the title (sometimes contains patent number)
+    for text in (link, title):
+        for pattern in PATENT_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                return match.group(1)
+
+    # If no patent number found, fall back to the last path segment of the link
+    if link:
+        parts = link.split('/')
+        if len(parts) > 1:
+            # Remove query parameters and fragments
+            last_part = parts[-1].split('?')[0].split('#')[0]
+            if len(last_part) > 3:  # Must be at least 4 chars
+                return last_part
+
+    return ""
+
+def extract_patent_numbers(results: Iterable[Dict]) -> List[str]:
+    """Extract the patent number of every result in a SerpAPI result page"""
+    extract = extract_patent_number
+    return [extract(result.get("link") or "", result.get("title") or "") for result in results]
+
+@lru_cache(maxsize=4096)
+def parse_patent_number(raw: str) -> Optional[PatentNumber]:
+    """Split a publication number like "US 7,654,321 B2" into country, number and kind code"""
+    match = PATENT_NUMBER_PATTERN.match(SEPARATORS.sub("", raw.upper()))
+    if match is None:
+        return None
+    return PatentNumber(match.group(1), match.group(2), match.group(3) or "")
+
+def normalize_patent_number(raw: str) -> str:
+    """Canonical compact form of a patent number, or the stripped input when it does not parse"""
+    parsed = parse_patent_number(raw)
+    return str(parsed) if parsed else raw.strip()
+
+def patent_match_key(raw: str, default_country: str = "US") -> str:
+    """Country code and number without the kind code, so one patent matches across sources
+
+    Bare numbers are taken to be from `default_country`; unparseable input is returned uppercased.
+    """
+    compact = SEPARATORS.sub("", raw.upper())
+    parsed = parse_patent_number(default_country + compact) if BARE_NUMBER_PATTERN.match(compact) else parse_patent_number(compact)
+    return f"{parsed.country}{parsed.number}" if parsed else compact
@@ -1,6 +1,21 @@
-import httpx
 from typing import Dict, List, Optional
 from app.core.config import settings
+from app.services.http_client import http_clients
+from app.services.patent_numbers import patent_match_key
+
+def map_patentsview_result(patent: Dict) -> Dict:
+    """Map a PatentsView patent onto the SerpAPI search result fields"""
+    patent_number = patent_match_key(patent.get("patent_number") or "")
+    return {
+        "title": patent.get("title") or "",
+        "snippet": patent.get("abstract") or "",
+        "publication_date": patent.get("publication_date") or "",
+        "inventor": patent.get("inventors") or "",
+        "assignee": patent.get("assignee") or "",
+        "patent_link": f"https://patents.google.com/patent/{patent_number}" if patent_number else "",
+        "patent_number": patent_number,
+        "pdf": ""
+    }
 
 class PatentsViewService:
     def __init__(self):
@@ -15,42 +30,15 @@ class PatentsViewService:
             "o": limit
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/patents", params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            patents = []
-            if "patents" in data:
-                for patent in data["patents"]:
-                    patents.append({
-                        "patent_number": patent.get("patent_number"),
-                        "title": patent.get("patent_title"),
-                        "abstract": patent.get("patent_abstract"),
-                        "inventors": patent.get("inventor_name"),
-                        "assignee": patent.get("assignee_name"),
-                        "filing_date": patent.get("filing_date"),
-                        "publication_date": patent.get("patent_date"),
-                        "status": patent.get("patent_kind")
-                    })
-            
-            return patents
-    
-    async def get_patent_details(self, patent_number: str) -> Optional[Dict]:
-        """Get detailed information about a specific patent"""
-        params = {
-            "q": f'patent_number:"{patent_number}"',
-            "f": "patent_number,patent_title,patent_abstract,inventor_name,assignee_name,filing_date,patent_date,patent_kind,patent_class"
-        }
+        client = http_clients.get("patentsview")
+        response = await client.get(f"{self.base_url}/patents", params=params)
+        response.raise_for_status()
+        data = response.json()
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/patents", params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            if "patents" in data and data["patents"]:
-                patent = data["patents"][0]
-                return {
+        patents = []
+        if "patents" in data:
+            for patent in data["patents"]:
+                patents.append({
                     "patent_number": patent.get("patent_number"),
                     "title": patent.get("patent_title"),
                     "abstract": patent.get("patent_abstract"),
@@ -58,12 +46,39 @@ class PatentsViewService:
                     "assignee": patent.get("assignee_name"),
                     "filing_date": patent.get("filing_date"),
                     "publication_date": patent.get("patent_date"),
-                    "status": patent.get("patent_kind"),
-                    "patent_class": patent.get("patent_class")
-                }
-            
-            return None
-    
+                    "status": patent.get("patent_kind")
+                })
+        
+        return patents
+
+    async def get_patent_details(self, patent_number: str) -> Optional[Dict]:
+        """Get detailed information about a specific patent"""
+        params = {
+            "q": f'patent_number:"{patent_number}"',
+            "f": "patent_number,patent_title,patent_abstract,inventor_name,assignee_name,filing_date,patent_date,patent_kind,patent_class"
+        }
+        
+        client = http_clients.get("patentsview")
+        response = await client.get(f"{self.base_url}/patents", params=params)
+        response.raise_for_status()
+        data = response.json()
+        
+        if "patents" in data and data["patents"]:
+            patent = data["patents"][0]
+            return {
+                "patent_number": patent.get("patent_number"),
+                "title": patent.get("patent_title"),
+                "abstract": patent.get("patent_abstract"),
+                "inventors": patent.get("inventor_name"),
+                "assignee": patent.get("assignee_name"),
+                "filing_date": patent.get("filing_date"),
+                "publication_date": patent.get("patent_date"),
+                "status": patent.get("patent_kind"),
+                "patent_class": patent.get("patent_class")
+            }
+        
+        return None
+
     async def get_patent_status(self, patent_number: str) -> Optional[Dict]:
         """Get current status of a patent"""
         params = {
@@ -71,17 +86,17 @@ class PatentsViewService:
             "f": "patent_number,patent_kind,patent_date"
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/patents", params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            if "patents" in data and data["patents"]:
-                patent = data["patents"][0]
-                return {
-                    "patent_number": patent.get("patent_number"),
-                    "status": patent.get("patent_kind"),
-                    "grant_date": patent.get("patent_date")
-                }
-            
-            return None
+        client = http_clients.get("patentsview")
+        response = await client.get(f"{self.base_url}/patents", params=params)
+        response.raise_for_status()
+        data = response.json()
+        
+        if "patents" in data and data["patents"]:
+            patent = data["patents"][0]
+            return {
+                "patent_number": patent.get("patent_number"),
+                "status": patent.get("patent_kind"),
+                "grant_date": patent.get("patent_date")
+            }
+        
+        return None
@@ -0,0 +1,78 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DetailsPrefetcher:
+    """Fetch patent details in the background before anyone asks for them
+
+    `schedule` returns straight away. Numbers already cached (per `cached`) or
+    already queued are skipped; the rest are fetched with `fetch`, at most
+    `concurrency` at a time across every caller. Beyond `max_pending` queued
+    numbers new ones are dropped, so a burst of searches cannot build a backlog.
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[Any]], cached: Callable[[List[str]], Awaitable[Set[str]]],
+                 concurrency: int, max_pending: int):
+        self._fetch = fetch
+        self._cached = cached
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.max_pending = max_pending
+        self._pending: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.scheduled = 0
+        self.skipped_cached = 0
+        self.skipped_pending = 0
+        self.dropped = 0
+        self.fetched = 0
+        self.failed = 0
+
+    async def schedule(self, patent_numbers: Iterable[str]) -> None:
+        numbers = [number for number in dict.fromkeys(patent_numbers) if number]
+        try:
+            cached = await self._cached(numbers)
+        except Exception as e:
+            logger.warning(f"Prefetch cache check failed: {str(e)}")
+            return
+        for number in numbers:
+            if number in cached:
+                self.skipped_cached += 1
+            elif number in self._pending:
+                self.skipped_pending += 1
+            elif len(self._pending) >= self.max_pending:
+                self.dropped += 1
+            else:
+                self._pending.add(number)
+                self.scheduled += 1
+                task = asyncio.create_task(self._run(number))
+                self._tasks.add(task)
+                # Callbacks also run for tasks cancelled before they started
+                task.add_done_callback(self._tasks.discard)
+                task.add_done_callback(lambda _, number=number: self._pending.discard(number))
+
+    async def _run(self, number: str) -> None:
+        try:
+            async with self._semaphore:
+                await self._fetch(number)
+            self.fetched += 1
+        except Exception as e:
+            self.failed += 1
+            logger.debug(f"Prefetch of {number} failed: {str(e)}")
+
+    def close(self) -> None:
+        """Cancel queued and running prefetches"""
+        for task in list(self._tasks):
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the metrics endpoint"""
+        return {
+            "pending": len(self._pending),
+            "scheduled": self.scheduled,
+            "skipped_cached": self.skipped_cached,
+            "skipped_pending": self.skipped_pending,
+            "dropped": self.dropped,
+            "fetched": self.fetched,
+            "failed": self.failed
+        }
@@ -0,0 +1,155 @@
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+import logging
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.models.saved_items import SavedPatent, SavedQuery, SavedAlert
+
+logger = logging.getLogger(__name__)
+
+# Storage collection name -> model, so the repository is a drop-in for AsyncStorageService
+MODELS = {
+    "patents.json": SavedPatent,
+    "queries.json": SavedQuery,
+    "alerts.json": SavedAlert,
+}
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    """Accept the ISO strings the API sends for dates"""
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+def _to_record(row) -> Dict[str, Any]:
+    """Turn a result row into the same dict shape the file store returns"""
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in row.items()
+    }
+
+class SavedItemsRepository:
+    """Saved items in the SQL database, exposing the AsyncStorageService interface
+
+    Saves are single INSERT ... ON CONFLICT DO UPDATE statements keyed on the
+    per-user unique constraints, and reads are user-scoped set-based selects.
+    """
+
+    def __init__(self, session_factory: Optional[async_sessionmaker] = None):
+        if session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        self.session_factory = session_factory
+        self._dialect = session_factory.kw["bind"].dialect.name
+
+    def _insert(self, model):
+        """Dialect-specific INSERT that supports ON CONFLICT"""
+        if self._dialect == "sqlite":
+            return sqlite.insert(model)
+        return postgresql.insert(model)
+
+    async def _upsert(self, model, rows: List[Dict[str, Any]], conflict: List[str]) -> List[Dict[str, Any]]:
+        """Upsert many rows with one statement and return the stored records"""
+        if not rows:
+            return []
+        if conflict:
+            # One statement cannot touch the same row twice; the last save of a key wins
+            unique_rows = {}
+            for row in rows:
+                unique_rows[tuple(row[column] for column in conflict) if row.get(conflict[-1]) else id(row)] = row
+            rows = list(unique_rows.values())
+
+        stmt = self._insert(model).values(rows)
+        if conflict:
+            update_columns = [
+                column for column in rows[0]
+                if column not in conflict and column != "created_at"
+            ]
+            stmt = stmt.on_conflict_do_update(
+                index_elements=conflict,
+                set_={column: stmt.excluded[column] for column in update_columns}
+            )
+        stmt = stmt.returning(*model.__table__.c)
+
+        async with self.session_factory() as session:
+            result = await session.execute(stmt)
+            records = [_to_record(row) for row in result.mappings()]
+            await session.commit()
+        return records
+
+    def _patent_row(self, patent_data: Dict[str, Any], user_id: str, now: datetime) -> Dict[str, Any]:
+        return {
+            "patent_number": patent_data.get("patent_number"),
+            "title": patent_data["title"],
+            "abstract": patent_data["abstract"],
+            "assignee": patent_data["assignee"],
+            "inventors": patent_data["inventors"],
+            "link": patent_data.get("link"),
+            "date_filed": _parse_datetime(patent_data.get("date_filed")),
+            "google_patents_link": patent_data.get("google_patents_link"),
+            "tags": patent_data.get("tags", []),
+            "user_id": user_id,
+            "created_at": now,
+            "updated_at": now
+        }
+
+    async def save_patents(self, patents: List[Dict[str, Any]], user_id: str) -> List[Dict[str, Any]]:
+        """Upsert a batch of patents on (user_id, patent_number)"""
+        now = datetime.now(timezone.utc)
+        rows = [self._patent_row(patent_data, user_id, now) for patent_data in patents]
+        return await self._upsert(SavedPatent, rows, ["user_id", "patent_number"])
+
+    async def save_patent(self, patent_data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+        return (await self.save_patents([patent_data], user_id))[0]
+
+    async def save_query(self, query: str, user_id: str, filters: Optional[Dict[str, Any]] = None, hash_value: Optional[str] = None) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        row = {
+            "query": query,
+            "filters": filters,
+            "hash": hash_value,
+            "user_id": user_id,
+            "created_at": now,
+            "updated_at": now
+        }
+        return (await self._upsert(SavedQuery, [row], ["user_id", "hash"]))[0]
+
+    async def save_alert(self, query: str, frequency: str, user_id: str) -> Dict[str, Any]:
+        row = {
+            "query": query,
+            "frequency": frequency,
+            "user_id": user_id,
+            "created_at": datetime.now(timezone.utc)
+        }
+        return (await self._upsert(SavedAlert, [row], []))[0]
+
+    async def _select_user_records(self, session: AsyncSession, model, user_id: str, limit: Optional[int] = None, after: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        stmt = (
+            select(*model.__table__.c)
+            .where(model.user_id == user_id)
+            .order_by(model.created_at, model.id)
+        )
+        if after:
+            created_at, record_id = after
+            stmt = stmt.where(tuple_(model.created_at, model.id) > tuple_(_parse_datetime(created_at), record_id))
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        result = await session.execute(stmt)
+        return [_to_record(row) for row in result.mappings()]
+
+    async def get_user_records(self, filename: str, user_id: str, limit: Optional[int] = None, after: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        async with self.session_factory() as session:
+            return await self._select_user_records(session, MODELS[filename], user_id, limit, after)
+
+    async def get_watchlist(self, user_id: str) -> Dict[str, Any]:
+        async with self.session_factory() as session:
+            return {
+                "patents": await self._select_user_records(session, SavedPatent, user_id),
+                "queries": await self._select_user_records(session, SavedQuery, user_id)
+            }
+
+    def close(self) -> None:
+        """Connections belong to the shared engine; nothing to release here"""
@@ -0,0 +1,187 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, Any, Optional
+import logging
+import httpx
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limited or a transient server-side failure
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class UpstreamUnavailableError(Exception):
+    """The upstream was not called because it is unhealthy or over quota"""
+
+class CircuitOpenError(UpstreamUnavailableError):
+    pass
+
+class RateLimitTimeoutError(UpstreamUnavailableError):
+    pass
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    are rejected for `reset_timeout` seconds. Then a single probe call is let
+    through (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now"""
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        self.rejected += 1
+        raise CircuitOpenError("Circuit open: upstream is failing, not calling it")
+
+    def release_probe(self) -> None:
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._probing:
+                logger.warning(f"Opening circuit after {self.failures} consecutive upstream failures")
+            self.opened_at = self._clock()
+            self._probing = False
+
+class TokenBucket:
+    """Client-side rate limiter: `rate` requests per second with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        """Take a token, waiting for one if needed; raise RateLimitTimeoutError past `timeout`"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if timeout is not None and wait > timeout:
+                raise RateLimitTimeoutError(f"Rate limit would delay the call by {wait:.2f}s")
+            if wait > 0:
+                await asyncio.sleep(wait)
+                self._refill()
+            self._tokens -= 1
+
+class UpstreamGuard:
+    """Retries, circuit breaking and rate limiting around idempotent upstream requests
+
+    Every attempt passes the breaker and takes a rate-limit token. Transport
+    errors and RETRY_STATUSES responses are retried with full-jitter exponential
+    backoff while the overall deadline allows; each attempt's timeout is
+    capped by the time left, so a brownout cannot hold a request past the deadline.
+    """
+
+    def __init__(self, name: str, breaker: CircuitBreaker, limiter: TokenBucket, attempts: int = 3,
+                 base_delay: float = 0.2, max_delay: float = 2.0, attempt_timeout: float = 10.0, deadline: float = 20.0):
+        self.name = name
+        self.breaker = breaker
+        self.limiter = limiter
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.retries = 0
+
+    @classmethod
+    def from_settings(cls, name: str) -> "UpstreamGuard":
+        return cls(
+            name,
+            breaker=CircuitBreaker(settings.UPSTREAM_BREAKER_THRESHOLD, settings.UPSTREAM_BREAKER_RESET),
+            limiter=TokenBucket(settings.SERPAPI_RATE_LIMIT, settings.SERPAPI_RATE_BURST),
+            attempts=settings.UPSTREAM_RETRY_ATTEMPTS,
+            base_delay=settings.UPSTREAM_RETRY_BASE_DELAY,
+            max_delay=settings.UPSTREAM_RETRY_MAX_DELAY,
+            attempt_timeout=settings.UPSTREAM_ATTEMPT_TIMEOUT,
+            deadline=settings.UPSTREAM_DEADLINE
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def call(self, send: Callable[[float], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Run `send(timeout)` until it succeeds, retries run out or the deadline passes
+
+        The last retryable response is returned as-is so the caller can report it.
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            await self.limiter.acquire(timeout=self.deadline - (time.monotonic() - started))
+            self.breaker.check()
+            remaining = self.deadline - (time.monotonic() - started)
+
+            try:
+                response = await send(max(0.001, min(self.attempt_timeout, remaining)))
+            except httpx.TransportError as e:
+                self.breaker.record_failure()
+                failure: Any = e
+            except BaseException:
+                # Cancelled or a bug, not an upstream verdict; let the next call probe instead
+                self.breaker.release_probe()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                failure = response
+
+            attempt += 1
+            delay = self._backoff(attempt)
+            if attempt >= self.attempts or time.monotonic() - started + delay >= self.deadline:
+                if isinstance(failure, Exception):
+                    raise failure
+                return failure
+            self.retries += 1
+            logger.info(f"Retrying {self.name} call in {delay:.2f}s after {failure if isinstance(failure, Exception) else failure.status_code}")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the metrics endpoint"""
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "rejected": self.breaker.rejected,
+            "retries": self.retries
+        }
@@ -1,64 +1,179 @@
+import asyncio
 import httpx
 import logging
-import json
-import urllib.parse
-from typing import Dict, List, Optional
+import math
+import time
+import sqlite3
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
 from fastapi import HTTPException
 from app.core.config import settings
+from app.services.cache import TTLCache
+from app.services.canonical_query import canonical_query
+from app.services.disk_cache import DiskCache
+from app.services.http_client import http_clients
+from app.services import json_codec
+from app.services.local_search import local_index
+from app.services.patent_numbers import extract_patent_number, extract_patent_numbers
+from app.services.prefetch import DetailsPrefetcher
+from app.services.resilience import UpstreamGuard, UpstreamUnavailableError
+from app.services.singleflight import SingleFlight
+from app.services.upstream_logging import UpstreamLogger
 
 # Set up logging
 logger = logging.getLogger(__name__)
+upstream_log = UpstreamLogger("serpapi", logger)
+
+def search_cache_key(query: str, limit: int, start_year: Optional[int] = None, end_year: Optional[int] = None, page: Optional[int] = None) -> tuple:
+    """Key equivalent searches on their canonical query fingerprint so they share a cache entry"""
+    return (canonical_query(query, start_year, end_year).fingerprint, limit, page)
+
+def result_key(patent: Dict) -> str:
+    """Identity of a search result for de-duplication across pages"""
+    return patent.get("patent_number") or patent.get("patent_link") or patent.get("title", "")
+
+def merge_pages(pages: List[List[Dict]], limit: int) -> List[Dict]:
+    """Concatenate result pages in rank order, dropping repeats and anything past limit"""
+    seen = set()
+    merged = []
+    for page in pages:
+        for patent in page:
+            key = result_key(patent)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(patent)
+            if len(merged) == limit:
+                return merged
+    return merged
+
+def details_cache_key(patent_number: str) -> str:
+    return f"details:{patent_number}"
+
+def map_organic_results(organic_results: List[Dict]) -> List[Dict]:
+    """Project SerpAPI organic results onto the fields the API returns
+    
+    Shared by the primary and alternative searches so the mapping stays in one place.
+    """
+    patents = []
+    # Extract every patent number from its link or title in one pass
+    patent_numbers = extract_patent_numbers(organic_results)
+    for i, (result, patent_number) in enumerate(zip(organic_results, patent_numbers)):
+        try:
+            patent_link = result.get("link", "")
+            
+            # Construct proper Google Patents URL
+            google_patents_url = f"https://patents.google.com/patent/{patent_number}" if patent_number else patent_link
+            
+            patents.append({
+                "title": result.get("title", ""),
+                "snippet": result.get("snippet", ""),
+                "publication_date": result.get("publication_date", ""),
+                "inventor": result.get("inventor", ""),
+                "assignee": result.get("assignee", ""),
+                "patent_link": google_patents_url,  # Use constructed URL
+                "patent_number": patent_number,  # Add patent number for reference
+                "pdf": result.get("pdf", "")
+            })
+        except Exception as e:
+            logger.warning(f"Error processing patent result {i+1}: {str(e)}")
+    return patents
+
+def map_details(result: Dict) -> Dict:
+    """Project the SerpAPI result for one patent onto the details fields"""
+    return {
+        "title": result.get("title", ""),
+        "snippet": result.get("snippet", ""),
+        "publication_date": result.get("publication_date", ""),
+        "inventor": result.get("inventor", ""),
+        "assignee": result.get("assignee", ""),
+        "patent_link": result.get("link", ""),
+        "pdf": result.get("pdf", "")
+    }
 
 class SerpAPIService:
     def __init__(self):
         self.api_key = settings.SERPAPI_API_KEY
         self.base_url = "https://serpapi.com/search.json"  # Fixed: should be .json
+        self.search_cache = TTLCache(
+            ttl=settings.SEARCH_CACHE_TTL,
+            stale_ttl=settings.SEARCH_CACHE_STALE_TTL,
+            max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+            max_bytes=settings.SEARCH_CACHE_MAX_BYTES
+        )
+        # Concurrent identical requests share one upstream call
+        self.inflight = SingleFlight()
+        # Retries, circuit breaker and rate limit shared by every SerpAPI request
+        self.guard = UpstreamGuard.from_settings("serpapi")
+        # Patent details rarely change; keep them on disk so every worker and restart reuses them
+        self.details_cache = DiskCache(
+            Path(settings.DATA_DIR) / settings.DETAILS_CACHE_FILENAME,
+            ttl=settings.DETAILS_CACHE_TTL,
+            max_bytes=settings.DETAILS_CACHE_MAX_BYTES
+        ) if settings.DETAILS_CACHE_ENABLED else None
+        # Details of top search results are fetched ahead of the drawer opening
+        self.prefetcher = DetailsPrefetcher(
+            lambda patent_number: self.inflight.do(("details", patent_number), lambda: self._fetch_and_cache_details(patent_number)),
+            self._cached_detail_numbers,
+            concurrency=settings.DETAILS_PREFETCH_CONCURRENCY,
+            max_pending=settings.DETAILS_PREFETCH_MAX_PENDING
+        )
     
     def _extract_patent_number(self, link: str, title: str) -> str:
         """Extract patent number from link or title"""
-        import re
+        return extract_patent_number(link, title)
+    
+    async def cached_search_patents(self, query: str, limit: int = 10, start_year: Optional[int] = None, end_year: Optional[int] = None, page: Optional[int] = None) -> Tuple[List[Dict], bool]:
+        """Search through the result cache; returns (patents, served_from_cache)"""
+        key = search_cache_key(query, limit, start_year, end_year, page)
         
-        # Try to extract from Google Patents URL
-        if "patents.google.com/patent/" in link:
-            match = re.search(r'patents\.google\.com/patent/([A-Z0-9]+)', link)
-            if match:
-                return match.group(1)
+        async def fetch() -> List[Dict]:
+            patents = await self.search_patents(query, limit, start_year, end_year, page)
+            # Every result fetched from upstream becomes searchable locally
+            local_index.add_search_results(patents)
+            return patents
         
-        # Try to extract from other patent URLs
-        patent_patterns = [
-            r'patent/([A-Z0-9]+)',  # Generic patent pattern
-            r'([A-Z]{2,3}\d{1,3}[A-Z0-9]*)',  # US patent format like US1234567
-            r'([A-Z]{2}\d{6,7})',  # EP patent format like EP1234567
-        ]
-        
-        for pattern in patent_patterns:
-            match = re.search(pattern, link)
-            if match:
-                return match.group(1)
+        # Empty results are not cached: the alternative search returns [] on upstream failures
+        return await self.search_cache.get_or_load(
+            key,
+            lambda: self.inflight.do(("search",) + key, fetch),
+            should_cache=bool
+        )
+    
+    async def iter_result_pages(self, query: str, limit: int, start_year: Optional[int] = None, end_year: Optional[int] = None) -> AsyncIterator[Tuple[int, List[Dict], bool]]:
+        """Fetch the upstream pages covering `limit` results concurrently, yielding (page, patents, cached) as each arrives
         
-        # Try to extract from title (sometimes contains patent number)
-        for pattern in patent_patterns:
-            match = re.search(pattern, title)
-            if match:
-                return match.group(1)
+        Each page is trimmed to the results that fall within `limit` by rank.
+        """
+        page_size = settings.SERPAPI_PAGE_SIZE
+        semaphore = asyncio.Semaphore(settings.SERPAPI_PAGE_CONCURRENCY)
         
-        # If no patent number found, return a sanitized version of the link
-        # Remove common URL parts and keep only the identifier
-        if link:
-            # Extract the last part of the URL path
-            parts = link.split('/')
-            if len(parts) > 1:
-                last_part = parts[-1]
-                # Remove query parameters and file extensions
-                last_part = last_part.split('?')[0].split('#')[0]
-                if last_part and len(last_part) > 3:  # Must be at least 4 chars
-                    return last_part
+        async def fetch(page: int) -> Tuple[int, List[Dict], bool]:
+            async with semaphore:
+                patents, cached = await self.cached_search_patents(query, page_size, start_year, end_year, page)
+            return page, patents[:limit - (page - 1) * page_size], cached
         
-        return ""
+        tasks = [asyncio.create_task(fetch(page)) for page in range(1, math.ceil(limit / page_size) + 1)]
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                yield await next_page
+        finally:
+            # Stop outstanding fetches when the consumer goes away or a page fails
+            for task in tasks:
+                task.cancel()
     
-    async def search_patents(self, query: str, limit: int = 10, start_year: Optional[int] = None, end_year: Optional[int] = None) -> List[Dict]:
+    async def search_patents_paged(self, query: str, limit: int, start_year: Optional[int] = None, end_year: Optional[int] = None) -> Tuple[List[Dict], bool]:
+        """Search beyond one upstream page; returns (patents in rank order, all pages served from cache)"""
+        pages = {}
+        cached = True
+        async for page, patents, page_cached in self.iter_result_pages(query, limit, start_year, end_year):
+            pages[page] = patents
+            cached = cached and page_cached
+        return merge_pages([pages[page] for page in sorted(pages)], limit), cached
+    
+    async def search_patents(self, query: str, limit: int = 10, start_year: Optional[int] = None, end_year: Optional[int] = None, page: Optional[int] = None) -> List[Dict]:
         """Search for patents using SerpAPI with optional year filtering"""
-        logger.info(f"Searching patents with query: '{query}', limit: {limit}, year range: {start_year}-{end_year}")
+        upstream_log.info("search.start", query=query, limit=limit, start_year=start_year, end_year=end_year, page=page or 1)
         
         if not self.api_key:
             logger.error("SERPAPI_API_KEY not configured")
@@ -67,21 +182,8 @@ class SerpAPIService:
                 detail="Missing SERPAPI_API_KEY"
             )
         
-        # Ensure query is properly encoded
-        encoded_query = urllib.parse.quote(query.strip())
-        logger.info(f"Encoded query: '{encoded_query}'")
-        
-        # Build query with year range if specified
-        search_query = query.strip()
-        if start_year and end_year:
-            search_query = f"{query.strip()} year:{start_year}-{end_year}"
-            logger.info(f"Added year filter to query: '{search_query}'")
-        elif start_year:
-            search_query = f"{query.strip()} year:{start_year}-"
-            logger.info(f"Added start year filter to query: '{search_query}'")
-        elif end_year:
-            search_query = f"{query.strip()} year:-{end_year}"
-            logger.info(f"Added end year filter to query: '{search_query}'")
+        # Canonical query text, with the year range as a year: term
+        search_query = canonical_query(query, start_year, end_year).search_text()
         
         # Try different parameter combinations for better results
         params = {
@@ -92,114 +194,91 @@ class SerpAPIService:
             "hl": "en",  # Language
             "gl": "us"   # Country
         }
+        if page and page > 1:
+            params["page"] = page
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                logger.info(f"Making request to SerpAPI: {self.base_url}")
-                logger.info(f"Request params: {params}")
-                
-                # Log the actual URL being called
-                url = f"{self.base_url}?api_key={self.api_key}&engine=google_patents&q={urllib.parse.quote(search_query)}&num={limit}&hl=en&gl=us"
-                logger.info(f"Actual URL (for debugging): {url}")
-                
-                response = await client.get(self.base_url, params=params)
-                
-                # Log response status and headers
-                logger.info(f"SerpAPI response status: {response.status_code}")
-                logger.info(f"SerpAPI response headers: {dict(response.headers)}")
-                
-                # Check if response is successful
-                if response.status_code != 200:
-                    error_detail = f"SerpAPI returned status {response.status_code}"
-                    try:
-                        error_data = response.json()
-                        if "error" in error_data:
-                            error_detail = f"SerpAPI error: {error_data['error']}"
-                        logger.error(f"SerpAPI error response: {json.dumps(error_data, indent=2)}")
-                    except:
-                        error_text = response.text[:500]  # Limit error text length
-                        error_detail = f"SerpAPI returned status {response.status_code}: {error_text}"
-                        logger.error(f"SerpAPI error response text: {error_text}")
-                    
-                    logger.error(f"SerpAPI request failed: {error_detail}")
-                    raise HTTPException(
-                        status_code=502,
-                        detail=error_detail
-                    )
-                
-                # Parse JSON response with error handling
+            client = http_clients.get("serpapi")
+            upstream_log.debug("search.request", url=self.base_url, params=params)
+            
+            started = time.perf_counter()
+            response = await self.guard.call(lambda timeout: client.get(self.base_url, params=params, timeout=timeout))
+            
+            upstream_log.info("search.response", status=response.status_code, elapsed_ms=round((time.perf_counter() - started) * 1000))
+            upstream_log.payload(logging.DEBUG, "search.response_headers", response.headers.raw)
+            
+            # Check if response is successful
+            if response.status_code != 200:
+                error_detail = f"SerpAPI returned status {response.status_code}"
                 try:
-                    data = response.json()
-                except Exception as e:
-                    logger.error(f"Failed to parse SerpAPI JSON response: {str(e)}")
-                    logger.error(f"Raw response text: {response.text[:1000]}")  # Limit log length
-                    raise HTTPException(
-                        status_code=502,
-                        detail=f"Failed to parse SerpAPI response: {str(e)}"
-                    )
+                    error_data = response.json()
+                    if "error" in error_data:
+                        error_detail = f"SerpAPI error: {error_data['error']}"
+                    upstream_log.payload(logging.ERROR, "search.error_response", error_data, sampled=False)
+                except:
+                    error_text = response.text[:500]  # Limit error text length
+                    error_detail = f"SerpAPI returned status {response.status_code}: {error_text}"
+                    upstream_log.payload(logging.ERROR, "search.error_response", error_text, sampled=False)
                 
-                # Log raw response when DEBUG is enabled
-                if settings.DEBUG:
-                    logger.debug(f"SerpAPI raw response: {json.dumps(data, indent=2)}")
+                logger.error(f"SerpAPI request failed: {error_detail}")
+                raise HTTPException(
+                    status_code=502,
+                    detail=error_detail
+                )
+            
+            # Parse JSON response with error handling
+            try:
+                data = json_codec.loads(response.content)
+            except Exception as e:
+                logger.error(f"Failed to parse SerpAPI JSON response: {str(e)}")
+                upstream_log.payload(logging.ERROR, "search.unparsable_response", response.text, sampled=False)
+                raise HTTPException(
+                    status_code=502,
+                    detail=f"Failed to parse SerpAPI response: {str(e)}"
+                )
+            
+            upstream_log.payload(logging.DEBUG, "search.response_body", data)
+            
+            # Check if response contains an error field
+            if "error" in data:
+                error_message = data.get("error", "Unknown SerpAPI error")
+                logger.error(f"SerpAPI returned error: {error_message}")
+                upstream_log.payload(logging.ERROR, "search.error_response", data, sampled=False)
+                raise HTTPException(
+                    status_code=502,
+                    detail=error_message
+                )
+            
+            # Safely check for organic_results
+            organic_results = data.get("organic_results", [])
+            if not organic_results:
+                upstream_log.info("search.no_results", keys=list(data))
+                upstream_log.payload(logging.INFO, "search.empty_response", data)
                 
-                logger.info(f"SerpAPI response received, processing data")
-                logger.info(f"Available keys in response: {list(data.keys())}")
-                
-                # Check if response contains an error field
-                if "error" in data:
-                    error_message = data.get("error", "Unknown SerpAPI error")
-                    logger.error(f"SerpAPI returned error: {error_message}")
-                    logger.error(f"Full SerpAPI error response: {json.dumps(data, indent=2)}")
-                    raise HTTPException(
-                        status_code=502,
-                        detail=error_message
-                    )
-                
-                # Safely check for organic_results
-                organic_results = data.get("organic_results", [])
-                if not organic_results:
-                    logger.info(f"No organic_results found in SerpAPI response")
-                    logger.info(f"Response structure: {json.dumps(data, indent=2)}")
-                    
-                    # Try alternative search approach if no results
-                    logger.info("Trying alternative search approach...")
-                    return await self._try_alternative_search(query, limit, start_year, end_year)
-                
-                patents = []
-                for i, result in enumerate(organic_results):
-                    try:
-                        # Extract patent number from the link or title
-                        patent_link = result.get("link", "")
-                        patent_number = self._extract_patent_number(patent_link, result.get("title", ""))
-                        
-                        # Construct proper Google Patents URL
-                        google_patents_url = f"https://patents.google.com/patent/{patent_number}" if patent_number else patent_link
-                        
-                        patent = {
-                            "title": result.get("title", ""),
-                            "snippet": result.get("snippet", ""),
-                            "publication_date": result.get("publication_date", ""),
-                            "inventor": result.get("inventor", ""),
-                            "assignee": result.get("assignee", ""),
-                            "patent_link": google_patents_url,  # Use constructed URL
-                            "patent_number": patent_number,  # Add patent number for reference
-                            "pdf": result.get("pdf", "")
-                        }
-                        patents.append(patent)
-                        logger.debug(f"Processed patent {i+1}: {patent.get('title', 'No title')} -> {patent_number}")
-                    except Exception as e:
-                        logger.warning(f"Error processing patent result {i+1}: {str(e)}")
-                        continue
-                
-                logger.info(f"Successfully processed {len(patents)} patents from {len(organic_results)} results")
-                return patents
+                if page and page > 1:
+                    # Past the last page; the alternative search only covers page one
+                    return []
                 
+                # Try alternative search approach if no results
+                logger.info("Trying alternative search approach...")
+                return await self._try_alternative_search(query, limit, start_year, end_year)
+            
+            patents = map_organic_results(organic_results)
+            upstream_log.info("search.done", patents=len(patents), results=len(organic_results))
+            return patents
+            
         except httpx.RequestError as e:
             logger.error(f"Network error when calling SerpAPI: {str(e)}")
             raise HTTPException(
                 status_code=502,
                 detail=f"Network error when calling SerpAPI: {str(e)}"
             )
+        except UpstreamUnavailableError as e:
+            logger.warning(f"Not calling SerpAPI: {str(e)}")
+            raise HTTPException(
+                status_code=503,
+                detail=f"SerpAPI temporarily unavailable: {str(e)}"
+            )
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error when calling SerpAPI: {str(e)}")
             raise HTTPException(
@@ -220,14 +299,8 @@ class SerpAPIService:
         """Try alternative search approach when primary search fails"""
         logger.info(f"Trying alternative search for: '{query}' with year range: {start_year}-{end_year}")
         
-        # Build query with year range if specified
-        search_query = query.strip()
-        if start_year and end_year:
-            search_query = f"{query.strip()} year:{start_year}-{end_year}"
-        elif start_year:
-            search_query = f"{query.strip()} year:{start_year}-"
-        elif end_year:
-            search_query = f"{query.strip()} year:-{end_year}"
+        # Canonical query text, with the year range as a year: term
+        search_query = canonical_query(query, start_year, end_year).search_text()
         
         # Try with different parameters
         alternative_params = {
@@ -241,51 +314,109 @@ class SerpAPIService:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(self.base_url, params=alternative_params)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    organic_results = data.get("organic_results", [])
-                    
-                    if organic_results:
-                        logger.info(f"Alternative search found {len(organic_results)} results")
-                        patents = []
-                        for result in organic_results:
-                            try:
-                                # Extract patent number from the link or title
-                                patent_link = result.get("link", "")
-                                patent_number = self._extract_patent_number(patent_link, result.get("title", ""))
-                                
-                                # Construct proper Google Patents URL
-                                google_patents_url = f"https://patents.google.com/patent/{patent_number}" if patent_number else patent_link
-                                
-                                patent = {
-                                    "title": result.get("title", ""),
-                                    "snippet": result.get("snippet", ""),
-                                    "publication_date": result.get("publication_date", ""),
-                                    "inventor": result.get("inventor", ""),
-                                    "assignee": result.get("assignee", ""),
-                                    "patent_link": google_patents_url,  # Use constructed URL
-                                    "patent_number": patent_number,  # Add patent number for reference
-                                    "pdf": result.get("pdf", "")
-                                }
-                                patents.append(patent)
-                            except Exception as e:
-                                logger.warning(f"Error processing alternative patent result: {str(e)}")
-                                continue
-                        return patents
-                
-                logger.info("Alternative search also failed, returning empty results")
-                return []
+            client = http_clients.get("serpapi")
+            response = await self.guard.call(lambda timeout: client.get(self.base_url, params=alternative_params, timeout=timeout))
+            
+            if response.status_code == 200:
+                organic_results = json_codec.loads(response.content).get("organic_results", [])
                 
+                if organic_results:
+                    logger.info(f"Alternative search found {len(organic_results)} results")
+                    return map_organic_results(organic_results)
+            
+            logger.info("Alternative search also failed, returning empty results")
+            return []
+            
         except Exception as e:
             logger.error(f"Alternative search failed: {str(e)}")
             return []
     
     async def get_patent_details(self, patent_number: str) -> Optional[Dict]:
+        """Get patent details, sharing the upstream call with concurrent requests for the same patent"""
+        return await self.inflight.do(("details", patent_number), lambda: self._cached_patent_details(patent_number))
+    
+    async def _cached_patent_details(self, patent_number: str) -> Optional[Dict]:
+        """Serve patent details from the disk cache, fetching and storing them on a miss"""
+        if self.details_cache is None:
+            return await self._fetch_patent_details(patent_number)
+        
+        try:
+            details = await self.details_cache.aget(details_cache_key(patent_number))
+            if details is not None:
+                return details
+        except sqlite3.Error as e:
+            logger.warning(f"Patent details cache read failed: {str(e)}")
+        
+        return await self._fetch_and_cache_details(patent_number)
+    
+    async def _fetch_and_cache_details(self, patent_number: str) -> Optional[Dict]:
+        """Fetch patent details upstream and store them in the disk cache"""
+        details = await self._fetch_patent_details(patent_number)
+        if details is not None and self.details_cache is not None:
+            try:
+                await self.details_cache.aset(details_cache_key(patent_number), details)
+            except sqlite3.Error as e:
+                logger.warning(f"Patent details cache write failed: {str(e)}")
+        return details
+    
+    async def _cached_detail_numbers(self, patent_numbers: List[str]) -> Set[str]:
+        """Patent numbers whose details are in the disk cache"""
+        present = await self.details_cache.acontains_many([details_cache_key(number) for number in patent_numbers])
+        return {number for number in patent_numbers if details_cache_key(number) in present}
+    
+    async def prefetch_details(self, patents: List[Dict]) -> None:
+        """Queue background detail fetches for the top DETAILS_PREFETCH_TOP_N search results
+        
+        Only useful with the disk cache, which is where prefetched details are kept.
+        """
+        if self.details_cache is None or settings.DETAILS_PREFETCH_TOP_N <= 0:
+            return
+        await self.prefetcher.schedule(patent.get("patent_number") for patent in patents[:settings.DETAILS_PREFETCH_TOP_N])
+    
+    async def get_patent_details_batch(self, patent_numbers: List[str]) -> List[Dict]:
+        """Details for many patents: cached ones from one disk cache lookup, the rest fetched concurrently
+        
+        Returns one {"patent_number", "status", "cached", "details", "error"} item per distinct
+        number in request order; status is "ok", "not_found" or "error". At most
+        DETAILS_BATCH_CONCURRENCY upstream fetches run at once.
+        """
+        numbers = list(dict.fromkeys(patent_numbers))
+        cached: Dict[str, Dict] = {}
+        if self.details_cache is not None:
+            try:
+                found = await self.details_cache.aget_many([details_cache_key(number) for number in numbers])
+                cached = {number: found[details_cache_key(number)] for number in numbers if details_cache_key(number) in found}
+            except sqlite3.Error as e:
+                logger.warning(f"Patent details cache read failed: {str(e)}")
+        
+        semaphore = asyncio.Semaphore(settings.DETAILS_BATCH_CONCURRENCY)
+        
+        async def fetch(number: str) -> Dict:
+            item = {"patent_number": number, "status": "ok", "cached": False, "details": None, "error": None}
+            try:
+                async with semaphore:
+                    item["details"] = await self.inflight.do(("details", number), lambda: self._fetch_and_cache_details(number))
+            except HTTPException as e:
+                item.update(status="error", error=e.detail)
+            except Exception as e:
+                item.update(status="error", error=str(e))
+            else:
+                if item["details"] is None:
+                    item["status"] = "not_found"
+            return item
+        
+        fetched = await asyncio.gather(*(fetch(number) for number in numbers if number not in cached))
+        items = {item["patent_number"]: item for item in fetched}
+        upstream_log.info("details.batch", requested=len(numbers), cached=len(cached), fetched=len(fetched))
+        return [
+            {"patent_number": number, "status": "ok", "cached": True, "details": cached[number], "error": None}
+            if number in cached else items[number]
+            for number in numbers
+        ]
+    
+    async def _fetch_patent_details(self, patent_number: str) -> Optional[Dict]:
         """Get detailed information about a specific patent"""
-        logger.info(f"Getting patent details for: {patent_number}")
+        upstream_log.info("details.start", patent_number=patent_number)
         
         if not self.api_key:
             logger.error("SERPAPI_API_KEY not configured")
@@ -301,81 +432,73 @@ class SerpAPIService:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                logger.info(f"Making request to SerpAPI for patent: {patent_number}")
-                response = await client.get(self.base_url, params=params)
-                
-                # Log response status
-                logger.info(f"SerpAPI response status: {response.status_code}")
-                
-                # Check if response is successful
-                if response.status_code != 200:
-                    error_detail = f"SerpAPI returned status {response.status_code}"
-                    try:
-                        error_data = response.json()
-                        if "error" in error_data:
-                            error_detail = f"SerpAPI error: {error_data['error']}"
-                    except:
-                        error_detail = f"SerpAPI returned status {response.status_code}: {response.text}"
-                    
-                    logger.error(f"SerpAPI request failed: {error_detail}")
-                    raise HTTPException(
-                        status_code=502,
-                        detail=error_detail
-                    )
-                
-                # Parse JSON response with error handling
+            client = http_clients.get("serpapi")
+            upstream_log.debug("details.request", url=self.base_url, params=params)
+            started = time.perf_counter()
+            response = await self.guard.call(lambda timeout: client.get(self.base_url, params=params, timeout=timeout))
+            
+            upstream_log.info("details.response", status=response.status_code, elapsed_ms=round((time.perf_counter() - started) * 1000))
+            
+            # Check if response is successful
+            if response.status_code != 200:
+                error_detail = f"SerpAPI returned status {response.status_code}"
                 try:
-                    data = response.json()
-                except Exception as e:
-                    logger.error(f"Failed to parse SerpAPI JSON response: {str(e)}")
-                    logger.error(f"Raw response text: {response.text}")
-                    raise HTTPException(
-                        status_code=502,
-                        detail=f"Failed to parse SerpAPI response: {str(e)}"
-                    )
-                
-                # Log raw response when DEBUG is enabled
-                if settings.DEBUG:
-                    logger.debug(f"SerpAPI raw response: {json.dumps(data, indent=2)}")
-                
-                logger.info(f"SerpAPI response received, processing data")
-                
-                # Check if response contains an error field
-                if "error" in data:
-                    error_message = data.get("error", "Unknown SerpAPI error")
-                    logger.error(f"SerpAPI returned error: {error_message}")
-                    logger.error(f"Full SerpAPI error response: {json.dumps(data, indent=2)}")
-                    raise HTTPException(
-                        status_code=502,
-                        detail=error_message
-                    )
-                
-                # Safely check for organic_results
-                organic_results = data.get("organic_results", [])
-                if not organic_results:
-                    logger.info(f"No organic_results found in SerpAPI response")
-                    logger.info(f"Available keys in response: {list(data.keys())}")
-                    return None
-                
-                result = organic_results[0]
-                logger.info(f"Found patent details for: {patent_number}")
-                return {
-                    "title": result.get("title", ""),
-                    "snippet": result.get("snippet", ""),
-                    "publication_date": result.get("publication_date", ""),
-                    "inventor": result.get("inventor", ""),
-                    "assignee": result.get("assignee", ""),
-                    "patent_link": result.get("link", ""),
-                    "pdf": result.get("pdf", "")
-                }
+                    error_data = response.json()
+                    if "error" in error_data:
+                        error_detail = f"SerpAPI error: {error_data['error']}"
+                except:
+                    error_detail = f"SerpAPI returned status {response.status_code}: {response.text}"
                 
+                logger.error(f"SerpAPI request failed: {error_detail}")
+                raise HTTPException(
+                    status_code=502,
+                    detail=error_detail
+                )
+            
+            # Parse JSON response with error handling
+            try:
+                data = json_codec.loads(response.content)
+            except Exception as e:
+                logger.error(f"Failed to parse SerpAPI JSON response: {str(e)}")
+                upstream_log.payload(logging.ERROR, "details.unparsable_response", response.text, sampled=False)
+                raise HTTPException(
+                    status_code=502,
+                    detail=f"Failed to parse SerpAPI response: {str(e)}"
+                )
+            
+            upstream_log.payload(logging.DEBUG, "details.response_body", data)
+            
+            # Check if response contains an error field
+            if "error" in data:
+                error_message = data.get("error", "Unknown SerpAPI error")
+                logger.error(f"SerpAPI returned error: {error_message}")
+                upstream_log.payload(logging.ERROR, "details.error_response", data, sampled=False)
+                raise HTTPException(
+                    status_code=502,
+                    detail=error_message
+                )
+            
+            # Safely check for organic_results
+            organic_results = data.get("organic_results", [])
+            if not organic_results:
+                upstream_log.info("details.no_results", patent_number=patent_number, keys=list(data))
+                return None
+            
+            upstream_log.info("details.done", patent_number=patent_number)
+            return map_details(organic_results[0])
+            
         except httpx.RequestError as e:
             logger.error(f"Network error when calling SerpAPI: {str(e)}")
             raise HTTPException(
                 status_code=502,
                 detail=f"Network error when calling SerpAPI: {str(e)}"
             )
+        except UpstreamUnavailableError as e:
+            logger.warning(f"Not calling SerpAPI: {str(e)}")
+            raise HTTPException(
+                status_code=503,
+                detail=f"SerpAPI temporarily unavailable: {str(e)}"
+            )
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error when calling SerpAPI: {str(e)}")
             raise HTTPException(
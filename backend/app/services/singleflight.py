@@ -0,0 +1,64 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import logging
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key onto one in-flight task
+
+    The first caller for a key starts the task and later callers await the same
+    task, so they all get its result or its exception. A caller that is
+    cancelled stops waiting without affecting the others; the task itself is
+    only cancelled when its last waiter goes away. Keys are forgotten as soon as
+    the task finishes, so results are never reused after the fact.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._forget(key, call))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+                # The task only finishes cancelling on a later loop iteration; a caller arriving
+                # before then must start a fresh call instead of joining the cancelled one
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled() and call.task.exception() is not None and call.waiters == 0:
+            # Nobody is left to receive the error; log it instead of leaking a warning
+            logger.warning(f"In-flight call failed after its callers left: {call.task.exception()}")
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for the metrics endpoint"""
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced
+        }
@@ -0,0 +1,234 @@
+import json
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+from app.core.config import settings
+from app.services.storage import StorageService, IMMUTABLE_FIELDS, query_fingerprint
+
+logger = logging.getLogger(__name__)
+
+class _Table:
+    """How one storage collection maps onto a SQLite table"""
+
+    def __init__(self, name: str, columns: Tuple[str, ...], json_columns: Tuple[str, ...] = (), conflict: Tuple[str, ...] = ()):
+        self.name = name
+        self.columns = columns
+        self.json_columns = json_columns
+        self.conflict = conflict
+
+    def upsert_sql(self) -> str:
+        placeholders = ", ".join("?" for _ in self.columns)
+        sql = f"INSERT INTO {self.name} ({', '.join(self.columns)}) VALUES ({placeholders})"
+        if self.conflict:
+            updates = ", ".join(
+                f"{column} = excluded.{column}"
+                for column in self.columns
+                if column not in IMMUTABLE_FIELDS and column not in self.conflict
+            )
+            sql += f" ON CONFLICT ({', '.join(self.conflict)}) DO UPDATE SET {updates}"
+        return sql + " RETURNING *"
+
+    def to_row(self, record: Dict[str, Any]) -> List[Any]:
+        return [
+            json.dumps(record.get(column), default=str) if column in self.json_columns else record.get(column)
+            for column in self.columns
+        ]
+
+    def to_record(self, row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        for column in self.json_columns:
+            if record.get(column) is not None:
+                record[column] = json.loads(record[column])
+        return record
+
+# Tables mirror SavedPatent, SavedQuery, SavedAlert and SavedInventor in app/models/saved_items.py
+TABLES = {
+    "patents.json": _Table(
+        "saved_patents",
+        ("patent_number", "title", "abstract", "assignee", "inventors", "link", "date_filed",
+         "google_patents_link", "tags", "user_id", "created_at", "updated_at"),
+        json_columns=("inventors", "tags"),
+        conflict=("user_id", "patent_number"),
+    ),
+    "queries.json": _Table(
+        "saved_queries",
+        ("query", "filters", "hash", "user_id", "created_at", "updated_at"),
+        json_columns=("filters",),
+        conflict=("user_id", "hash"),
+    ),
+    "alerts.json": _Table(
+        "saved_alerts",
+        ("query", "frequency", "user_id", "created_at"),
+    ),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS saved_patents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    patent_number TEXT,
+    title TEXT NOT NULL,
+    abstract TEXT NOT NULL,
+    assignee TEXT NOT NULL,
+    inventors TEXT NOT NULL,
+    link TEXT,
+    date_filed TEXT,
+    google_patents_link TEXT,
+    tags TEXT,
+    user_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_saved_patents_user_patent ON saved_patents (user_id, patent_number);
+CREATE INDEX IF NOT EXISTS ix_saved_patents_user_created ON saved_patents (user_id, created_at, id);
+
+CREATE TABLE IF NOT EXISTS saved_inventors (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    linkedin_url TEXT,
+    associated_patent_id INTEGER REFERENCES saved_patents (id),
+    user_id TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_saved_inventors_user_id ON saved_inventors (user_id);
+
+CREATE TABLE IF NOT EXISTS saved_queries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    query TEXT NOT NULL,
+    filters TEXT,
+    hash TEXT,
+    user_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_saved_queries_user_hash ON saved_queries (user_id, hash);
+CREATE INDEX IF NOT EXISTS ix_saved_queries_user_created ON saved_queries (user_id, created_at, id);
+
+CREATE TABLE IF NOT EXISTS saved_alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    query TEXT NOT NULL,
+    frequency TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_saved_alerts_user_created ON saved_alerts (user_id, created_at, id);
+"""
+
+class SQLiteStorageService(StorageService):
+    """Storage backed by an embedded SQLite database in WAL mode
+
+    Exposes the same interface as the file backends. Writes go through a
+    single writer thread (SQLite allows one writer at a time); reads use a
+    connection per thread so they run concurrently with the writer.
+    """
+
+    def __init__(self, data_dir: Optional[str] = None, db_filename: Optional[str] = None):
+        self.data_dir = Path(data_dir or settings.DATA_DIR)
+        self.backend = "sqlite"
+        self.use_database = False
+        self.data_dir.mkdir(exist_ok=True)
+        self.db_path = self.data_dir / (db_filename or settings.SQLITE_FILENAME)
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._write_listeners = []
+
+        self._connection().executescript(SCHEMA)
+        self._rehash_queries()
+        logger.info(f"Using SQLite storage in {self.db_path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA synchronous={'FULL' if settings.STORAGE_FSYNC else 'NORMAL'}")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _rehash_queries(self) -> None:
+        """Move saved queries onto the canonical fingerprint used as their upsert key
+        
+        Queries saved under an older hash scheme would otherwise never match a new
+        save of the same query. Rows that turn out to be the same query collapse into
+        the earliest one, which takes the latest query text and filters.
+        """
+        table = TABLES["queries.json"]
+        connection = self._connection()
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in connection.execute("SELECT * FROM saved_queries ORDER BY created_at, id"):
+            record = table.to_record(row)
+            groups.setdefault((record["user_id"], query_fingerprint(record)), []).append(record)
+        
+        duplicates = []
+        updates = []
+        for (_, fingerprint), records in groups.items():
+            first, latest = records[0], records[-1]
+            duplicates.extend((record["id"],) for record in records[1:])
+            if len(records) > 1 or first["hash"] != fingerprint:
+                filters = json.dumps(latest["filters"], default=str)  # Encoded as _Table.to_row does
+                updates.append((latest["query"], filters, fingerprint, latest["updated_at"], first["id"]))
+        if not updates:
+            return
+        with connection:
+            # Duplicates go first so no survivor's new hash collides with them on the unique index
+            connection.executemany("DELETE FROM saved_queries WHERE id = ?", duplicates)
+            connection.executemany("UPDATE saved_queries SET query = ?, filters = ?, hash = ?, updated_at = ? WHERE id = ?", updates)
+        logger.info(f"Re-keyed {len(updates)} saved queries on their canonical fingerprint, merging {len(duplicates)} duplicates")
+    
+    def _upsert(self, filename: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        table = TABLES[filename]
+        connection = self._connection()
+        with connection:
+            row = connection.execute(table.upsert_sql(), table.to_row(record)).fetchone()
+        saved = table.to_record(row)
+        self._notify_write(filename, saved)
+        return saved
+
+    def submit_record(self, filename: str, record: Dict[str, Any]) -> Future:
+        """Queue a record for the writer thread"""
+        return self._writer.submit(self._upsert, filename, record)
+
+    def load_records(self, filename: str) -> List[Dict[str, Any]]:
+        """Load all records of a collection"""
+        table = TABLES[filename]
+        rows = self._connection().execute(f"SELECT * FROM {table.name} ORDER BY created_at, id")
+        return [table.to_record(row) for row in rows]
+
+    def get_user_records(self, filename: str, user_id: str, limit: Optional[int] = None, after: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """Get a user's records (or one keyset page) through the (user_id, created_at, id) index"""
+        table = TABLES[filename]
+        sql = f"SELECT * FROM {table.name} WHERE user_id = ?"
+        params: List[Any] = [user_id]
+        if after:
+            sql += " AND (created_at, id) > (?, ?)"
+            params.extend(after)
+        sql += " ORDER BY created_at, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self._connection().execute(sql, params)
+        return [table.to_record(row) for row in rows]
+
+    def compact(self, min_entries: int = 1) -> None:
+        """Fold the write-ahead log back into the database file"""
+        self._connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        """Finish pending writes, checkpoint and close every connection"""
+        self._writer.shutdown(wait=True)
+        self.compact()
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
@@ -1,23 +1,145 @@
+import asyncio
+import bisect
+import functools
 import json
 import os
+import queue
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 from datetime import datetime
 import logging
+import threading
+from app.core.config import settings
+from app.services.canonical_query import canonical_query
+from app.services.log_store import AppendOnlyLog
 
 logger = logging.getLogger(__name__)
 
+def query_fingerprint(record: Dict[str, Any]) -> Optional[str]:
+    """Canonical fingerprint of a saved query, recomputed so records saved under older hash schemes still match"""
+    query = record.get("query")
+    return canonical_query(query, filters=record.get("filters")).fingerprint if query is not None else None
+
+# Value that makes a record unique per user; saves with a matching key update in place
+UPSERT_KEYS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "patents.json": lambda record: record.get("patent_number"),
+    "queries.json": query_fingerprint,
+}
+
+# Fields an upsert never overwrites
+IMMUTABLE_FIELDS = ("id", "created_at")
+
+def record_sort_key(record: Dict[str, Any]) -> tuple:
+    """Listing order of saved items, also used as the keyset pagination position"""
+    return (record.get("created_at") or "", record.get("id") or 0)
+
+class _UserIndex:
+    """Parsed records of one collection grouped by user_id, plus the upsert key index"""
+    
+    def __init__(self, records: List[Dict[str, Any]], signature: Optional[tuple],
+                 upsert_key: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self.signature = signature
+        self.upsert_key = upsert_key
+        self.records: List[Dict[str, Any]] = []
+        self.by_user: Dict[str, List[Dict[str, Any]]] = {}
+        self.keys: Dict[tuple, Dict[str, Any]] = {}
+        self.max_id = 0
+        self.collapsed = 0  # Legacy duplicates merged into an earlier record while loading
+        for record in records:
+            self.add(record)
+    
+    def key(self, record: Dict[str, Any]) -> Optional[tuple]:
+        """(user_id, key value) for upsertable records, None otherwise"""
+        value = self.upsert_key(record) if self.upsert_key else None
+        return (record.get("user_id"), value) if value else None
+    
+    def add(self, record: Dict[str, Any]) -> None:
+        if isinstance(record.get("id"), int):
+            self.max_id = max(self.max_id, record["id"])
+        key = self.key(record)
+        existing = self.keys.get(key) if key else None
+        if existing is not None:
+            # Collapse duplicates left behind by saves made before upserts existed
+            existing.update({k: v for k, v in record.items() if k not in IMMUTABLE_FIELDS})
+            self.collapsed += 1
+            return
+        if key:
+            self.keys[key] = record
+        self.records.append(record)
+        # created_at is stamped before a save is queued, so commit order can differ from listing order.
+        # Records mostly arrive in order, which makes this an append after a binary search.
+        bisect.insort(self.by_user.setdefault(record.get("user_id"), []), record, key=record_sort_key)
+    
+    def get(self, user_id: str, limit: Optional[int] = None, after: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """A user's records in listing order, optionally one keyset page"""
+        user_records = self.by_user.get(user_id, [])
+        start = bisect.bisect_right(user_records, after, key=record_sort_key) if after else 0
+        end = None if limit is None else start + limit
+        return user_records[start:end]
+
+class _PendingWrite:
+    """A record waiting in the write queue for the next group commit"""
+    
+    def __init__(self, filename: str, record: Dict[str, Any], future: Future):
+        self.filename = filename
+        self.record = record
+        self.future = future
+
 class StorageService:
     """Service to handle file-based storage only"""
     
-    def __init__(self):
-        self.data_dir = Path("data")
+    COLLECTIONS = ("patents.json", "queries.json", "alerts.json")
+    
+    def __init__(self, data_dir: Optional[str] = None, backend: Optional[str] = None):
+        self.data_dir = Path(data_dir or settings.DATA_DIR)
+        self.backend = backend or settings.STORAGE_BACKEND
         self.use_database = False  # Force file storage for now
         
-        # additional test comment for commit 
         # Create data directory
         self.data_dir.mkdir(exist_ok=True)
-        logger.info(f"Using file-based storage in {self.data_dir}")
+        
+        # Per-user indexes so reads skip the disk parse
+        self._indexes: Dict[str, _UserIndex] = {}
+        self._index_lock = threading.Lock()
+        
+        # Next id per collection; only ever moves forward
+        self._next_ids: Dict[str, int] = {}
+        
+        self._write_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        
+        # Append-only logs replace whole-file rewrites in "log" mode
+        self._logs: Dict[str, AppendOnlyLog] = {}
+        self._compaction_stop = threading.Event()
+        self._compaction_thread: Optional[threading.Thread] = None
+        if self.backend == "log":
+            for filename in self.COLLECTIONS:
+                self._logs[filename] = AppendOnlyLog(self.data_dir, filename, fsync=settings.STORAGE_FSYNC)
+            self._compaction_thread = threading.Thread(
+                target=self._compaction_loop, name="storage-compaction", daemon=True
+            )
+            self._compaction_thread.start()
+        elif self.backend != "json":
+            raise ValueError(f"Unknown file storage backend: {self.backend}")
+        
+        # Single writer: saves queue up and are committed in batches
+        self._write_queue: "queue.Queue[Optional[_PendingWrite]]" = queue.Queue()
+        self._writer_thread = threading.Thread(target=self._writer_loop, name="storage-writer", daemon=True)
+        self._writer_thread.start()
+        
+        logger.info(f"Using file-based storage in {self.data_dir} ({self.backend} backend)")
+    
+    def add_write_listener(self, listener: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Call `listener(filename, record)` with every record once its save is committed"""
+        self._write_listeners.append(listener)
+    
+    def _notify_write(self, filename: str, record: Dict[str, Any]) -> None:
+        for listener in self._write_listeners:
+            try:
+                listener(filename, record)
+            except Exception as e:
+                logger.error(f"Storage write listener failed for {filename}: {e}")
     
     def _get_file_path(self, filename: str) -> Path:
         """Get the full path for a data file"""
@@ -36,23 +158,196 @@ class StorageService:
         return []
     
     def _save_json_file(self, filename: str, data: List[Dict[str, Any]]) -> bool:
-        """Save data to a JSON file"""
+        """Atomically replace a JSON file so readers never see a partial write"""
+        file_path = self._get_file_path(filename)
+        tmp_path = file_path.with_suffix(".json.tmp")
         try:
-            file_path = self._get_file_path(filename)
-            with open(file_path, 'w') as f:
+            with open(tmp_path, 'w') as f:
                 json.dump(data, f, indent=2, default=str)
+                f.flush()
+                if settings.STORAGE_FSYNC:
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
             return True
         except IOError as e:
             logger.error(f"Error saving {filename}: {e}")
             return False
     
-    # File methods
-    def save_patent_file(self, patent_data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
-        """Save patent to file"""
-        patents = self._load_json_file("patents.json")
+    def _compaction_loop(self) -> None:
+        """Periodically fold append-only logs into snapshots"""
+        while not self._compaction_stop.wait(settings.STORAGE_COMPACT_INTERVAL):
+            self.compact(min_entries=settings.STORAGE_COMPACT_MIN_ENTRIES)
+    
+    def compact(self, min_entries: int = 1) -> None:
+        """Compact every log that has at least `min_entries` pending entries"""
+        for log in self._logs.values():
+            if log.pending_entries >= min_entries:
+                log.compact()
+    
+    def close(self) -> None:
+        """Drain pending writes, stop background compaction and flush logs into snapshots"""
+        self._write_queue.put(None)
+        self._writer_thread.join()
+        self._compaction_stop.set()
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+        self.compact()
+        for log in self._logs.values():
+            log.close()
+    
+    def load_records(self, filename: str) -> List[Dict[str, Any]]:
+        """Load all records of a collection from the active backend"""
+        if self.backend == "log":
+            return self._logs[filename].records()
+        return self._load_json_file(filename)
+    
+    def _file_signature(self, filename: str) -> Optional[tuple]:
+        """Fingerprint a collection file so external changes invalidate its index"""
+        if self.backend == "log":
+            # The log backend owns its files; every write goes through _insert_record
+            return None
+        try:
+            stat = self._get_file_path(filename).stat()
+            return (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+    
+    def _get_index(self, filename: str) -> _UserIndex:
+        """Return the user index for a collection, rebuilding it if the file changed"""
+        signature = self._file_signature(filename)
+        index = self._indexes.get(filename)
+        if index is None or index.signature != signature:
+            index = _UserIndex(self.load_records(filename), signature, UPSERT_KEYS.get(filename))
+            if index.collapsed and self.backend == "log":
+                # Replay would merge the stale duplicates over later upserts again, so drop them for good.
+                # The json backend drops them on its next whole-file write.
+                self._logs[filename].rewrite(index.records)
+                logger.info(f"Dropped {index.collapsed} duplicate records from {filename}")
+            self._indexes[filename] = index
+        return index
+    
+    def get_user_records(self, filename: str, user_id: str, limit: Optional[int] = None, after: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """Get a user's records from a collection without re-reading the file
         
-        patent_record = {
-            "id": len(patents) + 1,
+        With `limit`, only the page following the (created_at, id) position `after` is returned.
+        """
+        with self._index_lock:
+            return self._get_index(filename).get(user_id, limit, after)
+    
+    def _writer_loop(self) -> None:
+        """Collect saves arriving within the commit window and commit them together"""
+        window = settings.STORAGE_COMMIT_WINDOW_MS / 1000
+        while True:
+            pending = self._write_queue.get()
+            if pending is None:
+                return
+            batch = [pending]
+            deadline = time.monotonic() + window
+            stopping = False
+            while len(batch) < settings.STORAGE_MAX_BATCH:
+                try:
+                    pending = self._write_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+            
+            by_file: Dict[str, List[_PendingWrite]] = {}
+            for pending in batch:
+                by_file.setdefault(pending.filename, []).append(pending)
+            for filename, writes in by_file.items():
+                self._commit(filename, writes)
+            if stopping:
+                return
+    
+    def _commit(self, filename: str, writes: List["_PendingWrite"]) -> None:
+        """Persist a batch of saves with one write, then resolve their futures
+        
+        Saves whose upsert key is already indexed (or appears earlier in the
+        same batch) update that record in place instead of appending a new one.
+        """
+        # Saves cancelled while queued (their awaiting request went away) are dropped;
+        # the rest can no longer be cancelled, so resolving their futures is always valid
+        writes = [pending for pending in writes if pending.future.set_running_or_notify_cancel()]
+        if not writes:
+            return
+        try:
+            with self._index_lock:
+                index = self._get_index(filename)
+            
+            inserts: List[Dict[str, Any]] = []
+            updates: Dict[int, tuple] = {}  # id() of indexed record -> (record, merged copy)
+            batch_keys: Dict[tuple, Dict[str, Any]] = {}
+            results: List[Dict[str, Any]] = []
+            for pending in writes:
+                record = pending.record
+                key = index.key(record)
+                target = batch_keys.get(key) or index.keys.get(key) if key else None
+                if target is None:
+                    inserts.append(record)
+                    if key:
+                        batch_keys[key] = record
+                    results.append(record)
+                    continue
+                
+                changes = {k: v for k, v in record.items() if k not in IMMUTABLE_FIELDS}
+                if target.get("id") is None:
+                    # Repeat of an insert from this same batch
+                    target.update(changes)
+                else:
+                    _, merged = updates.get(id(target), (target, dict(target)))
+                    merged.update(changes)
+                    updates[id(target)] = (target, merged)
+                    batch_keys[key] = target
+                results.append(target)
+            
+            next_id = max(self._next_ids.get(filename, 1), index.max_id + 1)
+            if self.backend == "log":
+                self._logs[filename].append_many([merged for _, merged in updates.values()] + inserts)
+            else:
+                for record in inserts:
+                    record["id"] = next_id
+                    next_id += 1
+                data = [updates[id(r)][1] if id(r) in updates else r for r in index.records] + inserts
+                if not self._save_json_file(filename, data):
+                    raise IOError(f"Failed to save {filename}")
+            
+            with self._index_lock:
+                for target, merged in updates.values():
+                    target.update(merged)
+                for record in inserts:
+                    index.add(record)
+                index.signature = self._file_signature(filename)
+            self._next_ids[filename] = max(next_id, index.max_id + 1)
+        except Exception as e:
+            logger.error(f"Error committing {len(writes)} records to {filename}: {e}")
+            for pending in writes:
+                pending.future.set_exception(e)
+            return
+        
+        # Listeners run before the saves resolve so a caller reads its own write; upserts of one record notify once
+        for result in {id(result): result for result in results}.values():
+            self._notify_write(filename, result)
+        for pending, result in zip(writes, results):
+            pending.future.set_result(result)
+    
+    def submit_record(self, filename: str, record: Dict[str, Any]) -> Future:
+        """Queue a new record for the next group commit"""
+        future: Future = Future()
+        self._write_queue.put(_PendingWrite(filename, record, future))
+        return future
+    
+    def _insert_record(self, filename: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Save a new record and wait for its batch to be committed"""
+        return self.submit_record(filename, record).result()
+    
+    # File methods
+    def new_patent_record(self, patent_data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+        """Build a patent record; its id is assigned at commit time"""
+        return {
+            "id": None,
             "patent_number": patent_data.get("patent_number"),
             "title": patent_data["title"],
             "abstract": patent_data["abstract"],
@@ -66,18 +361,11 @@ class StorageService:
             "created_at": datetime.now().isoformat(),
             "updated_at": datetime.now().isoformat()
         }
-        
-        patents.append(patent_record)
-        if self._save_json_file("patents.json", patents):
-            return patent_record
-        raise Exception("Failed to save patent to file")
     
-    def save_query_file(self, query: str, user_id: str, filters: Optional[Dict[str, Any]] = None, hash_value: Optional[str] = None) -> Dict[str, Any]:
-        """Save query to file"""
-        queries = self._load_json_file("queries.json")
-        
-        query_record = {
-            "id": len(queries) + 1,
+    def new_query_record(self, query: str, user_id: str, filters: Optional[Dict[str, Any]] = None, hash_value: Optional[str] = None) -> Dict[str, Any]:
+        """Build a query record; its id is assigned at commit time"""
+        return {
+            "id": None,
             "query": query,
             "filters": filters,
             "hash": hash_value,
@@ -85,39 +373,47 @@ class StorageService:
             "created_at": datetime.now().isoformat(),
             "updated_at": datetime.now().isoformat()
         }
-        
-        queries.append(query_record)
-        if self._save_json_file("queries.json", queries):
-            return query_record
-        raise Exception("Failed to save query to file")
     
-    def save_alert_file(self, query: str, frequency: str, user_id: str) -> Dict[str, Any]:
-        """Save alert to file"""
-        alerts = self._load_json_file("alerts.json")
-        
-        alert_record = {
-            "id": len(alerts) + 1,
+    def new_alert_record(self, query: str, frequency: str, user_id: str) -> Dict[str, Any]:
+        """Build an alert record; its id is assigned at commit time"""
+        return {
+            "id": None,
             "query": query,
             "frequency": frequency,
             "user_id": user_id,
             "created_at": datetime.now().isoformat()
         }
-        
-        alerts.append(alert_record)
-        if self._save_json_file("alerts.json", alerts):
-            return alert_record
-        raise Exception("Failed to save alert to file")
+    
+    def save_patent_file(self, patent_data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+        """Save patent to file"""
+        patent_record = self.new_patent_record(patent_data, user_id)
+        try:
+            return self._insert_record("patents.json", patent_record)
+        except IOError:
+            raise Exception("Failed to save patent to file")
+    
+    def save_query_file(self, query: str, user_id: str, filters: Optional[Dict[str, Any]] = None, hash_value: Optional[str] = None) -> Dict[str, Any]:
+        """Save query to file"""
+        query_record = self.new_query_record(query, user_id, filters, hash_value)
+        try:
+            return self._insert_record("queries.json", query_record)
+        except IOError:
+            raise Exception("Failed to save query to file")
+    
+    def save_alert_file(self, query: str, frequency: str, user_id: str) -> Dict[str, Any]:
+        """Save alert to file"""
+        alert_record = self.new_alert_record(query, frequency, user_id)
+        try:
+            return self._insert_record("alerts.json", alert_record)
+        except IOError:
+            raise Exception("Failed to save alert to file")
     
     # Watchlist methods
     def get_watchlist_file(self, user_id: str) -> Dict[str, Any]:
         """Get all saved patents and queries from files"""
         try:
-            patents = self._load_json_file("patents.json")
-            queries = self._load_json_file("queries.json")
-            
-            # Filter by user_id
-            user_patents = [p for p in patents if p.get("user_id") == user_id]
-            user_queries = [q for q in queries if q.get("user_id") == user_id]
+            user_patents = self.get_user_records("patents.json", user_id)
+            user_queries = self.get_user_records("queries.json", user_id)
             
             return {
                 "patents": user_patents,
@@ -127,5 +423,81 @@ class StorageService:
             logger.error(f"Error fetching watchlist from files: {e}")
             raise
 
-# Global storage service instance
-storage_service = StorageService()
+class AsyncStorageService:
+    """Async interface to StorageService for use from route handlers
+    
+    File I/O and JSON encoding run on a bounded thread pool so a large
+    collection never stalls the event loop.
+    """
+    
+    def __init__(self, storage: StorageService, max_workers: Optional[int] = None):
+        self.storage = storage
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.STORAGE_IO_WORKERS,
+            thread_name_prefix="storage-io"
+        )
+    
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def _save(self, filename: str, record: Dict[str, Any], kind: str) -> Dict[str, Any]:
+        # Saves wait on the group-commit future instead of parking an executor thread
+        try:
+            return await asyncio.wrap_future(self.storage.submit_record(filename, record))
+        except IOError:
+            raise Exception(f"Failed to save {kind} to file")
+    
+    async def save_patent(self, patent_data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+        return await self._save("patents.json", self.storage.new_patent_record(patent_data, user_id), "patent")
+    
+    async def save_query(self, query: str, user_id: str, filters: Optional[Dict[str, Any]] = None, hash_value: Optional[str] = None) -> Dict[str, Any]:
+        return await self._save("queries.json", self.storage.new_query_record(query, user_id, filters, hash_value), "query")
+    
+    async def save_alert(self, query: str, frequency: str, user_id: str) -> Dict[str, Any]:
+        return await self._save("alerts.json", self.storage.new_alert_record(query, frequency, user_id), "alert")
+    
+    async def get_user_records(self, filename: str, user_id: str, limit: Optional[int] = None, after: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        return await self._run(self.storage.get_user_records, filename, user_id, limit, after)
+    
+    async def get_watchlist(self, user_id: str) -> Dict[str, Any]:
+        return await self._run(self.storage.get_watchlist_file, user_id)
+    
+    def close(self) -> None:
+        """Wait for in-flight I/O, then close the underlying storage"""
+        self._executor.shutdown(wait=True)
+        self.storage.close()
+
+def create_storage_service(data_dir: Optional[str] = None, backend: Optional[str] = None) -> StorageService:
+    """Build the storage service for the configured STORAGE_BACKEND"""
+    backend = backend or settings.STORAGE_BACKEND
+    if backend == "sqlite":
+        from app.services.sqlite_store import SQLiteStorageService
+        return SQLiteStorageService(data_dir)
+    return StorageService(data_dir, backend)
+
+# Global storage service instances
+storage_service = create_storage_service()
+async_storage_service = AsyncStorageService(storage_service)
+
+# Store served by get_storage(); switch with use_storage()
+_active_storage = async_storage_service
+
+def use_storage(store: str) -> None:
+    """Switch saved items between the file store and the SQL database at runtime"""
+    global _active_storage
+    if store == "file":
+        _active_storage = async_storage_service
+    elif store == "database":
+        from app.services.repository import SavedItemsRepository
+        _active_storage = SavedItemsRepository()
+    else:
+        raise ValueError(f"Unknown saved items store: {store}")
+    logger.info(f"Saved items now served from the {store} store")
+
+def get_storage() -> AsyncStorageService:
+    """Dependency returning the active async storage interface"""
+    return _active_storage
+
+if settings.SAVED_ITEMS_STORE != "file":
+    use_storage(settings.SAVED_ITEMS_STORE)
@@ -1,7 +1,7 @@
-import httpx
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from app.core.config import settings
+from app.services.http_client import http_clients
 
 class TrendsService:
     def __init__(self):
@@ -19,28 +19,28 @@ class TrendsService:
             "o": 1000  # Get more results for trend analysis
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/patents", params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Process data to create trends
-            monthly_counts = {}
-            if "patents" in data:
-                for patent in data["patents"]:
-                    filing_date = patent.get("filing_date")
-                    if filing_date:
-                        month_key = filing_date[:7]  # YYYY-MM format
-                        monthly_counts[month_key] = monthly_counts.get(month_key, 0) + 1
-            
-            return {
-                "technology_area": technology_area,
-                "period_days": days,
-                "monthly_trends": monthly_counts,
-                "total_patents": len(data.get("patents", [])),
-                "trend_direction": self._calculate_trend_direction(monthly_counts)
-            }
-    
+        client = http_clients.get("patentsview")
+        response = await client.get(f"{self.base_url}/patents", params=params)
+        response.raise_for_status()
+        data = response.json()
+        
+        # Process data to create trends
+        monthly_counts = {}
+        if "patents" in data:
+            for patent in data["patents"]:
+                filing_date = patent.get("filing_date")
+                if filing_date:
+                    month_key = filing_date[:7]  # YYYY-MM format
+                    monthly_counts[month_key] = monthly_counts.get(month_key, 0) + 1
+        
+        return {
+            "technology_area": technology_area,
+            "period_days": days,
+            "monthly_trends": monthly_counts,
+            "total_patents": len(data.get("patents", [])),
+            "trend_direction": self._calculate_trend_direction(monthly_counts)
+        }
+
     async def get_top_assignees(self, technology_area: str, limit: int = 10) -> List[Dict]:
         """Get top patent assignees in a technology area"""
         params = {
@@ -50,26 +50,26 @@ class TrendsService:
             "o": 1000
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/patents", params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Count assignees
-            assignee_counts = {}
-            if "patents" in data:
-                for patent in data["patents"]:
-                    assignee = patent.get("assignee_name")
-                    if assignee:
-                        assignee_counts[assignee] = assignee_counts.get(assignee, 0) + 1
-            
-            # Sort by count and return top results
-            sorted_assignees = sorted(assignee_counts.items(), key=lambda x: x[1], reverse=True)
-            return [
-                {"assignee": assignee, "patent_count": count}
-                for assignee, count in sorted_assignees[:limit]
-            ]
-    
+        client = http_clients.get("patentsview")
+        response = await client.get(f"{self.base_url}/patents", params=params)
+        response.raise_for_status()
+        data = response.json()
+        
+        # Count assignees
+        assignee_counts = {}
+        if "patents" in data:
+            for patent in data["patents"]:
+                assignee = patent.get("assignee_name")
+                if assignee:
+                    assignee_counts[assignee] = assignee_counts.get(assignee, 0) + 1
+        
+        # Sort by count and return top results
+        sorted_assignees = sorted(assignee_counts.items(), key=lambda x: x[1], reverse=True)
+        return [
+            {"assignee": assignee, "patent_count": count}
+            for assignee, count in sorted_assignees[:limit]
+        ]
+
     async def get_emerging_technologies(self, days: int = 90) -> List[Dict]:
         """Identify emerging technology trends based on recent patent filings"""
         end_date = datetime.now()
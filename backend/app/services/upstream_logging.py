@@ -0,0 +1,79 @@
+import json
+import logging
+import random
+from typing import Any, Dict
+from app.core.config import settings
+
+# Never written to logs, wherever they appear in an event's fields
+REDACTED_FIELDS = frozenset({"api_key"})
+
+def _redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: "***" if k in REDACTED_FIELDS else v for k, v in value.items()}
+    return value
+
+def truncate(value: Any, limit: int) -> str:
+    """Render a payload as compact JSON, cut to `limit` characters"""
+    text = value if isinstance(value, str) else json.dumps(_redact(value), default=str, separators=(",", ":"))
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... ({len(text)} chars)"
+
+class _Event:
+    """Log message that is only formatted if a handler actually emits it"""
+    __slots__ = ("service", "event", "fields")
+
+    def __init__(self, service: str, event: str, fields: Dict[str, Any]):
+        self.service = service
+        self.event = event
+        self.fields = fields
+
+    def __str__(self) -> str:
+        fields = {k: _redact(v) for k, v in self.fields.items() if k not in REDACTED_FIELDS}
+        if settings.UPSTREAM_LOG_FORMAT == "json":
+            return json.dumps({"service": self.service, "event": self.event, **fields}, default=str)
+        return " ".join([f"{self.service} {self.event}"] + [f"{k}={v}" for k, v in fields.items()])
+
+class UpstreamLogger:
+    """Logging for upstream API calls: lazy formatting, sampled payloads and truncated bodies
+
+    Nothing is formatted unless the level is enabled. Events are one line of
+    key=value pairs, or JSON objects when UPSTREAM_LOG_FORMAT is "json".
+    Whole request/response payloads are only logged for a sampled fraction of
+    calls (UPSTREAM_LOG_SAMPLE_RATE) and cut to UPSTREAM_LOG_MAX_BODY characters.
+    """
+
+    def __init__(self, service: str, logger: logging.Logger):
+        self.service = service
+        self.logger = logger
+
+    def event(self, level: int, event: str, **fields: Any) -> None:
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, "%s", _Event(self.service, event, fields))
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self.event(logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self.event(logging.INFO, event, **fields)
+
+    def error(self, event: str, **fields: Any) -> None:
+        self.event(logging.ERROR, event, **fields)
+
+    def payload(self, level: int, event: str, payload: Any, sampled: bool = True, **fields: Any) -> None:
+        """Log a truncated payload; sampled payloads are logged for only a fraction of calls"""
+        if not self.logger.isEnabledFor(level):
+            return
+        if sampled and random.random() >= settings.UPSTREAM_LOG_SAMPLE_RATE:
+            return
+        self.logger.log(level, "%s", _Event(self.service, event, dict(fields, body=_Truncated(payload))))
+
+class _Truncated:
+    """Payload rendered and truncated at emit time"""
+    __slots__ = ("payload",)
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+
+    def __str__(self) -> str:
+        return truncate(self.payload, settings.UPSTREAM_LOG_MAX_BODY)
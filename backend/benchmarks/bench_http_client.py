@@ -0,0 +1,85 @@
+"""Compare a new httpx client per request against the shared upstream client
+
+Usage (from backend/):
+    python -m benchmarks.bench_http_client --requests 500 --concurrency 10
+
+Requests go to a local stand-in server that answers every request with a small
+SerpAPI-shaped JSON body and keeps connections alive, so the difference is
+connection setup only. Against a real HTTPS upstream the gap also includes DNS
+and the TLS handshake, and is larger.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import httpx
+from app.services.http_client import HTTPClientRegistry
+
+BODY = json.dumps({"organic_results": [{"title": "Benchmark patent", "link": "https://patents.google.com/patent/US1234567"}]}).encode()
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Minimal HTTP/1.1 keep-alive responder"""
+    try:
+        while True:
+            request = await reader.readuntil(b"\r\n\r\n")
+            if not request:
+                break
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(BODY)}\r\n\r\n".encode()
+                + BODY
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+async def run(get, url: str, requests: int, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def fetch():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await get(url)
+            response.json()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(fetch() for _ in range(requests)))
+    return latencies
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/search.json"
+
+    async def per_call(url: str) -> httpx.Response:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            return await client.get(url)
+
+    registry = HTTPClientRegistry()
+    shared = registry.get("serpapi").get
+
+    for name, get in (("per-call", per_call), ("shared", shared)):
+        started = time.perf_counter()
+        latencies = await run(get, url, args.requests, args.concurrency)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:>8}: {args.requests / elapsed:,.0f} req/s, "
+            f"mean {statistics.mean(latencies) * 1000:.2f} ms, "
+            f"p95 {statistics.quantiles(latencies, n=20)[-1] * 1000:.2f} ms"
+        )
+
+    await registry.close()
+    server.close()
+    await server.wait_closed()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+"""Measure local BM25 search latency over saved patents and seen search results
+
+Usage (from backend/):
+    python -m benchmarks.bench_local_search --saved 5000 --results 10000 --queries 500
+"""
+import argparse
+import itertools
+import random
+import statistics
+import time
+from app.services.local_search import LocalSearchIndex
+
+TOPICS = (
+    "hydroponic nutrient delivery pump sensor light led spectrum tower vertical farm irrigation "
+    "valve controller moisture soil substrate root zone aeration mist aeroponic reservoir ph "
+    "conductivity dosing greenhouse climate humidity fan ventilation seed tray germination harvest"
+).split()
+
+# A few topic words plus a long tail of rarer terms, roughly like patent text
+VOCABULARY = TOPICS + [f"term{i}" for i in range(5000)]
+CUMULATIVE_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+
+def text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(VOCABULARY, cum_weights=CUMULATIVE_WEIGHTS, k=words))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--saved", type=int, default=5000)
+    parser.add_argument("--results", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    index = LocalSearchIndex(max_results=args.results)
+    started = time.perf_counter()
+    for i in range(args.saved):
+        index.add_saved_patent({
+            "patent_number": f"US{i:08d}", "title": text(rng, 6), "abstract": text(rng, 60),
+            "assignee": "Benchmark Co", "inventors": [{"name": "Jane Doe"}], "user_id": f"user{i % 10}",
+        })
+    index.add_search_results({
+        "patent_number": f"EP{i:08d}", "title": text(rng, 6), "snippet": text(rng, 40),
+        "assignee": "Other Co", "inventor": "John Roe",
+    } for i in range(args.results))
+    print(f"indexed {index.stats()['documents']} documents in {time.perf_counter() - started:.2f}s")
+
+    timings = []
+    for _ in range(args.queries):
+        query = " ".join(rng.sample(TOPICS, rng.randint(1, 3)) + [text(rng, 1)])
+        started = time.perf_counter()
+        index.search(query, "user0", limit=20)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    print(f"search: median {statistics.median(timings):.2f} ms, p95 {timings[int(len(timings) * 0.95)]:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compare patent-number extraction against the per-call `import re` implementation it replaced
+
+Usage (from backend/):
+    python -m benchmarks.bench_patent_numbers --pages 2000 --page-size 100
+
+"cold" clears the LRU cache before every page, so it measures the
+precompiled patterns alone; "warm" re-extracts pages already seen, which is
+what repeated and paged searches for the same query do.
+"""
+import argparse
+import random
+import time
+from app.services.patent_numbers import extract_patent_number, extract_patent_numbers
+
+def legacy_extract_patent_number(link: str, title: str) -> str:
+    """SerpAPIService._extract_patent_number before the patent_numbers module"""
+    import re
+
+    if "patents.google.com/patent/" in link:
+        match = re.search(r'patents\.google\.com/patent/([A-Z0-9]+)', link)
+        if match:
+            return match.group(1)
+
+    patent_patterns = [
+        r'patent/([A-Z0-9]+)',
+        r'([A-Z]{2,3}\d{1,3}[A-Z0-9]*)',
+        r'([A-Z]{2}\d{6,7})',
+    ]
+
+    for pattern in patent_patterns:
+        match = re.search(pattern, link)
+        if match:
+            return match.group(1)
+
+    for pattern in patent_patterns:
+        match = re.search(pattern, title)
+        if match:
+            return match.group(1)
+
+    if link:
+        parts = link.split('/')
+        if len(parts) > 1:
+            last_part = parts[-1]
+            last_part = last_part.split('?')[0].split('#')[0]
+            if last_part and len(last_part) > 3:
+                return last_part
+
+    return ""
+
+def make_page(rng: random.Random, size: int) -> list:
+    results = []
+    for _ in range(size):
+        number = f"{rng.choice(['US', 'EP', 'WO', 'CN'])}{rng.randint(1000000, 99999999)}{rng.choice(['A1', 'B2', ''])}"
+        link = rng.choice([
+            f"https://patents.google.com/patent/{number}/en",
+            f"https://www.freepatentsonline.com/{number[2:]}.html",
+            f"https://example.com/docs/{number}",
+        ])
+        results.append({"link": link, "title": f"Hydroponic nutrient delivery system ({number})"})
+    return results
+
+def timed(fn, pages: list) -> float:
+    started = time.perf_counter()
+    for page in pages:
+        fn(page)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    pages = [make_page(rng, args.page_size) for _ in range(args.pages)]
+
+    def legacy(page):
+        return [legacy_extract_patent_number(r.get("link", ""), r.get("title", "")) for r in page]
+
+    def cold(page):
+        extract_patent_number.cache_clear()
+        return extract_patent_numbers(page)
+
+    for page in pages[:50]:
+        assert legacy(page) == cold(page)
+
+    baseline = timed(legacy, pages)
+    results = {"legacy": baseline, "cold": timed(cold, pages)}
+    extract_patent_numbers(pages[0])
+    results["warm"] = timed(extract_patent_numbers, [pages[0]] * args.pages)
+
+    for name, elapsed in results.items():
+        per_page = elapsed / args.pages * 1e6
+        print(f"{name:>6}: {per_page:8.1f} us/page  ({baseline / elapsed:5.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Compare rendering API responses: pydantic models + jsonable_encoder + JSONResponse vs trusted projection + FastJSONResponse
+
+Usage (from backend/):
+    python -m benchmarks.bench_response_rendering --watchlist 10000 --results 50 --repeat 20
+
+Covers a saved patents listing (one SavedPatentResponse per record before) and a
+SerpAPI search page (encoded by jsonable_encoder before). Install orjson to
+measure the fast encoder; otherwise only the skipped validation differs.
+"""
+import argparse
+import time
+from datetime import datetime
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.routers.saved_items import project_records
+from app.schemas.saved_items import SavedPatentResponse
+from app.services import json_codec
+from app.services.json_codec import FastJSONResponse
+
+def make_watchlist(items: int) -> list:
+    """Saved patent records as the storage layer returns them"""
+    created_at = datetime(2024, 1, 1).isoformat()
+    return [{
+        "id": i + 1,
+        "patent_number": f"US{1000000 + i}B2",
+        "title": f"Hydroponic nutrient delivery system {i}",
+        "abstract": "A system for delivering nutrients to plants grown without soil " * 3,
+        "assignee": "Benchmark Co",
+        "inventors": [{"name": "Jane Doe"}, {"name": "John Roe"}],
+        "link": f"https://patents.google.com/patent/US{1000000 + i}B2",
+        "google_patents_link": f"https://patents.google.com/patent/US{1000000 + i}B2",
+        "date_filed": "2020-05-01T00:00:00",
+        "tags": ["hydroponics"],
+        "user_id": "dev",
+        "created_at": created_at,
+    } for i in range(items)]
+
+def make_search_page(results: int) -> dict:
+    """A search response body as search_patents_serpapi builds it"""
+    return {
+        "results": [{
+            "title": f"Hydroponic nutrient delivery system {i}",
+            "snippet": "A system for delivering nutrients to plants grown without soil " * 4,
+            "publication_date": "2023-01-10",
+            "inventor": "Jane Doe",
+            "assignee": "Benchmark Co",
+            "patent_link": f"https://patents.google.com/patent/US{1000000 + i}B2",
+            "patent_number": f"US{1000000 + i}B2",
+            "pdf": f"https://patentimages.storage.googleapis.com/US{1000000 + i}B2.pdf",
+        } for i in range(results)],
+        "query": "hydroponics",
+        "count": results,
+        "source": "serpapi",
+        "cached": False,
+        "filters": {"start_year": None, "end_year": None},
+    }
+
+def legacy_watchlist(records: list) -> bytes:
+    models = [SavedPatentResponse(**record) for record in records]
+    return JSONResponse(jsonable_encoder(models)).body
+
+def current_watchlist(records: list) -> bytes:
+    return FastJSONResponse(project_records(records, SavedPatentResponse)).body
+
+def legacy_search(page: dict) -> bytes:
+    return JSONResponse(jsonable_encoder(page)).body
+
+def current_search(page: dict) -> bytes:
+    return FastJSONResponse(page).body
+
+def measure(fn, content, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(content)
+    return (time.perf_counter() - started) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--watchlist", type=int, default=10000)
+    parser.add_argument("--results", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(f"encoder: {json_codec.BACKEND}")
+
+    cases = (
+        (f"saved patents ({args.watchlist})", make_watchlist(args.watchlist), legacy_watchlist, current_watchlist, args.repeat),
+        (f"search page ({args.results})", make_search_page(args.results), legacy_search, current_search, args.repeat * 50),
+    )
+    for name, content, legacy, current, repeat in cases:
+        before = measure(legacy, content, repeat)
+        after = measure(current, content, repeat)
+        print(f"{name:>22}: {before * 1000:8.2f} ms -> {after * 1000:7.2f} ms ({before / after:4.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Compare decoding and mapping SerpAPI search payloads: response.json() + per-result mapping vs json_codec + map_organic_results
+
+Usage (from backend/):
+    python -m benchmarks.bench_serpapi_decode --results 100 --repeat 200
+    python -m benchmarks.bench_serpapi_decode --payload recorded_search.json
+
+--payload takes a recorded SerpAPI google_patents response (e.g. saved from the
+SerpAPI playground); without it a synthetic payload with the same shape is used.
+Install orjson to measure the fast decoder; otherwise both sides use the
+standard library and only the mapping differs.
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from pathlib import Path
+from app.services import json_codec
+from app.services.patent_numbers import extract_patent_number
+from app.services.serpapi import map_organic_results
+from benchmarks.bench_patent_numbers import legacy_extract_patent_number
+
+def make_payload(results: int) -> bytes:
+    """Synthetic google_patents response: the eight mapped fields plus the extras SerpAPI sends"""
+    rng = random.Random(42)
+    organic_results = []
+    for i in range(results):
+        number = f"US{rng.randint(1000000, 99999999)}B2"
+        organic_results.append({
+            "position": i + 1,
+            "rank": i,
+            "patent_id": f"patent/{number}/en",
+            "serpapi_link": f"https://serpapi.com/search.json?engine=google_patents_details&patent_id=patent%2F{number}%2Fen",
+            "link": f"https://patents.google.com/patent/{number}/en",
+            "title": f"Hydroponic nutrient delivery system {i}",
+            "snippet": "A system for delivering nutrients to plants grown without soil " * 4,
+            "priority_date": "2019-05-01",
+            "filing_date": "2020-05-01",
+            "grant_date": "2023-01-10",
+            "publication_date": "2023-01-10",
+            "inventor": "Jane Doe",
+            "assignee": "Benchmark Co",
+            "publication_number": number,
+            "language": "en",
+            "thumbnail": f"https://patentimages.storage.googleapis.com/{number}/thumb.png",
+            "pdf": f"https://patentimages.storage.googleapis.com/{number}.pdf",
+            "figures": [{"thumbnail": f"https://patentimages.storage.googleapis.com/{number}/f{j}.png",
+                         "full": f"https://patentimages.storage.googleapis.com/{number}/F{j}.png"} for j in range(8)],
+            "country_status": {"US": "ACTIVE", "EP": "PENDING", "CN": "ACTIVE"},
+        })
+    payload = {
+        "search_metadata": {"id": "benchmark", "status": "Success", "total_time_taken": 1.23},
+        "search_parameters": {"engine": "google_patents", "q": "hydroponics", "num": results},
+        "search_information": {"total_results": 12345, "page_number": 1},
+        "summary": {"assignee": [{"key": "Benchmark Co", "percentage": 12.5}] * 20},
+        "organic_results": organic_results,
+    }
+    return json.dumps(payload).encode()
+
+def legacy(content: bytes) -> list:
+    """Decode and map the way search_patents did before json_codec and map_organic_results"""
+    data = json.loads(content)
+    patents = []
+    for result in data.get("organic_results", []):
+        patent_link = result.get("link", "")
+        patent_number = legacy_extract_patent_number(patent_link, result.get("title", ""))
+        google_patents_url = f"https://patents.google.com/patent/{patent_number}" if patent_number else patent_link
+        patents.append({
+            "title": result.get("title", ""),
+            "snippet": result.get("snippet", ""),
+            "publication_date": result.get("publication_date", ""),
+            "inventor": result.get("inventor", ""),
+            "assignee": result.get("assignee", ""),
+            "patent_link": google_patents_url,
+            "patent_number": patent_number,
+            "pdf": result.get("pdf", "")
+        })
+    return patents
+
+def current(content: bytes) -> list:
+    extract_patent_number.cache_clear()  # Every response is new to the cache
+    return map_organic_results(json_codec.loads(content).get("organic_results", []))
+
+def measure(fn, content: bytes, repeat: int) -> tuple:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(content)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    fn(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--payload", type=Path)
+    args = parser.parse_args()
+
+    content = args.payload.read_bytes() if args.payload else make_payload(args.results)
+    assert legacy(content) == current(content)
+    print(f"payload {len(content) / 1024:,.0f} KiB, decoder: {json_codec.BACKEND}")
+
+    baseline = None
+    for name, fn in (("legacy", legacy), ("current", current)):
+        elapsed, peak = measure(fn, content, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{name:>8}: {elapsed * 1000:7.2f} ms/response ({baseline / elapsed:4.1f}x), peak {peak / 1024:,.0f} KiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from app.main import app
+from app.routers.patents import serpapi_service
+from app.services.cache import TTLCache
+from app.services.serpapi import search_cache_key
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def fake_search(monkeypatch):
+    """Replace the SerpAPI call with a counting stub and start from an empty cache."""
+    calls = []
+
+    async def search_patents(query, limit=10, start_year=None, end_year=None, page=None):
+        calls.append((query, limit, start_year, end_year))
+        return [{"title": f"{query} result {len(calls)}", "patent_number": "US1234567"}]
+
+    monkeypatch.setattr(serpapi_service, "search_patents", search_patents)
+    serpapi_service.search_cache.clear()
+    yield calls
+    serpapi_service.search_cache.clear()
+
+@pytest.mark.asyncio
+async def test_fresh_entries_are_hits():
+    """Test that a loaded value is served from cache until the TTL passes"""
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, max_entries=10, clock=clock)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return len(loads)
+
+    assert await cache.get_or_load("key", loader) == (1, False)
+    clock.now = 9
+    assert await cache.get_or_load("key", loader) == (1, True)
+    clock.now = 11
+    assert await cache.get_or_load("key", loader) == (2, False)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+@pytest.mark.asyncio
+async def test_stale_entries_refresh_in_background():
+    """Test that a stale entry is served once while a single refresh runs"""
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, stale_ttl=10, max_entries=10, clock=clock)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0)
+        return len(loads)
+
+    await cache.get_or_load("key", loader)
+    clock.now = 15
+    assert await cache.get_or_load("key", loader) == (1, True)
+    assert await cache.get_or_load("key", loader) == (1, True)
+    await asyncio.gather(*cache._tasks)
+
+    assert len(loads) == 2
+    assert cache.get("key") == (2, "fresh")
+    assert cache.stats()["stale_hits"] == 2
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_stale_value():
+    """Test that a refresh error is counted and the old value kept"""
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, stale_ttl=10, max_entries=10, clock=clock)
+    cache.set("key", "old")
+
+    async def loader():
+        raise RuntimeError("upstream down")
+
+    clock.now = 15
+    assert await cache.get_or_load("key", loader) == ("old", True)
+    await asyncio.gather(*cache._tasks)
+    assert cache.get("key") == ("old", "stale")
+    assert cache.stats()["refresh_errors"] == 1
+
+def test_lru_eviction_by_entries_and_bytes():
+    """Test that the least recently used entries are evicted first"""
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") == (None, None)
+    assert cache.get("a") == (1, "fresh")
+    assert cache.stats()["evictions"] == 1
+
+    cache = TTLCache(ttl=60, max_entries=100, max_bytes=20)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    assert cache.get("a") == (None, None)
+    assert cache.stats()["bytes"] == 12
+
+def test_search_cache_key_normalizes_query():
+    """Test that whitespace and case differences share a cache entry"""
+    assert search_cache_key("  Vertical   Farming ", 10) == search_cache_key("vertical farming", 10)
+    assert search_cache_key("vertical farming", 10) != search_cache_key("vertical farming", 20)
+
+@pytest.mark.asyncio
+async def test_search_endpoint_reports_cache_hits(fake_search):
+    """Test that a repeated search skips SerpAPI and says it was cached"""
+    params = {"query": "hydroponics", "limit": 5}
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        first = await client.get("/api/patents/search/serpapi", params=params)
+        second = await client.get("/api/patents/search/serpapi", params=dict(params, query="Hydroponics"))
+        metrics = await client.get("/api/metrics")
+
+    assert first.json()["cached"] is False
+    assert second.json()["cached"] is True
+    assert second.json()["results"] == first.json()["results"]
+    assert len(fake_search) == 1
+    assert metrics.json()["search_cache"]["hits"] == 1
+    assert metrics.json()["search_cache"]["misses"] == 1
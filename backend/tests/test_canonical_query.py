@@ -0,0 +1,44 @@
+import pytest
+from app.routers.saved_items import hash_query
+from app.services.canonical_query import CanonicalQuery, canonical_query
+from app.services.serpapi import search_cache_key
+
+def test_whitespace_case_and_unicode_are_normalized():
+    assert canonical_query("  Hydroponic\tNutrient  ") == CanonicalQuery("hydroponic nutrient")
+    assert canonical_query("ＬＥＤ grow light").text == "led grow light"
+
+def test_boolean_operators_keep_their_case():
+    """Test that upper-case operators survive, since Google Patents treats lower-case ones as words"""
+    assert canonical_query("LED OR laser and Light").text == "led OR laser and light"
+
+@pytest.mark.parametrize("query,start_year,end_year,filters", [
+    ("hydroponics", 2020, 2023, None),
+    ("Hydroponics ", None, None, {"yearFrom": 2020, "yearTo": "2023"}),
+    ("hydroponics", None, None, {"year_from": "2020", "YEAR-TO": 2023}),
+    ("hydroponics year:2020-2023", None, None, None),
+    ("year:2020-2023 HYDROPONICS", None, None, {}),
+    ("hydroponics", 2023, 2020, None),
+])
+def test_year_ranges_from_every_source_match(query, start_year, end_year, filters):
+    """Test that parameters, filters and typed year: terms give one fingerprint"""
+    expected = CanonicalQuery("hydroponics", 2020, 2023)
+    assert canonical_query(query, start_year, end_year, filters) == expected
+    assert canonical_query(query, start_year, end_year, filters).fingerprint == expected.fingerprint
+
+def test_other_filters_are_normalized_and_empty_ones_dropped():
+    first = canonical_query("hydroponics", filters={"Assignee": " Acme  Corp", "cpc": ["A01G", "a01c"], "tags": []})
+    second = canonical_query("hydroponics", filters={"assignee": "acme corp", "CPC": ["A01C", "A01G"], "status": None})
+    assert first == second
+    assert first.fingerprint != canonical_query("hydroponics").fingerprint
+
+def test_search_text_adds_year_term():
+    assert canonical_query("Hydroponics", 2020).search_text() == "hydroponics year:2020-"
+    assert canonical_query("hydroponics", end_year=2023).search_text() == "hydroponics year:-2023"
+    assert canonical_query("hydroponics").search_text() == "hydroponics"
+
+def test_saved_query_hash_and_search_cache_share_the_fingerprint():
+    """Test that a saved query and the same search from the search bar look like one thing"""
+    fingerprint = hash_query("Hydroponics ", {"yearFrom": 2020})
+    assert fingerprint == canonical_query("hydroponics", start_year=2020).fingerprint
+    assert search_cache_key("hydroponics year:2020-", 10) == search_cache_key("Hydroponics", 10, start_year=2020)
+    assert search_cache_key("hydroponics", 10, start_year=2020)[0] == fingerprint
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from app.core import database
+from app.core.config import settings
+
+def test_null_pool_mode(monkeypatch):
+    """Test that the NullPool behaviour is still available"""
+    monkeypatch.setattr(settings, "DB_POOL_MODE", "null")
+    assert database.get_pool_options() == {"poolclass": NullPool}
+
+def test_unknown_pool_mode(monkeypatch):
+    """Test that a misconfigured pool mode fails loudly"""
+    monkeypatch.setattr(settings, "DB_POOL_MODE", "bogus")
+    with pytest.raises(ValueError):
+        database.get_pool_options()
+
+@pytest.mark.asyncio
+async def test_queue_pool_reuses_connections(monkeypatch, tmp_path):
+    """Test that the pooled mode keeps connections and reports pool stats"""
+    pytest.importorskip("aiosqlite")
+    monkeypatch.setattr(settings, "DB_POOL_MODE", "queue")
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 2)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", **database.get_pool_options())
+
+    for _ in range(3):
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    stats = database.get_pool_stats(engine.pool)
+    assert stats["mode"] == "queue"
+    assert stats["size"] == 2
+    assert stats["checked_in"] == 1
+    assert stats["checked_out"] == 0
+    await engine.dispose()
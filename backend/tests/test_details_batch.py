@@ -0,0 +1,67 @@
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from app.core.config import settings
+from app.main import app
+from app.services.disk_cache import DiskCache
+
+def test_disk_cache_get_many(tmp_path):
+    """Test that a batch lookup returns only live entries and counts hits and misses"""
+    cache = DiskCache(tmp_path / "cache.db", ttl=60, max_bytes=10_000)
+    cache.set("a", 1)
+    cache.set("b", {"x": 2})
+    cache.set("gone", 3, ttl=-1)
+    assert cache.get_many(["a", "b", "gone", "missing"]) == {"a": 1, "b": {"x": 2}}
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+    cache.close()
+
+@pytest.mark.asyncio
+async def test_batch_serves_cached_items_and_fetches_the_rest_concurrently(details_cache, details_upstream, monkeypatch):
+    monkeypatch.setattr(settings, "DETAILS_BATCH_CONCURRENCY", 4)
+    details_cache.set("details:US1000000", {"title": "Cached patent"})
+    numbers = ["US1000000"] + [f"US200000{i}" for i in range(8)]
+
+    started = time.perf_counter()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/patents/details:batch", json={"patent_numbers": numbers + ["US2000000"]})
+    elapsed = time.perf_counter() - started
+
+    data = response.json()
+    assert response.status_code == 200
+    assert [item["patent_number"] for item in data["results"]] == numbers
+    assert data["results"][0] == {"patent_number": "US1000000", "status": "ok", "cached": True, "details": {"title": "Cached patent"}, "error": None}
+    assert data["cached"] == 1
+    assert sorted(details_upstream.calls) == numbers[1:]
+    assert details_upstream.peak == 4
+    assert elapsed < 0.02 * 8
+
+    # Fetched details were stored, so a repeat is served from the cache alone
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        again = (await client.post("/api/patents/details:batch", json={"patent_numbers": numbers})).json()
+    assert again["cached"] == len(numbers)
+    assert len(details_upstream.calls) == 8
+
+@pytest.mark.asyncio
+async def test_batch_reports_per_item_failures(details_cache, details_upstream):
+    details_upstream.not_found.add("US0000000")
+    details_upstream.errors["US9999999"] = HTTPException(status_code=503, detail="SerpAPI is temporarily unavailable")
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/patents/details:batch", json={"patent_numbers": ["US1234567", "US0000000", "US9999999"]})
+
+    data = response.json()
+    assert response.status_code == 200
+    assert [item["status"] for item in data["results"]] == ["ok", "not_found", "error"]
+    assert data["results"][2]["error"] == "SerpAPI is temporarily unavailable"
+    assert data["errors"] == 1
+
+@pytest.mark.asyncio
+async def test_batch_size_is_validated(monkeypatch):
+    monkeypatch.setattr(settings, "DETAILS_BATCH_MAX_ITEMS", 2)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        too_many = await client.post("/api/patents/details:batch", json={"patent_numbers": ["US1", "US2", "US3"]})
+        empty = await client.post("/api/patents/details:batch", json={"patent_numbers": []})
+    assert too_many.status_code == 422
+    assert empty.status_code == 422
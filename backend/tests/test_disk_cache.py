@@ -0,0 +1,118 @@
+import pytest
+from app.routers.patents import serpapi_service
+from app.services.disk_cache import ACCESS_RESOLUTION, DiskCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_entries_expire_after_ttl(tmp_path):
+    """Test that an entry is served until its TTL and per-entry TTLs are honoured"""
+    clock = FakeClock()
+    cache = DiskCache(tmp_path / "cache.db", ttl=10, max_bytes=10_000, clock=clock)
+    cache.set("a", {"title": "Test Patent"})
+    cache.set("b", "short-lived", ttl=1)
+
+    clock.now += 5
+    assert cache.get("a") == {"title": "Test Patent"}
+    assert cache.get("b") is None
+    clock.now += 6
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    cache.close()
+
+def test_least_recently_read_entries_are_evicted(tmp_path):
+    """Test that the size limit evicts entries that were not read recently"""
+    clock = FakeClock()
+    cache = DiskCache(tmp_path / "cache.db", ttl=10 * ACCESS_RESOLUTION, max_bytes=30, clock=clock)
+    for key in ("a", "b"):
+        clock.now += 1
+        cache.set(key, "x" * 10)
+    clock.now += ACCESS_RESOLUTION
+    cache.get("a")
+    clock.now += 1
+    cache.set("c", "x" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["bytes"] <= 30
+    cache.close()
+
+def test_reads_refresh_recency_at_most_once_per_resolution(tmp_path):
+    """Test that a hit only writes accessed_at when the stored value is older than ACCESS_RESOLUTION"""
+    clock = FakeClock()
+    cache = DiskCache(tmp_path / "cache.db", ttl=10 * ACCESS_RESOLUTION, max_bytes=10_000, clock=clock)
+    cache.set("a", "value")
+    accessed_at = lambda: cache._connection().execute("SELECT accessed_at FROM cache WHERE key = 'a'").fetchone()[0]
+
+    clock.now += ACCESS_RESOLUTION / 2
+    cache.get("a")
+    cache.get_many(["a"])
+    assert accessed_at() == 1000.0
+    clock.now += ACCESS_RESOLUTION
+    cache.get_many(["a"])
+    assert accessed_at() == clock.now
+    cache.close()
+
+def test_running_totals_match_stored_entries(tmp_path):
+    """Test that size totals follow inserts, overwrites, expiry and eviction, and are seeded for an existing file"""
+    clock = FakeClock()
+    path = tmp_path / "cache.db"
+    cache = DiskCache(path, ttl=60, max_bytes=100, clock=clock)
+    for i in range(12):
+        clock.now += 1
+        cache.set(f"k{i}", "x" * 10 * (i % 4), ttl=5 if i % 3 == 0 else None)
+    cache.set("k1", "y" * 20)
+    cache.delete("k2")
+
+    def actual():
+        entries, size = cache._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        return {"entries": entries, "bytes": size}
+
+    stats = cache.stats()
+    assert {"entries": stats["entries"], "bytes": stats["bytes"]} == actual()
+    assert stats["bytes"] <= 100
+    assert cache.evictions > 0
+
+    # A cache file written before the totals table existed is counted once on open
+    cache._connection().executescript("DROP TABLE cache_totals")
+    expected = actual()
+    cache.close()
+    reopened = DiskCache(path, ttl=60, max_bytes=100, clock=clock)
+    assert {k: reopened.stats()[k] for k in ("entries", "bytes")} == expected
+    reopened.close()
+
+def test_entries_are_shared_across_instances_and_restarts(tmp_path):
+    """Test that one worker's writes are visible to another and survive a reopen"""
+    path = tmp_path / "cache.db"
+    worker_a = DiskCache(path, ttl=60, max_bytes=10_000)
+    worker_b = DiskCache(path, ttl=60, max_bytes=10_000)
+    worker_a.set("details:US1234567", {"title": "Test Patent"})
+    assert worker_b.get("details:US1234567") == {"title": "Test Patent"}
+    worker_a.close()
+    worker_b.close()
+
+    restarted = DiskCache(path, ttl=60, max_bytes=10_000)
+    assert restarted.get("details:US1234567") == {"title": "Test Patent"}
+    restarted.close()
+
+@pytest.mark.asyncio
+async def test_patent_details_are_served_from_disk(monkeypatch, tmp_path):
+    """Test that a second details lookup skips SerpAPI"""
+    calls = []
+
+    async def fetch_patent_details(patent_number):
+        calls.append(patent_number)
+        return {"title": "Test Patent"}
+
+    monkeypatch.setattr(serpapi_service, "_fetch_patent_details", fetch_patent_details)
+    monkeypatch.setattr(serpapi_service, "details_cache", DiskCache(tmp_path / "details.db", ttl=60, max_bytes=10_000))
+
+    assert await serpapi_service.get_patent_details("US1234567") == {"title": "Test Patent"}
+    assert await serpapi_service.get_patent_details("US1234567") == {"title": "Test Patent"}
+    assert calls == ["US1234567"]
+    serpapi_service.details_cache.close()
@@ -0,0 +1,146 @@
+import asyncio
+import time
+import httpx
+import pytest
+from httpx import AsyncClient
+from app.main import app
+from app.routers import patents
+from app.services.federated import FederatedSearch, merge_sources
+from app.services.http_client import http_clients
+
+def stand_in(results, delay: float = 0.0, error: Exception = None):
+    """Local search source answering after `delay` seconds, or failing with `error`"""
+    async def search(query: str, limit: int):
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return results[:limit]
+    return search
+
+SERPAPI_RESULTS = [
+    {"title": "Hydroponic tower", "patent_number": "US7654321B2", "snippet": "", "pdf": "https://example.com/a.pdf"},
+    {"title": "Nutrient doser", "patent_number": "US1111111B1", "snippet": "Doses nutrients"},
+]
+PATENTSVIEW_RESULTS = [
+    {"title": "Hydroponic tower", "patent_number": "US7654321", "snippet": "A vertical tower", "pdf": ""},
+    {"title": "Grow light", "patent_number": "US2222222", "snippet": "LED light"},
+]
+
+def test_merge_sources_interleaves_and_deduplicates():
+    """Test that results alternate by rank and one patent from two sources is merged"""
+    merged = merge_sources([("serpapi", SERPAPI_RESULTS), ("patentsview", PATENTSVIEW_RESULTS)], 10)
+    assert [r["patent_number"] for r in merged] == ["US7654321B2", "US1111111B1", "US2222222"]
+    assert merged[0]["sources"] == ["serpapi", "patentsview"]
+    assert merged[0]["snippet"] == "A vertical tower"
+    assert merged[0]["pdf"] == "https://example.com/a.pdf"
+    assert len(merge_sources([("serpapi", SERPAPI_RESULTS), ("patentsview", PATENTSVIEW_RESULTS)], 2)) == 2
+
+@pytest.mark.asyncio
+async def test_all_sources_in_time_returns_without_waiting_for_deadline():
+    search = FederatedSearch({
+        "serpapi": stand_in(SERPAPI_RESULTS, delay=0.02),
+        "patentsview": stand_in(PATENTSVIEW_RESULTS, delay=0.01),
+    }, deadline=2.0)
+    started = time.perf_counter()
+    response = await search.search("hydroponics", 10)
+    assert time.perf_counter() - started < 0.5
+    assert response["partial"] is False
+    assert len(response["results"]) == 3
+    assert response["sources"]["serpapi"]["status"] == "ok"
+    assert response["sources"]["patentsview"]["count"] == 2
+
+@pytest.mark.asyncio
+async def test_slow_source_is_cut_off_at_deadline():
+    """Test that the rest is returned as partial at the deadline while the slow source finishes in the background"""
+    slow_finished = asyncio.Event()
+
+    async def slow(query: str, limit: int):
+        await asyncio.sleep(0.3)
+        slow_finished.set()
+        return PATENTSVIEW_RESULTS
+
+    search = FederatedSearch({"serpapi": stand_in(SERPAPI_RESULTS, delay=0.01), "patentsview": slow}, deadline=0.1)
+    started = time.perf_counter()
+    response = await search.search("hydroponics", 10)
+    assert time.perf_counter() - started < 0.25
+    assert response["partial"] is True
+    assert response["sources"]["patentsview"] == {"status": "timeout"}
+    assert [r["patent_number"] for r in response["results"]] == ["US7654321B2", "US1111111B1"]
+    assert search.stats() == {"running": 1, "late": 1, "late_failed": 0}
+
+    # Not cancelled: a late upstream call still completes, e.g. to fill its cache
+    await asyncio.wait_for(slow_finished.wait(), 1)
+    await asyncio.sleep(0)
+    assert search.stats()["running"] == 0
+
+@pytest.mark.asyncio
+async def test_late_source_failure_is_counted_and_close_cancels_the_rest():
+    """Test that late failures are counted instead of leaking, and close() stops sources still running"""
+    search = FederatedSearch({
+        "serpapi": stand_in([], delay=0.1, error=RuntimeError("quota exceeded")),
+        "patentsview": stand_in(PATENTSVIEW_RESULTS, delay=5),
+    }, deadline=0.01)
+    response = await search.search("hydroponics", 10)
+    assert response["results"] == []
+    await asyncio.sleep(0.2)
+    assert search.stats() == {"running": 1, "late": 2, "late_failed": 1}
+
+    [running] = search._tasks
+    search.close()
+    with pytest.raises(asyncio.CancelledError):
+        await running
+    assert search.stats()["running"] == 0
+
+@pytest.mark.asyncio
+async def test_failing_source_is_reported():
+    search = FederatedSearch({
+        "serpapi": stand_in([], error=RuntimeError("quota exceeded")),
+        "patentsview": stand_in(PATENTSVIEW_RESULTS),
+    }, deadline=1.0)
+    response = await search.search("hydroponics", 10, deadline=0.5)
+    assert response["partial"] is True
+    assert response["sources"]["serpapi"]["status"] == "error"
+    assert response["sources"]["serpapi"]["error"] == "quota exceeded"
+    assert [r["sources"] for r in response["results"]] == [["patentsview"], ["patentsview"]]
+
+@pytest.mark.asyncio
+async def test_federated_endpoint_honours_deadline_parameter(monkeypatch):
+    monkeypatch.setattr(patents.federated_search, "sources", {
+        "serpapi": stand_in(SERPAPI_RESULTS, delay=1.0),
+        "patentsview": stand_in(PATENTSVIEW_RESULTS),
+    })
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/api/patents/search/federated", params={"query": "hydroponics", "deadline": 0.1})
+
+    data = response.json()
+    assert response.status_code == 200
+    assert data["source"] == "federated"
+    assert data["partial"] is True
+    assert data["sources"]["serpapi"]["status"] == "timeout"
+    assert data["count"] == 2
+
+@pytest.mark.asyncio
+async def test_patentsview_endpoint_maps_results(monkeypatch):
+    """Test that PatentsView results come back in the SerpAPI result shape"""
+    def respond(request: httpx.Request) -> httpx.Response:
+        assert request.url.params["q"] == "hydroponics"
+        return httpx.Response(200, json={"patents": [{
+            "patent_number": "7654321",
+            "patent_title": "Hydroponic tower",
+            "patent_abstract": "A vertical tower",
+            "inventor_name": "Jane Doe",
+            "assignee_name": "Test Company",
+            "patent_date": "2010-02-02",
+        }]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+    monkeypatch.setitem(http_clients._clients, "patentsview", client)
+    async with AsyncClient(app=app, base_url="http://test") as api:
+        response = await api.get("/api/patents/search/patentsview", params={"query": "hydroponics"})
+    await client.aclose()
+
+    [patent] = response.json()["results"]
+    assert patent["patent_number"] == "US7654321"
+    assert patent["patent_link"] == "https://patents.google.com/patent/US7654321"
+    assert patent["snippet"] == "A vertical tower"
+    assert patent["publication_date"] == "2010-02-02"
@@ -0,0 +1,40 @@
+import httpx
+import pytest
+from app.services.http_client import HTTPClientRegistry, http_clients
+from app.services.patentsview import PatentsViewService
+
+@pytest.mark.asyncio
+async def test_registry_reuses_client_per_upstream():
+    """Test that each upstream gets one long-lived client"""
+    registry = HTTPClientRegistry()
+    registry.start()
+    serpapi = registry.get("serpapi")
+    assert registry.get("serpapi") is serpapi
+    assert registry.get("patentsview") is not serpapi
+
+    await registry.close()
+    assert serpapi.is_closed
+    assert registry.get("serpapi") is not serpapi
+    await registry.close()
+
+@pytest.mark.asyncio
+async def test_services_use_shared_client(monkeypatch):
+    """Test that service calls go through the registry's client"""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"patents": [{"patent_number": "US1234567", "patent_title": "Test Patent"}]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(http_clients._clients, "patentsview", client)
+
+    service = PatentsViewService()
+    patents = await service.search_patents("hydroponics")
+    details = await service.get_patent_details("US1234567")
+
+    assert [p["title"] for p in patents] == ["Test Patent"]
+    assert details["patent_number"] == "US1234567"
+    assert len(requests) == 2
+    assert not client.is_closed
+    await client.aclose()
@@ -0,0 +1,68 @@
+import json
+from datetime import datetime
+import pytest
+from fastapi.responses import JSONResponse
+from httpx import AsyncClient
+from app.main import app
+from app.services import json_codec
+from app.services.serpapi import map_details, map_organic_results
+
+def test_loads_accepts_bytes_and_str():
+    """Test that both response bytes and text decode to the same value"""
+    assert json_codec.loads(b'{"a": [1, 2.5, "x", null]}') == {"a": [1, 2.5, "x", None]}
+    assert json_codec.loads('{"a": true}') == {"a": True}
+    with pytest.raises(ValueError):
+        json_codec.loads(b"<html>not json</html>")
+
+def test_dumps_is_compact_and_stringifies_unknown_types():
+    value = {"a": [1, 2], "when": datetime(2024, 1, 2, 3, 4, 5)}
+    encoded = json_codec.dumps(value)
+    assert " " not in encoded.replace("T03", "")
+    assert json.loads(encoded)["a"] == [1, 2]
+    assert json.loads(encoded)["when"].startswith("2024-01-02")
+
+def test_fast_response_matches_json_response():
+    """Test that FastJSONResponse renders the same document as FastAPI's JSONResponse"""
+    content = {"results": [{"title": "Gewächshaus", "count": 3, "score": 1.5, "pdf": None}], "ok": True}
+    fast = json_codec.FastJSONResponse(content)
+    assert json.loads(fast.body) == json.loads(JSONResponse(content).body)
+    assert fast.media_type == "application/json"
+
+def test_map_organic_results_projects_mapped_fields():
+    """Test that only the mapped fields survive and patent links are rebuilt from the number"""
+    results = [
+        {
+            "title": "Hydroponic system",
+            "link": "https://patents.google.com/patent/US1234567B2/en",
+            "snippet": "A system",
+            "inventor": "Jane Doe",
+            "figures": [{"full": "https://example.com/f1.png"}],
+            "country_status": {"US": "ACTIVE"},
+        },
+        {"title": "No link"},
+    ]
+    patents = map_organic_results(results)
+    assert patents[0] == {
+        "title": "Hydroponic system",
+        "snippet": "A system",
+        "publication_date": "",
+        "inventor": "Jane Doe",
+        "assignee": "",
+        "patent_link": "https://patents.google.com/patent/US1234567B2",
+        "patent_number": "US1234567B2",
+        "pdf": "",
+    }
+    assert patents[1]["patent_link"] == ""
+    assert patents[1]["patent_number"] == ""
+
+def test_map_details_keeps_original_link():
+    details = map_details({"title": "T", "link": "https://patents.google.com/patent/US1234567B2/en", "extra": 1})
+    assert details["patent_link"] == "https://patents.google.com/patent/US1234567B2/en"
+    assert "extra" not in details
+
+@pytest.mark.asyncio
+async def test_metrics_report_json_backend():
+    """Test that /api/metrics says which JSON library renders responses"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        metrics = (await client.get("/api/metrics")).json()
+    assert metrics["json_backend"] == json_codec.BACKEND
@@ -0,0 +1,102 @@
+import pytest
+from httpx import AsyncClient
+from app.main import app
+from app.routers import patents
+from app.services import serpapi
+from app.services.local_search import LocalSearchIndex, tokenize
+from app.services.storage import AsyncStorageService, create_storage_service
+
+def saved_patent(patent_number: str, title: str, abstract: str = "", user_id: str = "dev", **overrides) -> dict:
+    return dict({
+        "id": 1,
+        "patent_number": patent_number,
+        "title": title,
+        "abstract": abstract,
+        "assignee": "Test Company",
+        "inventors": [{"name": "John Doe"}],
+        "google_patents_link": f"https://patents.google.com/patent/{patent_number}",
+        "user_id": user_id,
+    }, **overrides)
+
+def search_result(patent_number: str, title: str, snippet: str = "") -> dict:
+    return {"title": title, "snippet": snippet, "patent_number": patent_number, "inventor": "Jane Roe"}
+
+@pytest.fixture
+def file_storage(tmp_path):
+    async_storage = AsyncStorageService(create_storage_service(data_dir=str(tmp_path), backend="json"))
+    yield async_storage
+    async_storage.close()
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("The LED-based grow light, for plants!") == ["led", "based", "grow", "light", "plants"]
+
+def test_bm25_ranks_title_matches_and_rare_terms_first():
+    """Test that title matches outrank abstract matches and rare terms outweigh common ones"""
+    index = LocalSearchIndex(max_results=100)
+    index.add_saved_patent(saved_patent("US1", "Nutrient pump", "Hydroponic nutrient film"))
+    index.add_saved_patent(saved_patent("US2", "Hydroponic tower", "A vertical tower"))
+    index.add_saved_patent(saved_patent("US3", "Soil probe", "Measures soil moisture"))
+
+    assert [r["patent_number"] for r in index.search("hydroponic", "dev")] == ["US2", "US1"]
+    assert [r["patent_number"] for r in index.search("company soil", "dev")][0] == "US3"
+    assert index.search("aquaponics", "dev") == []
+
+def test_saved_patents_are_private_and_reindexed_on_upsert():
+    index = LocalSearchIndex(max_results=100)
+    index.add_saved_patent(saved_patent("US1", "Hydroponic tower"))
+    index.add_saved_patent(saved_patent("US2", "Hydroponic tray", user_id="someone-else"))
+    assert [r["patent_number"] for r in index.search("hydroponic", "dev")] == ["US1"]
+
+    index.add_saved_patent(saved_patent("US1", "Aeroponic tower"))
+    assert index.search("hydroponic", "dev") == []
+    assert [r["patent_number"] for r in index.search("aeroponic", "dev")] == ["US1"]
+    assert index.stats()["documents"] == 2
+
+def test_search_results_are_shared_bounded_and_yield_to_saved_copies():
+    """Test that seen results are visible to all, evicted oldest first and shown once when also saved"""
+    index = LocalSearchIndex(max_results=2)
+    index.add_search_results([search_result("US1", "Grow light"), search_result("US2", "Grow tent")])
+    index.add_search_results([search_result("US3", "Grow medium")])
+    assert {r["patent_number"] for r in index.search("grow", "anyone")} == {"US2", "US3"}
+
+    index.add_saved_patent(saved_patent("US3", "Grow medium"))
+    results = index.search("grow medium", "dev")
+    assert [(r["patent_number"], r["source"]) for r in results] == [("US3", "saved"), ("US2", "cached")]
+    assert [r["source"] for r in index.search("grow", "dev", sources=("cached",))] == ["cached", "cached"]
+
+@pytest.mark.asyncio
+async def test_index_follows_storage_writes(file_storage):
+    """Test that attaching loads existing patents and later saves are searchable immediately"""
+    await file_storage.save_patent(saved_patent("US1", "Hydroponic tower"), "dev")
+    index = LocalSearchIndex(max_results=100)
+    index.attach(file_storage.storage)
+    assert [r["patent_number"] for r in index.search("tower", "dev")] == ["US1"]
+
+    await file_storage.save_patent(saved_patent("US2", "Aeroponic mister"), "dev")
+    assert [r["patent_number"] for r in index.search("aeroponic", "dev")] == ["US2"]
+
+@pytest.mark.asyncio
+async def test_local_search_endpoint_indexes_upstream_results(monkeypatch):
+    """Test that results fetched from SerpAPI are then found locally without another upstream call"""
+    index = LocalSearchIndex(max_results=100)
+    monkeypatch.setattr(serpapi, "local_index", index)
+    monkeypatch.setattr(patents, "local_index", index)
+    calls = []
+
+    async def search_patents(query, limit=10, start_year=None, end_year=None, page=None):
+        calls.append(query)
+        return [search_result("US7654321B2", "Hydroponic nutrient doser", "Doses nutrients")]
+
+    monkeypatch.setattr(patents.serpapi_service, "search_patents", search_patents)
+    patents.serpapi_service.search_cache.clear()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await client.get("/api/patents/search/serpapi", params={"query": "hydroponics"})
+        response = await client.get("/api/patents/search/local", params={"query": "nutrient doser"})
+    patents.serpapi_service.search_cache.clear()
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["source"] == "local"
+    assert [r["patent_number"] for r in data["results"]] == ["US7654321B2"]
+    assert data["results"][0]["score"] > 0
+    assert calls == ["hydroponics"]
@@ -0,0 +1,53 @@
+import pytest
+from app.services.patent_numbers import (
+    PatentNumber,
+    extract_patent_number,
+    extract_patent_numbers,
+    normalize_patent_number,
+    parse_patent_number,
+    patent_match_key,
+)
+
+@pytest.mark.parametrize("link,title,expected", [
+    ("https://patents.google.com/patent/US1234567B2/en", "", "US1234567B2"),
+    ("https://www.freepatentsonline.com/patent/EP1234567", "", "EP1234567"),
+    ("https://example.com/docs/WO2020123456A1", "", "WO2020123456A1"),
+    ("https://example.com/docs/item", "Nutrient system (US7654321)", "US7654321"),
+    ("https://example.com/docs/abc123?x=1", "no number", "abc123"),
+    ("", "", ""),
+])
+def test_extract_patent_number(link, title, expected):
+    """Test extraction from Google Patents links, other links, titles and the fallback"""
+    assert extract_patent_number(link, title) == expected
+
+def test_extract_patent_numbers_batch():
+    """Test that a whole result page is extracted, tolerating missing fields"""
+    results = [
+        {"link": "https://patents.google.com/patent/US1234567B2/en", "title": "A"},
+        {"title": "Nutrient system (EP7654321)"},
+        {"link": None, "title": None},
+    ]
+    assert extract_patent_numbers(results) == ["US1234567B2", "EP7654321", ""]
+
+@pytest.mark.parametrize("raw,expected", [
+    ("US7654321B2", PatentNumber("US", "7654321", "B2")),
+    ("us 7,654,321 b2", PatentNumber("US", "7654321", "B2")),
+    ("US20230123456A1", PatentNumber("US", "20230123456", "A1")),
+    ("USD912345S", PatentNumber("US", "D912345", "S")),
+    ("USRE49123E", PatentNumber("US", "RE49123", "E")),
+    ("EP1234567", PatentNumber("EP", "1234567", "")),
+    ("not-a-number", None),
+])
+def test_parse_patent_number(raw, expected):
+    """Test splitting into country code, number and kind code"""
+    assert parse_patent_number(raw) == expected
+
+def test_normalize_patent_number():
+    assert normalize_patent_number(" US 7,654,321 B2 ") == "US7654321B2"
+    assert normalize_patent_number(" abc123 ") == "abc123"
+
+def test_patent_match_key_ignores_kind_code_and_missing_country():
+    """Test that SerpAPI and PatentsView forms of one patent share a key"""
+    assert patent_match_key("US7654321B2") == patent_match_key("7,654,321") == "US7654321"
+    assert patent_match_key("USRE49123E") == patent_match_key("RE49123") == "USRE49123"
+    assert patent_match_key("EP1234567A1") == "EP1234567"
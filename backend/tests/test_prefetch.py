@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from app.core.config import settings
+from app.main import app
+from app.routers.patents import serpapi_service
+from app.services.prefetch import DetailsPrefetcher
+
+async def drain(prefetcher: DetailsPrefetcher) -> None:
+    while prefetcher._tasks:
+        await asyncio.gather(*prefetcher._tasks)
+
+@pytest.mark.asyncio
+async def test_prefetch_skips_cached_and_caps_concurrency(details_upstream):
+    upstream = details_upstream
+    upstream.errors["X6"] = RuntimeError("upstream failure")
+
+    async def cached(numbers):
+        return {"US1"}
+
+    prefetcher = DetailsPrefetcher(upstream, cached, concurrency=2, max_pending=100)
+    await prefetcher.schedule(["US1", "US2", "US3", "US4", "US5", "X6", ""])
+    await prefetcher.schedule(["US2"])
+    await drain(prefetcher)
+
+    assert sorted(upstream.calls) == ["US2", "US3", "US4", "US5", "X6"]
+    assert upstream.peak == 2
+    stats = prefetcher.stats()
+    assert stats["skipped_cached"] == 1
+    assert stats["skipped_pending"] == 1
+    assert stats["fetched"] == 4
+    assert stats["failed"] == 1
+    assert stats["pending"] == 0
+
+@pytest.mark.asyncio
+async def test_prefetch_drops_beyond_max_pending_and_cancels_on_close(details_upstream):
+    upstream = details_upstream
+    upstream.delay = 10
+
+    async def cached(numbers):
+        return set()
+
+    prefetcher = DetailsPrefetcher(upstream, cached, concurrency=1, max_pending=2)
+    await prefetcher.schedule(["US1", "US2", "US3"])
+    assert prefetcher.stats()["dropped"] == 1
+    tasks = list(prefetcher._tasks)
+    prefetcher.close()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(task.cancelled() for task in tasks)
+    assert prefetcher.stats()["pending"] == 0
+
+@pytest.mark.asyncio
+async def test_search_prefetches_top_results_into_details_cache(monkeypatch, details_cache, details_upstream):
+    """Test that after a search the top results' details are a cache hit"""
+    monkeypatch.setattr(settings, "DETAILS_PREFETCH_TOP_N", 2)
+    upstream = details_upstream
+
+    async def search_patents(query, limit=10, start_year=None, end_year=None, page=None):
+        return [{"title": f"Result {n}", "patent_number": f"US100000{n}"} for n in range(5)]
+
+    monkeypatch.setattr(serpapi_service, "search_patents", search_patents)
+    serpapi_service.search_cache.clear()
+    before = serpapi_service.prefetcher.stats()["fetched"]
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/api/patents/search/serpapi", params={"query": "hydroponics"})
+        assert response.status_code == 200
+        await drain(serpapi_service.prefetcher)
+
+        details = await client.get("/api/patents/US1000000/details")
+        metrics = (await client.get("/api/metrics")).json()
+    serpapi_service.search_cache.clear()
+
+    assert details.json() == {"title": "Patent US1000000"}
+    assert upstream.calls == ["US1000000", "US1000001"]
+    assert metrics["details_prefetch"]["fetched"] == before + 2
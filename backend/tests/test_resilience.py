@@ -0,0 +1,151 @@
+import asyncio
+import time
+import httpx
+import pytest
+from fastapi import HTTPException
+from app.services.http_client import http_clients
+from app.services.resilience import CircuitBreaker, CircuitOpenError, RateLimitTimeoutError, TokenBucket, UpstreamGuard
+from app.services.serpapi import SerpAPIService
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class FaultyUpstream:
+    """Stand-in upstream that serves scripted faults, then successes.
+
+    Each fault is an HTTP status code, "connect" for a refused connection or a
+    number of seconds to hang (raising a read timeout once the request's own
+    timeout runs out).
+    """
+
+    def __init__(self, *faults):
+        self.faults = list(faults)
+        self.requests = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        fault = self.faults.pop(0) if self.faults else None
+        if fault == "connect":
+            raise httpx.ConnectError("connection refused", request=request)
+        if isinstance(fault, float):
+            timeout = request.extensions["timeout"]["read"]
+            await asyncio.sleep(min(fault, timeout))
+            if fault > timeout:
+                raise httpx.ReadTimeout("read timed out", request=request)
+        if isinstance(fault, int):
+            return httpx.Response(fault, json={"error": "upstream failure"})
+        return httpx.Response(200, json={"organic_results": [{"title": "Test Patent", "link": "https://patents.google.com/patent/US1234567B2/en"}]})
+
+def make_guard(**overrides) -> UpstreamGuard:
+    options = dict(attempts=3, base_delay=0.001, max_delay=0.002, attempt_timeout=1.0, deadline=2.0)
+    options.update(overrides)
+    return UpstreamGuard(
+        "test",
+        breaker=options.pop("breaker", CircuitBreaker(failure_threshold=5, reset_timeout=30)),
+        limiter=options.pop("limiter", TokenBucket(rate=0, capacity=1)),
+        **options
+    )
+
+def send_to(upstream: FaultyUpstream):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    return lambda timeout: client.get("http://upstream.test/search.json", timeout=timeout)
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried():
+    """Test that 5xx responses and connection errors are retried until success"""
+    upstream = FaultyUpstream(503, "connect")
+    guard = make_guard()
+    response = await guard.call(send_to(upstream))
+    assert response.status_code == 200
+    assert upstream.requests == 3
+    assert guard.stats()["retries"] == 2
+    assert guard.stats()["circuit"] == "closed"
+
+@pytest.mark.asyncio
+async def test_retries_stop_after_attempts():
+    """Test that the last failure is surfaced once attempts run out"""
+    response = await make_guard().call(send_to(FaultyUpstream(503, 503, 503, 503)))
+    assert response.status_code == 503
+
+    with pytest.raises(httpx.ConnectError):
+        await make_guard().call(send_to(FaultyUpstream("connect", "connect", "connect")))
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_a_hanging_upstream():
+    """Test that a brownout is cut off at the deadline instead of waiting out every timeout"""
+    guard = make_guard(attempt_timeout=0.1, deadline=0.25)
+    started = time.perf_counter()
+    with pytest.raises(httpx.ReadTimeout):
+        await guard.call(send_to(FaultyUpstream(5.0, 5.0, 5.0)))
+    assert time.perf_counter() - started < 0.5
+
+def test_circuit_opens_then_probes():
+    """Test closed -> open -> half-open -> closed transitions"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    clock.now = 10
+    assert breaker.state == "half_open"
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 20
+    breaker.check()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.rejected == 2
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast_without_calling_upstream():
+    """Test that once the breaker opens, calls never reach the upstream"""
+    upstream = FaultyUpstream(*[500] * 10)
+    guard = make_guard(breaker=CircuitBreaker(failure_threshold=3, reset_timeout=30))
+    await guard.call(send_to(upstream))
+    with pytest.raises(CircuitOpenError):
+        await guard.call(send_to(upstream))
+    assert upstream.requests == 3
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_requests():
+    """Test that requests beyond the burst wait for tokens, or fail past their timeout"""
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.perf_counter()
+    for _ in range(3):
+        await bucket.acquire()
+    assert time.perf_counter() - started >= 0.035
+
+    with pytest.raises(RateLimitTimeoutError):
+        await bucket.acquire(timeout=0.001)
+
+@pytest.mark.asyncio
+async def test_search_reports_unavailable_while_circuit_open(monkeypatch):
+    """Test that SerpAPI searches turn into fast 503s while the upstream is down"""
+    upstream = FaultyUpstream(*[502] * 10)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    monkeypatch.setitem(http_clients._clients, "serpapi", client)
+    service = SerpAPIService()
+    service.api_key = "test-key"
+    service.guard = make_guard(attempts=2, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30))
+
+    with pytest.raises(HTTPException) as first:
+        await service.search_patents("hydroponics")
+    with pytest.raises(HTTPException) as second:
+        await service.search_patents("hydroponics")
+
+    assert first.value.status_code == 502
+    assert second.value.status_code == 503
+    assert upstream.requests == 2
+    await client.aclose()
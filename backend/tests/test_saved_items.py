@@ -0,0 +1,261 @@
+import json
+from datetime import datetime, timezone
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.routers import saved_items
+from app.models.saved_items import Base
+from app.services.repository import SavedItemsRepository
+from app.schemas.saved_items import SavedAlertResponse, SavedPatentResponse, SavedQueryResponse
+from app.services.storage import AsyncStorageService, create_storage_service, get_storage
+
+def make_repository(tmp_path) -> SavedItemsRepository:
+    """SQL repository on a throwaway SQLite database."""
+    pytest.importorskip("aiosqlite")
+    db_path = tmp_path / "repository.db"
+    sync_engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(sync_engine)
+    sync_engine.dispose()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    return SavedItemsRepository(async_sessionmaker(engine, expire_on_commit=False))
+
+@pytest.fixture(params=["json", "log", "sqlite", "database"])
+def storage(request, tmp_path):
+    """Point the saved_items router at an empty store for each storage backend."""
+    if request.param == "database":
+        async_storage = make_repository(tmp_path)
+    else:
+        async_storage = AsyncStorageService(create_storage_service(data_dir=str(tmp_path), backend=request.param))
+    app.dependency_overrides[get_storage] = lambda: async_storage
+    yield async_storage
+    app.dependency_overrides.clear()
+    async_storage.close()
+
+def patent_payload(patent_number: str = "US1234567", **overrides) -> dict:
+    return dict({
+        "patentNumber": patent_number,
+        "title": "Test Patent",
+        "abstract": "Test abstract",
+        "assignee": "Test Company",
+        "inventors": ["John Doe"],
+        "filingDate": "2024-01-01",
+        "googlePatentsLink": f"https://patents.google.com/patent/{patent_number}"
+    }, **overrides)
+
+@pytest.mark.asyncio
+async def test_save_patent(storage):
+    """Test saving a patent through the API contract endpoint"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/watchlist/patents", json=patent_payload())
+        assert response.status_code == 200
+        assert response.json()["ok"] is True
+        assert response.json()["patent"]["patent_number"] == "US1234567"
+
+    watchlist = await storage.get_watchlist("dev")
+    assert [p["patent_number"] for p in watchlist["patents"]] == ["US1234567"]
+    assert watchlist["queries"] == []
+
+@pytest.mark.asyncio
+async def test_save_query(storage):
+    """Test saving a query with filters"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/watchlist/queries", json={"query": "hydroponics", "filters": {"yearFrom": 2020}})
+        assert response.status_code == 200
+        query = response.json()["query"]
+        assert query["query"] == "hydroponics"
+        assert query["hash"]
+
+        response = await client.get("/api/queries/saved")
+        assert [q["query"] for q in response.json()] == ["hydroponics"]
+
+@pytest.mark.asyncio
+async def test_equivalent_queries_are_saved_once(storage):
+    """Test that saved-query dedupe uses the canonical fingerprint"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        first = (await client.post("/api/watchlist/queries", json={"query": "Hydroponics ", "filters": {"yearFrom": 2020}})).json()["query"]
+        second = (await client.post("/api/watchlist/queries", json={"query": "hydroponics year:2020-"})).json()["query"]
+
+    assert second["id"] == first["id"]
+    watchlist = await storage.get_watchlist("dev")
+    assert len(watchlist["queries"]) == 1
+
+@pytest.mark.asyncio
+async def test_legacy_save_patent(storage):
+    """Test the legacy save endpoint and saved patents listing"""
+    legacy_patent = {
+        "title": "Legacy Patent",
+        "abstract": "Legacy abstract",
+        "assignee": "Legacy Company",
+        "inventors": [{"name": "Jane Doe"}]
+    }
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/patents/save", json=legacy_patent)
+        assert response.status_code == 200
+        assert response.json()["title"] == "Legacy Patent"
+
+        response = await client.get("/api/patents/saved")
+        assert response.status_code == 200
+        assert [p["title"] for p in response.json()] == ["Legacy Patent"]
+
+@pytest.mark.asyncio
+async def test_create_alert(storage):
+    """Test creating and listing alerts"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/createAlert", json={"query": "vertical farming", "frequency": "weekly"})
+        assert response.status_code == 200
+        assert response.json()["frequency"] == "weekly"
+
+        response = await client.get("/api/alerts/saved")
+        assert [a["query"] for a in response.json()] == ["vertical farming"]
+
+@pytest.mark.asyncio
+async def test_create_alert_invalid_frequency(storage):
+    """Test that an unknown alert frequency is rejected"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/createAlert", json={"query": "vertical farming", "frequency": "hourly"})
+        assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_save_patent_is_idempotent(storage):
+    """Test that re-saving a patent number updates the existing record"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        first = (await client.post("/api/watchlist/patents", json=patent_payload())).json()["patent"]
+        second = (await client.post("/api/watchlist/patents", json=dict(patent_payload(), title="Updated"))).json()["patent"]
+
+    assert second["id"] == first["id"]
+    watchlist = await storage.get_watchlist("dev")
+    assert [p["title"] for p in watchlist["patents"]] == ["Updated"]
+
+@pytest.mark.asyncio
+async def test_get_watchlist(storage):
+    """Test the unpaginated watchlist shape"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await client.post("/api/watchlist/patents", json=patent_payload())
+        await client.post("/api/watchlist/queries", json={"query": "hydroponics"})
+        response = await client.get("/api/watchlist")
+
+    data = response.json()
+    assert data["ok"] is True
+    assert [p["patent_number"] for p in data["patents"]] == ["US1234567"]
+    assert [q["query"] for q in data["queries"]] == ["hydroponics"]
+    assert "X-Next-Cursor" not in response.headers
+
+@pytest.mark.asyncio
+async def test_saved_patents_keyset_pagination(storage):
+    """Test walking saved patents page by page with the next cursor header"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        for i in range(5):
+            await client.post("/api/watchlist/patents", json=patent_payload(f"US100000{i}", filingDate=None))
+
+        seen = []
+        params = {"limit": 2}
+        while True:
+            response = await client.get("/api/patents/saved", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            assert len(page) <= 2
+            seen.extend(p["id"] for p in page)
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params = {"limit": 2, "cursor": response.headers["X-Next-Cursor"]}
+
+        everything = (await client.get("/api/patents/saved")).json()
+    assert seen == [p["id"] for p in everything]
+    assert len(seen) == 5
+
+@pytest.mark.asyncio
+async def test_saved_patents_are_projected_onto_response_fields(storage):
+    """Test that stored records are returned with the response model's fields, as stored"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await client.post("/api/watchlist/patents", json=patent_payload(filingDate="2024-01-01"))
+        response = await client.get("/api/patents/saved")
+
+    assert response.status_code == 200
+    [patent] = response.json()
+    assert set(patent) == {"id", "title", "abstract", "assignee", "inventors", "link", "date_filed", "user_id", "created_at"}
+    assert patent["date_filed"] == "2024-01-01T00:00:00"
+    assert patent["inventors"] == [{"name": "John Doe"}]
+
+@pytest.mark.parametrize("model, record", [
+    (SavedPatentResponse, {
+        "id": 1, "title": "Test Patent", "abstract": "Test abstract", "assignee": "Test Company",
+        "inventors": [{"name": "John Doe"}], "link": None, "date_filed": "2024-01-01T00:00:00",
+        "user_id": "dev", "created_at": "2025-09-02T10:13:35.097985", "tags": [],
+    }),
+    (SavedPatentResponse, {
+        "id": 2, "title": "Test Patent", "abstract": "Test abstract", "assignee": "Test Company",
+        "inventors": [], "link": "https://patents.google.com/patent/US1234567", "date_filed": datetime(2024, 1, 1),
+        "user_id": "dev", "created_at": datetime(2025, 9, 2, 10, 13, 35, tzinfo=timezone.utc),
+    }),
+    (SavedQueryResponse, {
+        "id": 3, "query": "hydroponics", "filters": {"yearFrom": 2020}, "user_id": "dev",
+        "created_at": "2025-09-02 10:13:35+02:00", "hash": "abc",
+    }),
+    (SavedAlertResponse, {
+        "id": 4, "query": "hydroponics", "frequency": "weekly", "user_id": "dev", "created_at": "2025-09-02T10:13:35Z",
+    }),
+])
+def test_projection_matches_model_serialization(model, record):
+    """Test that projecting a stored record gives the same JSON as validating and dumping the response model"""
+    [projected] = saved_items.project_records([record], model)
+    assert projected == model.model_validate(record).model_dump(mode="json")
+
+@pytest.mark.asyncio
+async def test_watchlist_pagination_covers_both_collections(storage):
+    """Test that a watchlist cursor tracks patents and queries independently"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        for i in range(3):
+            await client.post("/api/watchlist/patents", json=patent_payload(f"US100000{i}"))
+        await client.post("/api/watchlist/queries", json={"query": "hydroponics"})
+
+        first = await client.get("/api/watchlist", params={"limit": 2})
+        second = await client.get("/api/watchlist", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+
+    assert len(first.json()["patents"]) == 2
+    assert len(first.json()["queries"]) == 1
+    assert len(second.json()["patents"]) == 1
+    assert second.json()["queries"] == []
+    assert "X-Next-Cursor" not in second.headers
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_rejected(storage):
+    """Test that a garbage cursor is a client error"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/api/alerts/saved", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("positions", [
+    {"patents": 5},
+    {"patents": ["x"]},
+    {"patents": ["2025-01-01T00:00:00", "1"]},
+    {"patents": [1, 2]},
+    {"patents": ["2025-01-01T00:00:00", 1, 2]},
+])
+async def test_malformed_cursor_position_is_rejected(storage, positions):
+    """Test that a well-formed cursor holding a bad position is a client error, not a server error"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/api/patents/saved", params={"cursor": saved_items.encode_cursor(positions)})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_export_watchlist_streams_ndjson(storage, monkeypatch):
+    """Test that the export walks every page of every collection"""
+    monkeypatch.setattr(saved_items, "EXPORT_PAGE_SIZE", 2)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        for i in range(5):
+            await client.post("/api/watchlist/patents", json=patent_payload(f"US100000{i}"))
+        await client.post("/api/watchlist/queries", json={"query": "hydroponics"})
+        await client.post("/api/createAlert", json={"query": "vertical farming", "frequency": "daily"})
+
+        response = await client.get("/api/watchlist/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["type"] == "export"
+    assert [line["type"] for line in lines[1:]] == ["patent"] * 5 + ["query", "alert"]
+    assert [line["item"]["patent_number"] for line in lines[1:6]] == [f"US100000{i}" for i in range(5)]
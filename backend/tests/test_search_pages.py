@@ -0,0 +1,64 @@
+import asyncio
+import json
+import time
+import pytest
+from httpx import AsyncClient
+from app.core.config import settings
+from app.main import app
+from app.routers.patents import serpapi_service
+from app.services.serpapi import merge_pages
+
+PAGE_DELAY = 0.05
+
+@pytest.fixture
+def paged_search(monkeypatch):
+    """Stub SerpAPI with slow 10-result pages."""
+    calls = []
+    monkeypatch.setattr(settings, "SERPAPI_PAGE_SIZE", 10)
+    monkeypatch.setattr(settings, "SERPAPI_PAGE_CONCURRENCY", 5)
+
+    async def search_patents(query, limit=10, start_year=None, end_year=None, page=None):
+        calls.append(page)
+        await asyncio.sleep(PAGE_DELAY)
+        start = ((page or 1) - 1) * limit
+        return [{"title": f"Result {n}", "patent_number": f"US{n:07d}"} for n in range(start, start + limit)]
+
+    monkeypatch.setattr(serpapi_service, "search_patents", search_patents)
+    serpapi_service.search_cache.clear()
+    yield calls
+    serpapi_service.search_cache.clear()
+
+def test_merge_pages_keeps_rank_order_without_repeats():
+    """Test that merged pages are de-duplicated and cut at the limit"""
+    pages = [[{"patent_number": "A"}, {"patent_number": "B"}], [{"patent_number": "B"}, {"patent_number": "C"}]]
+    assert [p["patent_number"] for p in merge_pages(pages, 10)] == ["A", "B", "C"]
+    assert [p["patent_number"] for p in merge_pages(pages, 2)] == ["A", "B"]
+
+@pytest.mark.asyncio
+async def test_large_limit_fetches_pages_concurrently(paged_search):
+    """Test that a 45-result search fetches five pages in about one page's time"""
+    started = time.perf_counter()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/api/patents/search/serpapi", params={"query": "hydroponics", "limit": 45})
+    elapsed = time.perf_counter() - started
+
+    data = response.json()
+    assert response.status_code == 200
+    assert sorted(paged_search) == [1, 2, 3, 4, 5]
+    assert [p["patent_number"] for p in data["results"]] == [f"US{n:07d}" for n in range(45)]
+    assert data["count"] == 45
+    assert elapsed < PAGE_DELAY * 3
+
+@pytest.mark.asyncio
+async def test_streamed_pages_cover_every_result_once(paged_search):
+    """Test that streaming sends each page as it arrives and a closing summary"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/api/patents/search/serpapi", params={"query": "hydroponics", "limit": 25, "stream": True})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    pages = sorted(lines[:-1], key=lambda line: line["page"])
+    numbers = [p["patent_number"] for line in pages for p in line["results"]]
+    assert [line["page"] for line in pages] == [1, 2, 3]
+    assert sorted(numbers) == [f"US{n:07d}" for n in range(25)]
+    assert lines[-1]["done"] is True
+    assert lines[-1]["count"] == 25
@@ -0,0 +1,126 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from app.main import app
+from app.routers.patents import serpapi_service
+from app.services.disk_cache import DiskCache
+from app.services.singleflight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_task():
+    """Test that identical concurrent calls run once and distinct keys run separately"""
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    results = await asyncio.gather(
+        *(flight.do("a", lambda: fetch("a")) for _ in range(10)),
+        flight.do("b", lambda: fetch("b"))
+    )
+
+    assert results == ["A"] * 10 + ["B"]
+    assert calls == ["a", "b"]
+    assert flight.stats() == {"in_flight": 0, "executed": 2, "coalesced": 9}
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    """Test that an upstream error is raised to all callers and not remembered"""
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*(flight.do("a", fail) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def succeed():
+        return "ok"
+
+    assert await flight.do("a", succeed) == "ok"
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_others():
+    """Test that one caller leaving keeps the shared call alive, and the last one cancels it"""
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(flight.do("a", fetch))
+    second = asyncio.create_task(flight.do("a", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    release.clear()
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await release.wait()
+
+    only = asyncio.create_task(flight.do("b", slow))
+    await started.wait()
+    shared_task = flight._calls["b"].task
+    only.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await only
+    await asyncio.sleep(0)
+    assert shared_task.cancelled()
+    assert flight.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_caller_arriving_while_last_waiter_cancels_gets_a_fresh_call():
+    """Test that a call being cancelled because its only caller left is not joined by the next caller"""
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.Event().wait()
+
+    async def fetch():
+        return "fresh"
+
+    only = asyncio.create_task(flight.do("a", hang))
+    await started.wait()
+    only.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await only
+
+    # The cancelled task has not finished yet, so no done callback has cleaned up the key
+    assert await flight.do("a", fetch) == "fresh"
+    assert flight.stats()["executed"] == 2
+
+@pytest.mark.asyncio
+async def test_concurrent_detail_requests_make_one_upstream_call(monkeypatch, tmp_path):
+    """Test that simultaneous detail requests for one patent share a SerpAPI call"""
+    calls = []
+    monkeypatch.setattr(serpapi_service, "details_cache", DiskCache(tmp_path / "details.db", ttl=60, max_bytes=10_000))
+
+    async def fetch_patent_details(patent_number):
+        calls.append(patent_number)
+        await asyncio.sleep(0.01)
+        return {"title": "Test Patent", "patent_link": f"https://patents.google.com/patent/{patent_number}"}
+
+    monkeypatch.setattr(serpapi_service, "_fetch_patent_details", fetch_patent_details)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        responses = await asyncio.gather(
+            *(client.get("/api/patents/US1234567/details") for _ in range(5)),
+            client.get("/api/patents/US7654321/details")
+        )
+
+    assert all(r.status_code == 200 for r in responses)
+    assert sorted(calls) == ["US1234567", "US7654321"]
@@ -0,0 +1,335 @@
+import asyncio
+import json
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import pytest
+from app.core.config import settings
+from app.routers.saved_items import hash_query
+from app.services.storage import AsyncStorageService, StorageService, create_storage_service
+
+def make_patent(title: str = "Test Patent", patent_number: Optional[str] = None) -> dict:
+    return {
+        "patent_number": patent_number or f"US{zlib.crc32(title.encode())}",
+        "title": title,
+        "abstract": "Test abstract",
+        "assignee": "Test Company",
+        "inventors": [{"name": "John Doe"}]
+    }
+
+def test_log_backend_appends_one_line_per_save(tmp_path):
+    """Test that saves in log mode append instead of rewriting the snapshot"""
+    storage = StorageService(data_dir=str(tmp_path), backend="log")
+    storage.save_patent_file(make_patent("First"), "dev")
+    storage.save_patent_file(make_patent("Second"), "dev")
+
+    lines = (tmp_path / "patents.log").read_text().splitlines()
+    assert [json.loads(line)["title"] for line in lines] == ["First", "Second"]
+    assert not (tmp_path / "patents.json").exists()
+    storage.close()
+
+def test_log_backend_recovers_after_restart(tmp_path):
+    """Test that records survive a restart without compaction"""
+    storage = StorageService(data_dir=str(tmp_path), backend="log")
+    first = storage.save_patent_file(make_patent("First"), "dev")
+    storage.save_query_file("hydroponics", "dev")
+    # Simulate a crash: no close(), no compaction
+
+    recovered = StorageService(data_dir=str(tmp_path), backend="log")
+    patents = recovered.load_records("patents.json")
+    assert [p["id"] for p in patents] == [first["id"]]
+    assert recovered.load_records("queries.json")[0]["query"] == "hydroponics"
+    assert recovered.save_patent_file(make_patent("Third"), "dev")["id"] == first["id"] + 1
+    recovered.close()
+
+def test_log_backend_discards_torn_entry(tmp_path):
+    """Test that a partially written trailing line is dropped on recovery"""
+    storage = StorageService(data_dir=str(tmp_path), backend="log")
+    storage.save_patent_file(make_patent("Complete"), "dev")
+    with open(tmp_path / "patents.log", "a") as f:
+        f.write('{"id": 2, "title": "Torn')
+
+    recovered = StorageService(data_dir=str(tmp_path), backend="log")
+    assert [p["title"] for p in recovered.load_records("patents.json")] == ["Complete"]
+    recovered.save_patent_file(make_patent("After"), "dev")
+    lines = (tmp_path / "patents.log").read_text().splitlines()
+    assert [json.loads(line)["title"] for line in lines] == ["Complete", "After"]
+    recovered.close()
+
+def test_compaction_writes_json_compatible_snapshot(tmp_path):
+    """Test that compaction folds the log into a snapshot readable by the json backend"""
+    storage = StorageService(data_dir=str(tmp_path), backend="log")
+    for i in range(3):
+        storage.save_patent_file(make_patent(f"Patent {i}"), "dev")
+    storage.compact()
+
+    assert (tmp_path / "patents.log").read_text() == ""
+    assert not (tmp_path / "patents.log.1").exists()
+    storage.close()
+
+    json_storage = StorageService(data_dir=str(tmp_path), backend="json")
+    assert len(json_storage.load_records("patents.json")) == 3
+
+def test_recovery_after_interrupted_compaction(tmp_path):
+    """Test that replaying a rotated log over its snapshot does not duplicate records"""
+    storage = StorageService(data_dir=str(tmp_path), backend="log")
+    for i in range(2):
+        storage.save_patent_file(make_patent(f"Patent {i}"), "dev")
+    log_contents = (tmp_path / "patents.log").read_text()
+    storage.compact()
+    storage.close()
+    # Crash after the snapshot rename but before the rotated log was removed
+    (tmp_path / "patents.log.1").write_text(log_contents)
+
+    recovered = StorageService(data_dir=str(tmp_path), backend="log")
+    assert [p["title"] for p in recovered.load_records("patents.json")] == ["Patent 0", "Patent 1"]
+    recovered.close()
+
+def test_unknown_backend_is_rejected(tmp_path):
+    """Test that a misconfigured backend fails loudly"""
+    with pytest.raises(ValueError):
+        StorageService(data_dir=str(tmp_path), backend="nope")
+
+def test_user_index_serves_reads_without_disk_parse(tmp_path, monkeypatch):
+    """Test that warm watchlist reads come from the in-memory index"""
+    storage = StorageService(data_dir=str(tmp_path), backend="json")
+    storage.save_patent_file(make_patent("Mine"), "dev")
+    storage.save_patent_file(make_patent("Theirs"), "other")
+    assert [p["title"] for p in storage.get_user_records("patents.json", "dev")] == ["Mine"]
+    assert storage.get_user_records("queries.json", "dev") == []
+
+    def fail_load(filename):
+        raise AssertionError(f"{filename} was re-parsed")
+
+    storage.save_patent_file(make_patent("Mine too"), "dev")
+    monkeypatch.setattr(storage, "_load_json_file", fail_load)
+    watchlist = storage.get_watchlist_file("dev")
+    assert [p["title"] for p in watchlist["patents"]] == ["Mine", "Mine too"]
+
+def test_user_index_invalidated_by_external_write(tmp_path):
+    """Test that a file changed behind our back is re-indexed"""
+    storage = StorageService(data_dir=str(tmp_path), backend="json")
+    storage.save_patent_file(make_patent("Mine"), "dev")
+    assert len(storage.get_user_records("patents.json", "dev")) == 1
+
+    records = json.loads((tmp_path / "patents.json").read_text())
+    records.append(dict(records[0], id=2, patent_number="US7654321", title="Added elsewhere"))
+    (tmp_path / "patents.json").write_text(json.dumps(records))
+
+    assert [p["title"] for p in storage.get_user_records("patents.json", "dev")] == ["Mine", "Added elsewhere"]
+
+def seed_large_collection(data_dir, count: int) -> None:
+    records = [
+        dict(make_patent(f"Seed {i}"), id=i + 1, user_id="seed", created_at="2024-01-01T00:00:00")
+        for i in range(count)
+    ]
+    (data_dir / "patents.json").write_text(json.dumps(records))
+
+async def measure_search_latency(searches: int = 20) -> float:
+    """Worst-case latency of a stand-in search that awaits 10ms of upstream I/O"""
+    worst = 0.0
+    for _ in range(searches):
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, time.perf_counter() - started)
+    return worst
+
+@pytest.mark.asyncio
+async def test_search_latency_stays_flat_during_large_saves(tmp_path):
+    """Test that large saves run off the event loop"""
+    seed_large_collection(tmp_path, 20000)
+    storage = StorageService(data_dir=str(tmp_path), backend="json")
+    async_storage = AsyncStorageService(storage, max_workers=2)
+
+    started = time.perf_counter()
+    storage.save_patent_file(make_patent("Blocking"), "dev")
+    blocking_save = time.perf_counter() - started
+    idle_latency = await measure_search_latency()
+
+    saves = asyncio.gather(*(async_storage.save_patent(make_patent(f"Async {i}"), "dev") for i in range(4)))
+    busy_latency = await measure_search_latency()
+    await saves
+
+    # A save on the loop would stall a search for the full save duration
+    assert busy_latency < idle_latency + blocking_save / 2
+    assert len(await async_storage.get_user_records("patents.json", "dev")) == 5
+    async_storage.close()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["json", "log"])
+async def test_cancelled_save_does_not_stop_the_writer(tmp_path, backend):
+    """Test that a save whose caller is cancelled while queued is dropped and later saves still commit"""
+    storage = StorageService(data_dir=str(tmp_path), backend=backend)
+    async_storage = AsyncStorageService(storage)
+
+    # Hold the writer inside a first commit so the next save stays queued
+    storage._index_lock.acquire()
+    first = storage.submit_record("patents.json", storage.new_patent_record(make_patent("First"), "dev"))
+    while not storage._write_queue.empty():
+        await asyncio.sleep(0.001)
+    cancelled = asyncio.create_task(async_storage.save_patent(make_patent("Cancelled"), "dev"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    storage._index_lock.release()
+
+    second = await asyncio.wait_for(async_storage.save_patent(make_patent("Second"), "dev"), timeout=5)
+    assert second["title"] == "Second"
+    assert first.result()["title"] == "First"
+    assert [p["title"] for p in storage.get_user_records("patents.json", "dev")] == ["First", "Second"]
+    async_storage.close()
+
+@pytest.mark.parametrize("backend", ["json", "log", "sqlite"])
+def test_concurrent_saves_get_unique_monotonic_ids(tmp_path, backend):
+    """Test that a burst of concurrent saves loses nothing and never reuses an id"""
+    storage = create_storage_service(data_dir=str(tmp_path), backend=backend)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        saved = list(pool.map(lambda i: storage.save_patent_file(make_patent(f"Burst {i}"), "dev"), range(64)))
+
+    ids = sorted(record["id"] for record in saved)
+    assert ids == list(range(1, 65))
+    storage.close()
+
+    reopened = create_storage_service(data_dir=str(tmp_path), backend=backend)
+    assert len(reopened.load_records("patents.json")) == 64
+    reopened.close()
+
+def test_group_commit_batches_writes(tmp_path, monkeypatch):
+    """Test that saves arriving together share one atomic file replacement"""
+    storage = StorageService(data_dir=str(tmp_path), backend="json")
+    writes = []
+    original_save = storage._save_json_file
+
+    def counting_save(filename, data):
+        writes.append(len(data))
+        return original_save(filename, data)
+
+    monkeypatch.setattr(storage, "_save_json_file", counting_save)
+    futures = [storage.submit_record("patents.json", storage.new_patent_record(make_patent(f"P{i}"), "dev")) for i in range(50)]
+    assert [f.result()["id"] for f in futures] == list(range(1, 51))
+
+    assert len(writes) < 50
+    assert not list(tmp_path.glob("*.tmp"))
+    storage.close()
+
+@pytest.mark.parametrize("backend", ["json", "log", "sqlite"])
+def test_repeat_patent_save_updates_in_place(tmp_path, backend):
+    """Test that saving the same patent number twice is an idempotent upsert"""
+    storage = create_storage_service(data_dir=str(tmp_path), backend=backend)
+    first = storage.save_patent_file(dict(make_patent("Original", "US1234567"), tags=["a"]), "dev")
+    second = storage.save_patent_file(dict(make_patent("Renamed", "US1234567"), tags=["b"]), "dev")
+    other_user = storage.save_patent_file(make_patent("Original", "US1234567"), "other")
+
+    assert second["id"] == first["id"]
+    assert second["created_at"] == first["created_at"]
+    assert other_user["id"] != first["id"]
+    patents = storage.get_user_records("patents.json", "dev")
+    assert [(p["title"], p["tags"]) for p in patents] == [("Renamed", ["b"])]
+    storage.close()
+
+    reopened = create_storage_service(data_dir=str(tmp_path), backend=backend)
+    assert len(reopened.get_user_records("patents.json", "dev")) == 1
+    reopened.close()
+
+def test_repeat_query_save_upserts_on_hash(tmp_path):
+    """Test that queries are deduplicated on their hash within a batch and across batches"""
+    storage = StorageService(data_dir=str(tmp_path), backend="json")
+    futures = [
+        storage.submit_record("queries.json", storage.new_query_record("hydroponics", "dev", hash_value="abc"))
+        for _ in range(5)
+    ]
+    ids = {f.result()["id"] for f in futures}
+    storage.save_query_file("hydroponics", "dev", hash_value="abc")
+    storage.save_query_file("aquaponics", "dev", hash_value="def")
+
+    assert len(ids) == 1
+    assert len(json.loads((tmp_path / "queries.json").read_text())) == 2
+    storage.close()
+
+def test_legacy_duplicates_are_collapsed(tmp_path):
+    """Test that duplicate rows from before upserts existed are read and rewritten once"""
+    rows = [
+        dict(make_patent("Old", "US1234567"), id=1, user_id="dev", created_at="2025-09-02T10:13:35"),
+        dict(make_patent("New", "US1234567"), id=2, user_id="dev", created_at="2025-09-02T11:45:32"),
+    ]
+    (tmp_path / "patents.json").write_text(json.dumps(rows))
+    storage = StorageService(data_dir=str(tmp_path), backend="json")
+
+    patents = storage.get_user_records("patents.json", "dev")
+    assert [(p["id"], p["title"]) for p in patents] == [(1, "New")]
+
+    storage.save_patent_file(make_patent("Other"), "dev")
+    on_disk = json.loads((tmp_path / "patents.json").read_text())
+    assert [p["id"] for p in on_disk] == [1, 3]
+    storage.close()
+
+def test_upsert_over_legacy_duplicates_survives_restart(tmp_path):
+    """Test that the log backend drops collapsed duplicates so replay cannot undo a later upsert"""
+    rows = [
+        dict(make_patent("Old", "US1234567"), id=1, user_id="dev", created_at="2025-09-02T10:13:35"),
+        dict(make_patent("Old", "US1234567"), id=2, user_id="dev", created_at="2025-09-02T11:45:32"),
+    ]
+    (tmp_path / "patents.json").write_text(json.dumps(rows))
+    storage = StorageService(data_dir=str(tmp_path), backend="log")
+    storage.save_patent_file(make_patent("New", "US1234567"), "dev")
+    assert [(p["id"], p["title"]) for p in storage.get_user_records("patents.json", "dev")] == [(1, "New")]
+    # Simulate a crash: no close(), no compaction
+
+    reopened = StorageService(data_dir=str(tmp_path), backend="log")
+    assert [(p["id"], p["title"]) for p in reopened.get_user_records("patents.json", "dev")] == [(1, "New")]
+    assert [p["id"] for p in reopened.load_records("patents.json")] == [1]
+    reopened.close()
+
+@pytest.mark.parametrize("backend", ["json", "log"])
+def test_keyset_pages_cover_saves_committed_out_of_order(tmp_path, backend):
+    """Test that a save stamped earlier but committed later is still listed and paged in created_at order"""
+    storage = StorageService(data_dir=str(tmp_path), backend=backend)
+    stamps = {"A": "2025-01-01T00:00:00", "B": "2025-01-02T00:00:00", "C": "2025-01-03T00:00:00"}
+    for title in ("B", "C", "A"):
+        storage.submit_record("patents.json", dict(storage.new_patent_record(make_patent(title), "dev"), created_at=stamps[title])).result()
+
+    assert [p["title"] for p in storage.get_user_records("patents.json", "dev")] == ["A", "B", "C"]
+    seen, after = [], None
+    while page := storage.get_user_records("patents.json", "dev", limit=1, after=after):
+        seen.extend(p["title"] for p in page)
+        after = (page[-1]["created_at"], page[-1]["id"])
+    assert seen == ["A", "B", "C"]
+    storage.close()
+
+@pytest.mark.parametrize("backend", ["json", "log", "sqlite"])
+def test_queries_saved_under_legacy_hashes_are_upserted(tmp_path, backend):
+    """Test that a re-save matches queries whose stored hash predates the canonical fingerprint"""
+    rows = [
+        {"id": 1, "query": "Vertical  Farming", "filters": None, "hash": "hash_1", "user_id": "dev",
+         "created_at": "2025-09-02T10:13:35", "updated_at": "2025-09-02T10:13:35"},
+        {"id": 2, "query": "vertical farming", "filters": {}, "hash": "hash_2", "user_id": "dev",
+         "created_at": "2025-09-02T11:45:32", "updated_at": "2025-09-02T11:45:32"},
+        {"id": 3, "query": "hydroponics", "filters": None, "hash": "0" * 64, "user_id": "dev",
+         "created_at": "2025-09-02T12:00:00", "updated_at": "2025-09-02T12:00:00"},
+    ]
+    if backend == "sqlite":
+        create_storage_service(data_dir=str(tmp_path), backend="sqlite").close()
+        with sqlite3.connect(tmp_path / settings.SQLITE_FILENAME) as connection:
+            connection.executemany(
+                "INSERT INTO saved_queries (id, query, filters, hash, user_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(r["id"], r["query"], json.dumps(r["filters"]), r["hash"], r["user_id"], r["created_at"], r["updated_at"]) for r in rows]
+            )
+    else:
+        (tmp_path / "queries.json").write_text(json.dumps(rows))
+
+    storage = create_storage_service(data_dir=str(tmp_path), backend=backend)
+    vertical = storage.save_query_file("vertical farming", "dev", hash_value=hash_query("vertical farming"))
+    hydroponics = storage.save_query_file("Hydroponics", "dev", hash_value=hash_query("Hydroponics"))
+
+    assert vertical["id"] == 1
+    assert hydroponics["id"] == 3
+    queries = storage.get_user_records("queries.json", "dev")
+    assert [(q["id"], q["hash"]) for q in queries] == [(1, hash_query("vertical farming")), (3, hash_query("hydroponics"))]
+    storage.close()
+
+    reopened = create_storage_service(data_dir=str(tmp_path), backend=backend)
+    assert [q["id"] for q in reopened.get_user_records("queries.json", "dev")] == [1, 3]
+    reopened.close()
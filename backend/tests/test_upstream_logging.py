@@ -0,0 +1,59 @@
+import json
+import logging
+import pytest
+from app.core.config import settings
+from app.services.upstream_logging import UpstreamLogger, truncate
+
+class CountingPayload:
+    """Payload that records how often it is rendered."""
+    renders = 0
+
+    def __str__(self) -> str:
+        CountingPayload.renders += 1
+        return "payload"
+
+@pytest.fixture
+def upstream_log():
+    logger = logging.getLogger("tests.upstream")
+    logger.setLevel(logging.DEBUG)
+    return UpstreamLogger("serpapi", logger)
+
+def test_disabled_levels_are_never_formatted(upstream_log):
+    """Test that events below the logger level cost no formatting"""
+    upstream_log.logger.setLevel(logging.WARNING)
+    CountingPayload.renders = 0
+    upstream_log.debug("search.request", params=CountingPayload())
+    upstream_log.payload(logging.INFO, "search.response_body", [CountingPayload()], sampled=False)
+    assert CountingPayload.renders == 0
+
+def test_payloads_are_sampled_and_truncated(upstream_log, caplog, monkeypatch):
+    """Test that sampled payloads follow the sample rate and are cut to the body limit"""
+    monkeypatch.setattr(settings, "UPSTREAM_LOG_MAX_BODY", 20)
+    caplog.set_level(logging.DEBUG, logger="tests.upstream")
+
+    monkeypatch.setattr(settings, "UPSTREAM_LOG_SAMPLE_RATE", 0.0)
+    upstream_log.payload(logging.DEBUG, "search.response_body", {"organic_results": ["x" * 100]})
+    assert caplog.records == []
+
+    monkeypatch.setattr(settings, "UPSTREAM_LOG_SAMPLE_RATE", 1.0)
+    upstream_log.payload(logging.DEBUG, "search.response_body", {"organic_results": ["x" * 100]})
+    message = caplog.records[0].getMessage()
+    assert message.startswith("serpapi search.response_body body=")
+    assert message.endswith("... (124 chars)")
+
+def test_api_key_is_redacted(upstream_log, caplog, monkeypatch):
+    """Test that the SerpAPI key never reaches the logs, in text or JSON format"""
+    caplog.set_level(logging.DEBUG, logger="tests.upstream")
+    params = {"api_key": "secret", "q": "hydroponics"}
+
+    upstream_log.debug("search.request", params=params)
+    monkeypatch.setattr(settings, "UPSTREAM_LOG_FORMAT", "json")
+    upstream_log.debug("search.request", params=params)
+
+    assert all("secret" not in record.getMessage() for record in caplog.records)
+    event = json.loads(caplog.records[1].getMessage())
+    assert event == {"service": "serpapi", "event": "search.request", "params": {"api_key": "***", "q": "hydroponics"}}
+
+def test_truncate_leaves_short_payloads_alone():
+    assert truncate({"a": 1}, 100) == '{"a":1}'
+    assert truncate("abcdef", 3) == "abc... (6 chars)"